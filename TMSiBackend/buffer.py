@@ -30,20 +30,44 @@ limitations under the License.
 
 '''
 
+import time
+
 import numpy as np
 
 
 class Buffer:
     """Class to handle circular buffer of data.
     """
-    def __init__(self, size: int):
+    def __init__(self, size: int, dtype = np.float32):
         """Constructor of the buffer.
 
         :param size: maximum number of samples per channel.
         :type size: int
+        :param dtype: data type of the samples, defaults to np.float32
+        :type dtype: numpy.dtype, optional
         """
         self.size_buffer = int(size)
         self.pointer_buffer = 0
+        self.total_samples = 0
+        self.dtype = dtype
+        self._data = None
+        # Sequence counter, odd while an append is in progress
+        self._version = 0
+
+    @property
+    def dataset(self):
+        """Samples in the buffer, with the same layout as the circular buffer:
+        the newest sample is at position pointer_buffer - 1. While the buffer 
+        is being filled for the first time only the written samples are returned.
+
+        :return: view on the samples, None if no samples have been appended yet.
+        :rtype: numpy.ndarray
+        """
+        if self._data is None:
+            return None
+        if self.total_samples < self.size_buffer:
+            return self._data[:, :self.total_samples]
+        return self._data
 
     def copy(self) -> 'Buffer':
         """Return a copy of the buffer.
@@ -51,9 +75,10 @@ class Buffer:
         :return: a copy of the buffer.
         :rtype: Buffer
         """
-        buffer_copy = Buffer(self.size_buffer)
+        buffer_copy = Buffer(self.size_buffer, self.dtype)
         buffer_copy.pointer_buffer = self.pointer_buffer
-        buffer_copy.dataset = self.dataset.copy() if hasattr(self, "dataset") else None
+        buffer_copy.total_samples = self.total_samples
+        buffer_copy._data = self._data.copy() if self._data is not None else None
         return buffer_copy
 
     def get_last_value(self) -> list:
@@ -62,11 +87,17 @@ class Buffer:
         :return: last value received of each channel.
         :rtype: list[int]
         """
-        if hasattr(self, "dataset"):
-            try:    
-                return self.dataset[:,self.pointer_buffer - 1]
-            except:
-                return []
+        if self._data is None or self.total_samples == 0:
+            return []
+        return self._data[:, self.pointer_buffer - 1]
+
+    def get_num_samples(self) -> int:
+        """Return the number of samples available in the buffer.
+
+        :return: number of samples per channel which can be read.
+        :rtype: int
+        """
+        return min(self.total_samples, self.size_buffer)
 
     def append(self, samples):
         """Append new data to the buffer.
@@ -74,40 +105,107 @@ class Buffer:
         :param samples: samples to append.
         :type samples: 2D list
         """
-        if not hasattr(self, "dataset"):
-            self.dataset = np.array([[]] * np.shape(samples)[0])
-
-        samples_chunk = np.shape(samples)[1]
-
-        if np.shape(self.dataset)[1] < self.size_buffer:  # still filling the dataset
-            # if the new datapack does not overflow the buffersize
-            if self.pointer_buffer + samples_chunk <= self.size_buffer:
-                self.dataset = np.append(self.dataset, samples, 1)
-                self.pointer_buffer += samples_chunk
-            else:  # i need to break the datapack and loop
-                first_chunk = self.size_buffer - self.pointer_buffer
-                second_chunk = samples_chunk - first_chunk
-                self.dataset = np.append(
-                    self.dataset, samples[:, 0:first_chunk], 1)
-                self.dataset[:,
-                             0:second_chunk] = samples[:,
-                                                       first_chunk:samples_chunk]
-                self.pointer_buffer = second_chunk
-        else:  # replacing old data
-            # if the new datapack does not overflow the buffersize
-            if self.pointer_buffer + samples_chunk <= self.size_buffer:
-                self.dataset[:, self.pointer_buffer:self.pointer_buffer +
-                             samples_chunk] = samples[:, :]
-                self.pointer_buffer += samples_chunk
-            else:  # i need to break the datapack and loop
-                first_chunk = self.size_buffer - self.pointer_buffer
-                second_chunk = samples_chunk - first_chunk
-                if first_chunk > 0:
-                    self.dataset[:,
-                             self.pointer_buffer:self.size_buffer] = samples[:,
-                                                                             0:first_chunk]
-                if second_chunk > 0:
-                    self.dataset[:,
-                             0:second_chunk] = samples[:,
-                                                       first_chunk:samples_chunk]
-                self.pointer_buffer = second_chunk
\ No newline at end of file
+        samples = np.asarray(samples)
+        samples_chunk = samples.shape[1]
+        if self._data is None:
+            self._data = np.zeros((samples.shape[0], self.size_buffer), dtype = self.dtype)
+        self._version += 1
+        if samples_chunk >= self.size_buffer:
+            # only the newest samples fit in the buffer
+            start = (self.pointer_buffer + samples_chunk) % self.size_buffer
+            self._write(start, samples[:, samples_chunk - self.size_buffer:])
+        else:
+            self._write(self.pointer_buffer, samples)
+        self.pointer_buffer = (self.pointer_buffer + samples_chunk) % self.size_buffer
+        self.total_samples += samples_chunk
+        self._version += 1
+
+    def read_since(self, start: int):
+        """Return a consistent copy of the samples appended since an absolute 
+        sample index, without copying the rest of the buffer. The read is retried 
+        when an append takes place while copying, so it can be called from a 
+        different thread than the one appending.
+
+        :param start: index of the first sample to read, counted from the first sample appended.
+        :type start: int
+        :return: the samples with the oldest one first (limited to the samples 
+            still available) and the total number of samples appended at the 
+            moment of reading. The samples are None if nothing has been appended yet.
+        :rtype: tuple[numpy.ndarray, int]
+        """
+        while True:
+            version = self._version
+            if version % 2 == 1:
+                # let the appending thread finish
+                time.sleep(0)
+                continue
+            total_samples = self.total_samples
+            samples = self.window(start, total_samples)
+            if samples is not None:
+                samples = np.array(samples)
+            if version == self._version:
+                return samples, total_samples
+
+    def update_from(self, source: 'Buffer') -> int:
+        """Mirror a buffer of the same size by copying only the samples 
+        appended to it since the previous update. The mirror has the same 
+        layout as the source, so it can be used as a private snapshot which 
+        stays valid while the source keeps receiving samples.
+
+        :param source: buffer to mirror.
+        :type source: Buffer
+        :return: number of new samples copied.
+        :rtype: int
+        """
+        if source.total_samples < self.total_samples:
+            # the source has been restarted
+            self.pointer_buffer = 0
+            self.total_samples = 0
+            self._data = None
+        samples, total_samples = source.read_since(self.total_samples)
+        if samples is None or samples.shape[1] == 0:
+            return 0
+        # skip the samples which were overwritten before they could be read
+        self.total_samples = total_samples - samples.shape[1]
+        self.pointer_buffer = self.total_samples % self.size_buffer
+        self.append(samples)
+        return samples.shape[1]
+
+    def latest(self, n_samples: int):
+        """Return the newest samples in time order.
+
+        :param n_samples: number of samples per channel.
+        :type n_samples: int
+        :return: samples with the oldest one first. Only the available samples 
+            are returned when the buffer contains less than n_samples.
+        :rtype: numpy.ndarray
+        """
+        return self.window(self.total_samples - n_samples, self.total_samples)
+
+    def window(self, start: int, stop: int):
+        """Return the samples between two absolute sample indices in time order.
+
+        :param start: index of the first sample, counted from the first sample appended.
+        :type start: int
+        :param stop: index after the last sample, counted from the first sample appended.
+        :type stop: int
+        :return: samples with the oldest one first, limited to the samples still available.
+        :rtype: numpy.ndarray
+        """
+        if self._data is None:
+            return None
+        start = max(start, self.total_samples - self.get_num_samples())
+        stop = min(stop, self.total_samples)
+        if stop <= start:
+            return self._data[:, 0:0]
+        first = start % self.size_buffer
+        last = first + stop - start
+        if last <= self.size_buffer:
+            return self._data[:, first:last]
+        return np.concatenate((self._data[:, first:], self._data[:, :last - self.size_buffer]), axis = 1)
+
+    def _write(self, start, samples):
+        first_chunk = min(samples.shape[1], self.size_buffer - start)
+        self._data[:, start:start + first_chunk] = samples[:, :first_chunk]
+        if first_chunk < samples.shape[1]:
+            self._data[:, :samples.shape[1] - first_chunk] = samples[:, first_chunk:]
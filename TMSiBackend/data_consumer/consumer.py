@@ -45,13 +45,18 @@ class Consumer:
             self.consumer_thread.stop_sampling()
             self.consumer_thread.join()
             
-        SampleDataServer().unregister_consumer(self.reading_queue_id, self)
+        SampleDataServer().unregister_consumer(self.reading_queue_id, self.reading_queue)
+        if hasattr(self.consumer_thread, "close"):
+            self.consumer_thread.close()
     
     def open(self, server, reading_queue_id, consumer_thread):
         self.server = server
         self.reading_queue_id = reading_queue_id
+        # A consumer process reads the sample data from its shared input buffer
+        if hasattr(consumer_thread, "input_buffer"):
+            self.reading_queue = consumer_thread.input_buffer
         try:
-            SampleDataServer().register_consumer(self.reading_queue_id, self)
+            SampleDataServer().register_consumer(self.reading_queue_id, self.reading_queue)
             self.consumer_thread = consumer_thread
             self.consumer_thread.start()
         except OSError as e:
@@ -0,0 +1,126 @@
+'''
+(c) 2023 Twente Medical Systems International B.V., Oldenzaal The Netherlands
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+#######  #     #   #####   #
+   #     ##   ##  #
+   #     # # # #  #        #
+   #     #  #  #   #####   #
+   #     #     #        #  #
+   #     #     #        #  #
+   #     #     #  #####    #
+
+/**
+ * @file consumer_process.py
+ * @brief
+ * Consumer process object, to process the data in a worker process.
+ */
+
+
+'''
+
+import multiprocessing
+import time
+
+from TMSiSDK.sample_data_server.sample_data import SampleData
+
+from ..buffer import Buffer
+from ..shared_buffer import SharedBuffer
+
+
+class ConsumerProcess:
+    """Runs the processing of a consumer thread class in a worker process, so
+    heavy processing does not compete for the GIL with the sampling and
+    conversion threads of the device. It is used like a consumer thread: the
+    sample data reach the worker process through the input_buffer, a
+    SharedBuffer which the Consumer registers to the SampleDataServer, and
+    every Buffer of the consumer thread class is replaced by a SharedBuffer,
+    available as an attribute with the same name, e.g. filtered_buffer.
+    """
+    def __init__(self, consumer_thread_class, sample_rate, num_channels, initialization = None, pause = 0.01):
+        """Initialize the consumer process.
+
+        :param consumer_thread_class: class of the consumer thread whose process method is run.
+        :type consumer_thread_class: ConsumerThread
+        :param sample_rate: sample rate of the device.
+        :type sample_rate: int
+        :param num_channels: number of channels of the sample data.
+        :type num_channels: int
+        :param initialization: methods of the consumer thread to call before processing,
+            with their keyword arguments, e.g. {"initialize_filter": {"hpf": 5}}, defaults to None
+        :type initialization: dict, optional
+        :param pause: time in seconds the worker process waits when no new samples are available, defaults to 0.01
+        :type pause: float, optional
+        """
+        self.consumer_thread_class = consumer_thread_class
+        self.sample_rate = sample_rate
+        self.num_channels = num_channels
+        self.initialization = initialization if initialization is not None else {}
+        self.pause = pause
+        self.input_buffer = SharedBuffer(sample_rate * 10, num_channels)
+        # Share the buffers created by the consumer thread
+        self.shared_buffers = {}
+        for name, value in vars(consumer_thread_class(None, sample_rate)).items():
+            if isinstance(value, Buffer):
+                self.shared_buffers[name] = SharedBuffer(value.size_buffer, num_channels, value.dtype)
+                setattr(self, name, self.shared_buffers[name])
+        self._stop_event = multiprocessing.Event()
+        self._process = multiprocessing.Process(
+            target = _run_consumer_thread,
+            args = (consumer_thread_class, sample_rate, self.initialization,
+                self.input_buffer, self.shared_buffers, self._stop_event, pause),
+            daemon = True)
+
+    def start(self):
+        """Start the worker process."""
+        self._process.start()
+
+    def stop_sampling(self):
+        """Stop the worker process once it processed the samples received."""
+        self._stop_event.set()
+
+    def join(self, timeout = None):
+        """Wait for the worker process to stop.
+
+        :param timeout: maximum time to wait in seconds, defaults to None
+        :type timeout: float, optional
+        """
+        self._process.join(timeout)
+
+    def close(self):
+        """Release the shared buffers."""
+        self.input_buffer.close()
+        for buffer in self.shared_buffers.values():
+            buffer.close()
+
+
+def _run_consumer_thread(consumer_thread_class, sample_rate, initialization, input_buffer, shared_buffers, stop_event, pause):
+    # Run in the worker process: the consumer thread is not started, only its
+    # process method is called with the samples of the input buffer
+    consumer_thread = consumer_thread_class(None, sample_rate)
+    for name, buffer in shared_buffers.items():
+        setattr(consumer_thread, name, buffer)
+    for method, kwargs in initialization.items():
+        getattr(consumer_thread, method)(**kwargs)
+    read_samples = 0
+    while True:
+        stopping = stop_event.is_set()
+        samples, total_samples = input_buffer.read_since(read_samples)
+        if samples is not None and samples.shape[1] > 0:
+            read_samples = total_samples
+            consumer_thread.process(SampleData(samples.shape[1], samples.shape[0], samples))
+        elif stopping:
+            break
+        else:
+            time.sleep(pause)
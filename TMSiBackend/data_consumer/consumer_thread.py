@@ -31,9 +31,7 @@ limitations under the License.
 '''
 
 import threading
-import numpy as np
-
-from TMSiSDK.tmsi_utilities.support_functions import array_to_matrix as Reshape
+import time
 
 from ..buffer import Buffer
 
@@ -44,10 +42,11 @@ class ConsumerThread(threading.Thread):
         self.sampling = False
         self.sample_rate = sample_rate
         self.original_buffer = Buffer(sample_rate * 10)
+        # Averaged time between the retrieval of the samples from the device and their processing
+        self.latency = None
 
     def process(self, sample_data):
-        reshaped = np.array(Reshape(sample_data.samples, sample_data.num_samples_per_sample_set))
-        self.original_buffer.append(reshaped)
+        self.original_buffer.append(sample_data.data)
 
     def run(self):
         self.sampling = True
@@ -55,6 +54,16 @@ class ConsumerThread(threading.Thread):
             sample_data = self.consumer_reading_queue.get()
             self.consumer_reading_queue.task_done()
             self.process(sample_data)
+            self._update_latency(sample_data)
 
     def stop_sampling(self):
-        self.sampling = False
\ No newline at end of file
+        self.sampling = False
+
+    def _update_latency(self, sample_data):
+        if getattr(sample_data, "retrieval_time", None) is None:
+            return
+        latency = time.perf_counter() - sample_data.retrieval_time
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += 0.1 * (latency - self.latency)
\ No newline at end of file
@@ -0,0 +1,136 @@
+'''
+(c) 2023 Twente Medical Systems International B.V., Oldenzaal The Netherlands
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+#######  #     #   #####   #
+   #     ##   ##  #
+   #     # # # #  #        #
+   #     #  #  #   #####   #
+   #     #     #        #  #
+   #     #     #        #  #
+   #     #     #  #####    #
+
+/**
+ * @file shared_buffer.py
+ * @brief
+ * A buffer to exchange data coming from the devices between processes.
+ */
+
+
+'''
+
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .buffer import Buffer
+
+# Fields of the header in front of the samples
+_VERSION = 0
+_POINTER_BUFFER = 1
+_TOTAL_SAMPLES = 2
+_HEADER_SIZE = 3
+
+
+class SharedBuffer(Buffer):
+    """Circular buffer of data in shared memory. It has the same layout and
+    interface as Buffer, but it can be appended by one process and read by
+    other processes. A shared buffer sent to another process (e.g. as argument
+    of a multiprocessing.Process) is attached to the same memory. It can be
+    registered as a consumer to the SampleDataServer: the sample data put in it
+    are appended to the buffer.
+    """
+    def __init__(self, size: int, num_channels: int, dtype = np.float32, name: str = None):
+        """Constructor of the shared buffer.
+
+        :param size: maximum number of samples per channel.
+        :type size: int
+        :param num_channels: number of channels, needed to allocate the shared memory.
+        :type num_channels: int
+        :param dtype: data type of the samples, defaults to np.float32
+        :type dtype: numpy.dtype, optional
+        :param name: name of the shared memory to attach to, defaults to None to create a new one.
+        :type name: str, optional
+        """
+        # The state of Buffer is kept in the shared memory, Buffer.__init__ is not used
+        self.size_buffer = int(size)
+        self.num_channels = int(num_channels)
+        self.dtype = dtype
+        header_bytes = _HEADER_SIZE * np.dtype(np.int64).itemsize
+        if name is None:
+            self._shared_memory = shared_memory.SharedMemory(
+                create = True,
+                size = header_bytes + self.num_channels * self.size_buffer * np.dtype(dtype).itemsize)
+            self._owner = True
+        else:
+            self._shared_memory = shared_memory.SharedMemory(name = name)
+            self._owner = False
+        self._header = np.ndarray((_HEADER_SIZE, ), dtype = np.int64, buffer = self._shared_memory.buf)
+        self._data = np.ndarray((self.num_channels, self.size_buffer), dtype = dtype,
+            buffer = self._shared_memory.buf, offset = header_bytes)
+        if self._owner:
+            self._header[:] = 0
+
+    def __reduce__(self):
+        # Attach to the same memory when sent to another process
+        return (SharedBuffer, (self.size_buffer, self.num_channels, self.dtype, self.get_name()))
+
+    @property
+    def pointer_buffer(self):
+        return int(self._header[_POINTER_BUFFER])
+
+    @pointer_buffer.setter
+    def pointer_buffer(self, value):
+        self._header[_POINTER_BUFFER] = value
+
+    @property
+    def total_samples(self):
+        return int(self._header[_TOTAL_SAMPLES])
+
+    @total_samples.setter
+    def total_samples(self, value):
+        self._header[_TOTAL_SAMPLES] = value
+
+    @property
+    def _version(self):
+        return int(self._header[_VERSION])
+
+    @_version.setter
+    def _version(self, value):
+        self._header[_VERSION] = value
+
+    def get_name(self) -> str:
+        """Return the name of the shared memory.
+
+        :return: name of the shared memory, to attach to the buffer from another process.
+        :rtype: str
+        """
+        return self._shared_memory.name
+
+    def put(self, sample_data):
+        """Append the sample data delivered by the SampleDataServer.
+
+        :param sample_data: sample data to append.
+        :type sample_data: SampleData
+        """
+        self.append(sample_data.data)
+
+    def close(self):
+        """Remove the shared memory when it is not needed anymore. The memory
+        is released once all buffers attached to it have been deleted, so the
+        samples can still be read while the processes are stopping.
+        """
+        if self._owner:
+            self._owner = False
+            self._shared_memory.unlink()
@@ -36,6 +36,7 @@ from datetime import datetime
 import os
 import struct
 import time
+import numpy as np
 from pylsl import StreamInfo, StreamOutlet, local_clock
 
 from TMSiSDK.device.tmsi_device import TMSiDevice
@@ -62,10 +63,8 @@ class LSLConsumer:
         sd (TMSiSDK.sample_data.SampleData): provided by the sample data server
         '''
         try:
-            # split into list of arrays for each sampling event
-            signals = [sd.samples[i*sd.num_samples_per_sample_set : \
-                                (i+1)*sd.num_samples_per_sample_set] \
-                                    for i in range(sd.num_sample_sets)]
+            # one row for each sampling event, in the float32 format of the outlet
+            signals = np.ascontiguousarray(sd.data.T, dtype = np.float32)
             # and push to LSL
             self._outlet.push_chunk(signals, local_clock())
         except:
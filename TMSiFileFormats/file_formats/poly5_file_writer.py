@@ -40,14 +40,21 @@ import time
 import numpy as np
 
 from TMSiSDK.sample_data_server.sample_data_server import SampleDataServer 
+from TMSiSDK.sample_data_server.sample_data import DeliveryPolicy
 from TMSiSDK.tmsi_errors.error import TMSiError, TMSiErrorCode, DeviceErrorLookupTable
 
 _QUEUE_SIZE = 1000
+_BLOCK_HEADER_STRUCT = struct.Struct("=i4xHHHHHHH64x")
+_COUNTER_RANGE = 2**24
+_DURABILITY_INTERVAL = 1.0
 
 class Poly5Writer:
-    def __init__(self, filename, download = False):
+    def __init__(self, filename, download = False, durability_interval = _DURABILITY_INTERVAL):
         self.q_sample_sets = queue.Queue(_QUEUE_SIZE)
         self.device = None
+        # Interval in seconds at which written blocks are synced to disk and 
+        # the header is updated, None to update the header on close only
+        self.durability_interval = durability_interval
         
         fileparts = filename.split('.')
         if not download:
@@ -94,11 +101,9 @@ class Poly5Writer:
                                         self._date)
             for (i, channel) in enumerate(self.device.get_device_active_channels()):
                 Poly5Writer._writeSignalDescription(self._fp, i, channel.get_channel_name(), channel.get_channel_unit_name())
-                
-            fmt = 'f'*self._num_channels*self._num_sample_sets_per_sample_data_block 
-            self.pack_struct = struct.Struct(fmt)
 
-            SampleDataServer().register_consumer(self.device.get_id(), self.q_sample_sets)
+            # The file must contain all samples: they are kept for the writer when it falls behind
+            SampleDataServer().register_consumer(self.device.get_id(), self.q_sample_sets, DeliveryPolicy.block)
 
             self._sampling_thread = ConsumerThread(self, name='poly5-writer : dev-id-' + str(self.device.get_id()))
             self._sampling_thread.start()
@@ -110,9 +115,10 @@ class Poly5Writer:
 
     def close(self):
         # print("Poly5Writer-close")
-        self._sampling_thread.stop_sampling()
-        
+        # Unregister first: the samples still waiting for the writer are delivered to its queue
         SampleDataServer().unregister_consumer(self.device.get_id(), self.q_sample_sets)
+        
+        self._sampling_thread.stop_sampling()
 
 
     ## Write header of a poly5 file.
@@ -179,10 +185,11 @@ class Poly5Writer:
     # @param f File object
     # @param index Index of the data block
     # @param date Date of the sample_data block (measurement)
-    # @param signals A list of sample_data, containing NumPy arrays
+    # @param sample_sets_block C-contiguous float32 array with the sample sets of the block
+    # @param num_sample_sets_per_sample_data_block Number of sample sets per block
     @staticmethod
-    def _writeSignalBlock(f, index, date, sample_sets_block, num_sample_sets_per_sample_data_block, n_chan, pack_struct):
-        data = struct.pack("=i4xHHHHHHH64x",
+    def _writeSignalBlock(f, index, date, sample_sets_block, num_sample_sets_per_sample_data_block):
+        f.write(_BLOCK_HEADER_STRUCT.pack(
             int(index * num_sample_sets_per_sample_data_block),
             date.year,
             date.month,
@@ -191,13 +198,8 @@ class Poly5Writer:
             date.hour,
             date.minute,
             date.second
-        )
-        f.write(data)
-        
-        sample_sets_block[n_chan-1::n_chan] = sample_sets_block[n_chan-1::n_chan] % (2**24)
-        
-        bin = pack_struct.pack(*sample_sets_block)
-        f.write(bin)
+        ))
+        f.write(memoryview(sample_sets_block))
 
 class ConsumerThread(threading.Thread):
     def __init__(self, file_writer, name):
@@ -211,107 +213,115 @@ class ConsumerThread(threading.Thread):
         self._sample_rate = file_writer._sample_rate
         self._num_channels = file_writer._num_channels
         self._num_sample_sets_per_sample_data_block = file_writer._num_sample_sets_per_sample_data_block
-        self._sample_sets_in_block = []
-        self.pack_struct = file_writer.pack_struct 
-        self._remaining_samples = np.array([])
+        self._durability_interval = getattr(file_writer, "durability_interval", _DURABILITY_INTERVAL)
+        # Staging array with the sample sets of the data block being filled
+        self._sample_sets_in_block = np.empty(
+            (self._num_sample_sets_per_sample_data_block, self._num_channels), dtype = np.float32)
+        self._num_sample_sets_in_block = 0
+        # Protects the file position, shared with the durability thread
+        self._file_lock = threading.Lock()
 
     def run(self):
-        while ((self.sampling) or (not self.q_sample_sets.empty())) :
-            while not self.q_sample_sets.empty():
-                sd = self.q_sample_sets.get()
-                self.q_sample_sets.task_done()
-                
-                if self._remaining_samples.size:
-                     samples = np.concatenate((self._remaining_samples,sd.samples))
-                else:
-                    samples = np.array(sd.samples)
-                
-                n_samp = int(len(samples) / sd.num_samples_per_sample_set)
-               
-                
-                try:
-                    for i in range(np.int(np.floor(n_samp/self._num_sample_sets_per_sample_data_block))):
-                        self._sample_sets_in_block = samples[i*self._num_sample_sets_per_sample_data_block*sd.num_samples_per_sample_set : (i+1)*self._num_sample_sets_per_sample_data_block*sd.num_samples_per_sample_set]
-                        Poly5Writer._writeSignalBlock(self._fp,\
-                                                        self._sample_set_block_index,\
-                                                        self._date,\
-                                                        self._sample_sets_in_block,\
-                                                        self._num_sample_sets_per_sample_data_block,\
-                                                        self._num_channels, \
-                                                        self.pack_struct)
-                        self._sample_set_block_index += 1
+        if self._durability_interval is not None:
+            durability_thread = DurabilityThread(self, self._durability_interval, name = self.name + ' : durability')
+            durability_thread.start()
+
+        try:
+            while ((self.sampling) or (not self.q_sample_sets.empty())) :
+                while not self.q_sample_sets.empty():
+                    sd = self.q_sample_sets.get()
+                    self.q_sample_sets.task_done()
                     
-                        if not (self._sample_set_block_index % 20): 
-                            # Go back to start and rewrite header
-                            self._fp.seek(0)
-                            Poly5Writer._writeHeader(self._fp,\
-                                                      "measurement",\
-                                                      self._sample_rate,\
-                                                      self._num_channels,\
-                                                      self._sample_set_block_index * self._num_sample_sets_per_sample_data_block,\
-                                                      self._sample_set_block_index,\
-                                                      self._num_sample_sets_per_sample_data_block,\
-                                                      self._date)
-        
-                            # Flush all data from buffers to the file
-                            self._fp.flush()
-                            os.fsync(self._fp.fileno())
-        
-                            # Go back to end of file
-                            self._fp.seek(0, os.SEEK_END)
-                        
-                    i = np.int(np.floor(n_samp / self._num_sample_sets_per_sample_data_block))
-                    ind = np.arange(i*self._num_sample_sets_per_sample_data_block*sd.num_samples_per_sample_set, n_samp*sd.num_samples_per_sample_set)
-                    if ind.any:
-                        self._remaining_samples = samples[ind]
-                    else:
-                        self._remaining_samples = np.array([])
-
-                except:
-                    raise TMSiError(TMSiErrorCode.file_writer_error)
-
-            time.sleep(0.01)
-
-        while self._remaining_samples.any():
+                    try:
+                        self._write_samples(sd.data)
+                    except:
+                        raise TMSiError(TMSiErrorCode.file_writer_error)
+
+                time.sleep(0.01)
+        finally:
+            # Also stop syncing and close the file when writing failed
+            if self._durability_interval is not None:
+                durability_thread.stop()
+                durability_thread.join()
+
             # Last data block is omitted from saving, to prevent an incomplete data block being part of the Poly5 file
             # This would result in 0s at the end of the file
-            if np.shape(self._remaining_samples)[0] < self._num_sample_sets_per_sample_data_block*self._num_channels:
-                self._remaining_samples = np.array([])
+            try:
+                self.sync()
+            finally:
+                self._fp.close()
+        return
 
-            else:
-                self._sample_sets_in_block = self._remaining_samples[:self._num_sample_sets_per_sample_data_block*self._num_channels]
-                
-                self._remaining_samples = self._remaining_samples[self._num_sample_sets_per_sample_data_block*self._num_channels:]
-                
-                Poly5Writer._writeSignalBlock(self._fp,\
-                    self._sample_set_block_index,\
-                    self._date,\
-                    self._sample_sets_in_block,\
-                    self._num_sample_sets_per_sample_data_block,\
-                    self._num_channels, \
-                    self.pack_struct)
-                self._sample_set_block_index += 1
-        
-        # Go back to start and rewrite header
-        self._fp.seek(0)
-        Poly5Writer._writeHeader(self._fp,\
-                                  "measurement",\
-                                  self._sample_rate,\
-                                  self._num_channels,\
-                                  self._sample_set_block_index * self._num_sample_sets_per_sample_data_block,\
-                                  self._sample_set_block_index,\
-                                  self._num_sample_sets_per_sample_data_block,\
-                                  self._date)
-
-        # Flush all data from buffers to the file
-        self._fp.flush()
+    def stop_sampling(self):
+        self.sampling = False;
+
+    def sync(self):
+        """Make the written data blocks durable and update the header, such that 
+        the file is valid after a crash. The header only counts the blocks which 
+        are synced to disk; the file is only locked while flushing and rewriting 
+        the header, never while waiting for the disk.
+        """
+        with self._file_lock:
+            num_blocks = self._sample_set_block_index
+            self._fp.flush()
+        # Data blocks must be on disk before the header refers to them
+        os.fsync(self._fp.fileno())
+        with self._file_lock:
+            # Go back to start and rewrite header
+            self._fp.seek(0)
+            Poly5Writer._writeHeader(self._fp,\
+                                      "measurement",\
+                                      self._sample_rate,\
+                                      self._num_channels,\
+                                      num_blocks * self._num_sample_sets_per_sample_data_block,\
+                                      num_blocks,\
+                                      self._num_sample_sets_per_sample_data_block,\
+                                      self._date)
+            # Go back to end of file, this flushes the header
+            self._fp.seek(0, os.SEEK_END)
         os.fsync(self._fp.fileno())
 
-        # Go back to end of file
-        self._fp.seek(0, os.SEEK_END)
-        
-        self._fp.close()
-        return
+    def _write_samples(self, samples):
+        # samples are channel-major, the file is written per sample set
+        num_sample_sets = np.shape(samples)[1]
+        index = 0
+        while index < num_sample_sets:
+            n_sets = min(self._num_sample_sets_per_sample_data_block - self._num_sample_sets_in_block, 
+                         num_sample_sets - index)
+            block = self._sample_sets_in_block[self._num_sample_sets_in_block:self._num_sample_sets_in_block + n_sets]
+            block[:] = samples[:, index:index + n_sets].T
+            block[:, -1] = samples[-1, index:index + n_sets] % _COUNTER_RANGE
+            self._num_sample_sets_in_block += n_sets
+            index += n_sets
+            
+            if self._num_sample_sets_in_block == self._num_sample_sets_per_sample_data_block:
+                with self._file_lock:
+                    Poly5Writer._writeSignalBlock(self._fp,\
+                                                    self._sample_set_block_index,\
+                                                    self._date,\
+                                                    self._sample_sets_in_block,\
+                                                    self._num_sample_sets_per_sample_data_block)
+                    self._sample_set_block_index += 1
+                self._num_sample_sets_in_block = 0
+
+
+class DurabilityThread(threading.Thread):
+    """Thread which periodically syncs the file of a ConsumerThread to disk, so 
+    the consumer thread never waits for the disk while draining its queue.
+    """
+    def __init__(self, consumer_thread, durability_interval, name):
+        super(DurabilityThread,self).__init__(daemon = True)
+        self.name = name
+        self._consumer_thread = consumer_thread
+        self._durability_interval = durability_interval
+        self._stop_event = threading.Event()
 
-    def stop_sampling(self):
-        self.sampling = False;
\ No newline at end of file
+    def run(self):
+        while not self._stop_event.wait(self._durability_interval):
+            try:
+                self._consumer_thread.sync()
+            except OSError as e:
+                print(e)
+
+    def stop(self):
+        self._stop_event.set()
@@ -35,24 +35,117 @@ import numpy as np
 import tkinter as tk
 from tkinter import filedialog
 import os
+import io
+import time
+import traceback
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 
 from os.path import join, dirname, realpath
 Reader_dir = dirname(realpath(__file__)) # directory of this file
 modules_dir = join(Reader_dir, '../../') # directory with all modules
 
 from TMSiFileFormats.file_readers import Poly5Reader
-from scipy.signal import sosfiltfilt, butter
+from scipy.signal import sosfiltfilt, sosfilt, sosfilt_zi, butter
 from EDFlib.edfwriter import EDFwriter
 
+# Default memory available for the conversions running in parallel (bytes)
+_DEFAULT_MEMORY_BUDGET = 4 * 1024**3
+# Estimated memory of a conversion relative to the size of the poly5-file:
+# float32 samples are read as float64 and filtered into a new array
+_MEMORY_PER_FILE_BYTE = 5
+# Extension of an edf-file which is being written
+_PARTIAL_EXTENSION = '.part'
+# Duration in seconds of the blocks read from the poly5-file in streaming mode
+_STREAMING_BLOCK_DURATION = 30
+# Estimated memory of a conversion in streaming mode (bytes)
+_STREAMING_MEMORY = 512 * 1024**2
+# Overlap between the blocks of the zero-phase filter in streaming mode, as 
+# number of time constants of the filter: the error of the overlap is below exp(-10)
+_OVERLAP_TIME_CONSTANTS = 10
+# Number of data records (seconds) written at once
+_RECORDS_PER_WRITE = 60
+
+class _EDFRecordWriter(EDFwriter):
+    """EDFwriter which writes complete data records at once. EDFwriter.writeSamples
+    converts and writes the samples one by one; here the samples of all signals are
+    converted to int16 together and the data records are written in one call. The
+    header and the annotation signal are still written by EDFwriter."""
+    def writeDataRecords(self, samples, samples_per_record):
+        """Write data records of all signals.
+        samples: physical samples (signals x samples) of which the complete data records are written
+        samples_per_record: number of samples of every signal in a data record
+        Returns 0 on success, otherwise -1."""
+        n_signals = np.shape(samples)[0]
+        n_records = np.shape(samples)[1] // samples_per_record
+        if not (hasattr(self, '_EDFwriter__write_tal') and self._EDFwriter__edf != 0 and 
+                self._EDFwriter__signal_write_sequence_pos == 0):
+            # EDFlib version with other internals or a bdf-file: write the signals one by one
+            fs = samples_per_record
+            for i in range(0, n_records):
+                for j in range(0, n_signals):
+                    if self.writeSamples(np.ascontiguousarray(samples[j,i*fs:(i+1)*fs], dtype=np.float64)) != 0:
+                        return -1
+            return 0
+        if not self._EDFwriter__status_ok:
+            return -1
+        if self._EDFwriter__datarecords == 0:
+            if self._EDFwriter__write_edf_header() != 0:
+                return -1
+        if n_records == 0:
+            return 0
+        
+        # Conversion to digital values like EDFwriter.writeSamples (truncation and clipping)
+        fs = samples_per_record
+        bitvalue = np.array(self._EDFwriter__param_bitvalue[:n_signals])[:, np.newaxis]
+        offset = np.array(self._EDFwriter__param_offset[:n_signals])[:, np.newaxis]
+        digital = np.trunc(samples[:, :n_records * fs] / bitvalue - offset)
+        np.clip(digital, np.array(self._EDFwriter__param_dig_min[:n_signals])[:, np.newaxis], 
+                np.array(self._EDFwriter__param_dig_max[:n_signals])[:, np.newaxis], out=digital)
+        
+        # A data record holds the samples of every signal, followed by the annotation signal
+        data_size = n_signals * fs * 2
+        annotation_size = self._EDFwriter__total_annot_bytes
+        records = np.empty((n_records, data_size + annotation_size), dtype=np.uint8)
+        records[:, :data_size].view('<i2')[:] = digital.reshape(n_signals, n_records, fs).transpose(1, 0, 2).reshape(n_records, -1)
+        annotations = io.BytesIO()
+        for i in range(0, n_records):
+            self._EDFwriter__write_tal(annotations)
+            self._EDFwriter__datarecords += 1
+        records[:, data_size:] = np.frombuffer(annotations.getvalue(), dtype=np.uint8).reshape(n_records, annotation_size)
+        self._EDFwriter__file_out.write(memoryview(records))
+        return 0
+
+def _convert_file_in_process(filename, f_c, streaming, zero_phase):
+    # Convert a single file in a worker process. The output of the conversion
+    # is only returned when it fails, to keep the output of the batch readable.
+    start_time = time.time()
+    output = io.StringIO()
+    try:
+        with redirect_stdout(output):
+            Poly5_to_EDF_Converter(batch=False, filename=filename, f_c=f_c, streaming=streaming, zero_phase=zero_phase)
+        return None, time.time() - start_time
+    except Exception:
+        return output.getvalue() + traceback.format_exc(), time.time() - start_time
+
 class Poly5_to_EDF_Converter:
-    def __init__(self, batch=None, filename=None, foldername=None, f_c=0.1):
+    def __init__(self, batch=None, filename=None, foldername=None, f_c=0.1, n_processes=1, memory_budget=None,
+                 streaming=False, zero_phase=True):
         """Converts poly5-file(s) to edf format. Either a single file or all 
         poly5 files in a folder and its subfolders. 
         batch: True or False: convert batch of files or single file
         filename: full path to file 
         foldername: full path to folder
-        f_c: single value or list of two values; cut-off frequency/frequencies of high pass or bandpass filter"""
+        f_c: single value or list of two values; cut-off frequency/frequencies of high pass or bandpass filter
+        n_processes: number of files converted in parallel in batch mode, defaults to 1 (one after the other). 
+            With more processes the script must start the conversion under an if __name__ == '__main__' guard
+        memory_budget: memory in bytes available for the files converted in parallel, defaults to 4 GB
+        streaming: True or False: convert the files in blocks with constant memory, instead of reading the whole file
+        zero_phase: True or False: filter forward and backward (as without streaming) or only forward (causal) in streaming mode"""
         self.f_c=f_c
+        self.streaming = streaming
+        self.zero_phase = zero_phase
+        self.failed_files = {}
         if not batch:
             if filename==None:
                 root = tk.Tk()
@@ -79,25 +172,185 @@ class Poly5_to_EDF_Converter:
             print('\tTotal number of poly5-files: ', n_poly5)
             print('\tFiles already converted: ', n_poly5-len(conversion_files))
             print('\tFiles to be converted: ', len(conversion_files))
-            for i in range(len(conversion_files)):
-                print('\n\nConvert file ', i+1, 'of', len(conversion_files))
-                self.convertFile(conversion_files[i])      
+            if n_processes is None:
+                n_processes = 1
+            if memory_budget is None:
+                memory_budget = _DEFAULT_MEMORY_BUDGET
+            if n_processes <= 1 or len(conversion_files) <= 1:
+                for i in range(len(conversion_files)):
+                    print('\n\nConvert file ', i+1, 'of', len(conversion_files))
+                    try:
+                        self.convertFile(conversion_files[i])
+                    except Exception:
+                        self.failed_files[conversion_files[i]] = traceback.format_exc()
+                        print('Conversion failed')
+            else:
+                self._convert_files_in_parallel(conversion_files, n_processes, memory_budget)
+            self._print_failure_report()
                              
-        
+    def _convert_files_in_parallel(self, conversion_files, n_processes, memory_budget):
+        """Converts the files in a pool of processes. A file is started when a
+        process is available and its estimated memory fits within the budget;
+        a file which exceeds the budget on its own is converted alone."""
+        # Start with the largest files, the smaller files fill the remaining budget
+        pending = sorted(conversion_files, key=os.path.getsize, reverse=True)
+        running = {}
+        used_memory = 0
+        n_done = 0
+        print('\tFiles converted in parallel: ', n_processes)
+        with ProcessPoolExecutor(max_workers=n_processes) as executor:
+            while pending or running:
+                while pending and len(running) < n_processes:
+                    memory = _MEMORY_PER_FILE_BYTE * os.path.getsize(pending[0])
+                    if self.streaming:
+                        memory = min(memory, _STREAMING_MEMORY)
+                    if running and used_memory + memory > memory_budget:
+                        break
+                    filename = pending.pop(0)
+                    future = executor.submit(_convert_file_in_process, filename, self.f_c, self.streaming, self.zero_phase)
+                    running[future] = (filename, memory)
+                    used_memory += memory
+                    print('Started converting ', filename)
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    filename, memory = running.pop(future)
+                    used_memory -= memory
+                    n_done += 1
+                    try:
+                        error, duration = future.result()
+                    except Exception:
+                        # e.g. the worker process was terminated
+                        error, duration = traceback.format_exc(), 0
+                    if error is None:
+                        print('Converted file', n_done, 'of', len(conversion_files), 'in %0.1f s: ' % duration, filename)
+                    else:
+                        self.failed_files[filename] = error
+                        print('Failed file', n_done, 'of', len(conversion_files), ': ', filename)
+
+    def _print_failure_report(self):
+        if not self.failed_files:
+            return
+        print('\nConversion failed for', len(self.failed_files), 'file(s):')
+        for filename, error in self.failed_files.items():
+            print('\n\t', filename)
+            print(error)
         
     def convertFile(self, filename):
-        self._readData(filename)
-        self._remove_empty_samples()
-        self._filter_data()
+        try:
+            if self.streaming:
+                self._convert_file_streaming(filename)
+            else:
+                self._readData(filename)
+                self._remove_empty_samples()
+                self._filter_data()
+                self._set_physical_range()
+                self._write_edf_meta_data()
+                self._write_edf_data()
+        except Exception:
+            # Do not leave an incomplete edf-file
+            if hasattr(self, "hdl"):
+                try:
+                    self.hdl.close()
+                except Exception:
+                    pass
+            if hasattr(self, "edf_filename") and os.path.isfile(self.edf_filename + _PARTIAL_EXTENSION):
+                os.remove(self.edf_filename + _PARTIAL_EXTENSION)
+            raise
+        # The edf-file gets its name when it is complete, so an interrupted 
+        # batch conversion converts this file again
+        os.replace(self.edf_filename + _PARTIAL_EXTENSION, self.edf_filename)
+
+    def _convert_file_streaming(self, filename):
+        """Converts a file with constant memory. The file is read in blocks 
+        twice: first to determine the physical range of the filtered signals,
+        then to write the edf data records."""
+        self.data = Poly5Reader(filename, lazy=True)
+        self.fs=self.data.sample_rate
+        self.n_signals=self.data.num_channels
+        self._count_analogue_channels()
+        sos = self._get_filter()
+        
+        minimum = np.full(self.n_signals, np.inf)
+        maximum = np.full(self.n_signals, -np.inf)
+        n_samples = 0
+        for block in self._filtered_blocks(sos):
+            np.fmin(minimum, np.nanmin(block, axis=1), out=minimum)
+            np.fmax(maximum, np.nanmax(block, axis=1), out=maximum)
+            n_samples += np.shape(block)[1]
+        self._physical_minimum = list(minimum)
+        self._physical_maximum = list(maximum)
         self._write_edf_meta_data()
-        self._write_edf_data()
-      
+        
+        # Write complete data records, the remaining samples are written with the next block
+        n_blocks = n_samples // self.fs
+        n_written = 0
+        remaining = np.empty((self.n_signals, 0))
+        for block in self._filtered_blocks(sos):
+            block = np.concatenate((remaining, block), axis=1)
+            n_records = min(np.shape(block)[1] // self.fs, n_blocks - n_written)
+            self._write_edf_records(block[:, :n_records * self.fs])
+            remaining = block[:, n_records * self.fs:]
+            n_written += n_records
+            print('\rProgress: % 0.1f %%' %(100*n_written/max(n_blocks, 1)), end="\r")
+        self.hdl.close()
+        self.data.close()
+        print('Done writing data')
+
+    def _read_blocks(self, block_size):
+        """Reads the samples in blocks of block_size samples, without the
+        padding zeros (based on COUNTER channel). The last block can be smaller."""
+        blocks = []
+        n_samples = 0
+        for start in range(0, self.data.num_samples, block_size):
+            block = self.data.read(start, start + block_size).astype(np.float64)
+            blocks.append(block[:, block[-1,:] != 0])
+            n_samples += np.shape(blocks[-1])[1]
+            if n_samples >= block_size:
+                samples = np.concatenate(blocks, axis=1)
+                yield samples[:, :block_size]
+                blocks = [samples[:, block_size:]]
+                n_samples = np.shape(blocks[0])[1]
+        if n_samples > 0:
+            yield np.concatenate(blocks, axis=1)
+
+    def _filtered_blocks(self, sos):
+        """Reads the samples in blocks and filters the analogue channels.
+        Zero-phase filtering is done per block, extended with the samples of the
+        previous and next block (overlap-save); the overlap covers a number of 
+        time constants of the filter, so the result equals filtering the whole file."""
+        block_size = int(_STREAMING_BLOCK_DURATION * self.fs)
+        if not self.zero_phase:
+            zi = None
+            for block in self._read_blocks(block_size):
+                if zi is None:
+                    # start in the steady state of the first sample
+                    zi = sosfilt_zi(sos)[:, np.newaxis, :] * block[np.newaxis, :self.n_analogue, :1]
+                block[:self.n_analogue,:], zi = sosfilt(sos, block[:self.n_analogue,:], zi=zi)
+                yield block
+            return
+        
+        f_low = self.f_c if not isinstance(self.f_c, list) else self.f_c[0]
+        overlap = int(np.ceil(_OVERLAP_TIME_CONSTANTS * self.fs / (2 * np.pi * f_low)))
+        blocks = self._read_blocks(max(block_size, overlap))
+        previous = np.empty((self.n_signals, 0))
+        current = next(blocks, None)
+        while current is not None:
+            following = next(blocks, None)
+            start = min(np.shape(previous)[1], overlap)
+            segment = np.concatenate((previous[:, np.shape(previous)[1] - start:], current, 
+                                      following[:, :overlap] if following is not None else previous[:, :0]), axis=1)
+            segment[:self.n_analogue,:] = sosfiltfilt(sos, segment[:self.n_analogue,:])
+            yield segment[:, start:start + np.shape(current)[1]]
+            previous = current
+            current = following
         
     def _readData(self, filename):
         self.data = Poly5Reader(filename)
         self.fs=self.data.sample_rate
         self.n_signals=len(self.data.samples) 
-        
+        self._count_analogue_channels()
+
+    def _count_analogue_channels(self):
         self.n_analogue=0
         for chan in range(0, self.n_signals):
             if 'Volt' in self.data.ch_unit_names[chan]:
@@ -111,14 +364,22 @@ class Poly5_to_EDF_Converter:
         
     def _filter_data(self):
         """low-pass filter data of analogue channels to remove offset and drift"""
+        sos = self._get_filter()
+        self.data.samples[:self.n_analogue,:] = sosfiltfilt(sos, self.data.samples[:self.n_analogue,:])
+
+    def _get_filter(self):
+        """filter coefficients of the high pass or bandpass filter"""
         if not isinstance(self.f_c, list):
             print('Data is high-pass filtered with cut-off frequency ', self.f_c, 'Hz')
-            sos = butter(1, self.f_c/(self.fs/2), btype='highpass', output='sos')
-            self.data.samples[:self.n_analogue,:] = sosfiltfilt(sos, self.data.samples[:self.n_analogue,:])
+            return butter(1, self.f_c/(self.fs/2), btype='highpass', output='sos')
         else:
             print('Data is band-pass filtered with cut-off frequencies ', self.f_c[0], 'Hz and', self.f_c[1], 'Hz')
-            sos = butter(1, [self.f_c[0]/(self.fs/2), self.f_c[1]/(self.fs/2)] , btype='bandpass', output='sos')
-            self.data.samples[:self.n_analogue,:] = sosfiltfilt(sos, self.data.samples[:self.n_analogue,:])
+            return butter(1, [self.f_c[0]/(self.fs/2), self.f_c[1]/(self.fs/2)] , btype='bandpass', output='sos')
+
+    def _set_physical_range(self):
+        """determine minima and maxima of the channels"""
+        self._physical_minimum = list(np.nanmin(self.data.samples, axis=1))
+        self._physical_maximum = list(np.nanmax(self.data.samples, axis=1))
         
     def _write_edf_meta_data(self):
         """"write edf meta-data to file"""
@@ -126,7 +387,7 @@ class Poly5_to_EDF_Converter:
         self.edf_filename=self.edf_filename.replace('Poly5', 'edf')
         print('Writing to file ', self.edf_filename)
         
-        self.hdl = EDFwriter(self.edf_filename, EDFwriter.EDFLIB_FILETYPE_EDFPLUS, self.n_signals)
+        self.hdl = _EDFRecordWriter(self.edf_filename + _PARTIAL_EXTENSION, EDFwriter.EDFLIB_FILETYPE_EDFPLUS, self.n_signals)
              
         for chan in range(0, self.n_signals):
             #write sample frequency, channel name and dimension
@@ -136,15 +397,15 @@ class Poly5_to_EDF_Converter:
 
             
             #write minima and maxima
-            if max(self.data.samples[chan,:]) == min(self.data.samples[chan,:]):
-                self.hdl.setPhysicalMaximum(chan, max(self.data.samples[chan,:])+100) 
-                self.hdl.setPhysicalMinimum(chan, min(self.data.samples[chan,:])) 
+            if self._physical_maximum[chan] == self._physical_minimum[chan]:
+                self.hdl.setPhysicalMaximum(chan, self._physical_maximum[chan]+100) 
+                self.hdl.setPhysicalMinimum(chan, self._physical_minimum[chan]) 
                 self.hdl.setDigitalMaximum(chan, 32767) 
                 self.hdl.setDigitalMinimum(chan, -32768)
             elif 'V' in self.data.ch_unit_names[chan]:
                 # analogue channels
-                self.hdl.setPhysicalMaximum(chan, max(self.data.samples[chan,:])) 
-                self.hdl.setPhysicalMinimum(chan, min(self.data.samples[chan,:])) 
+                self.hdl.setPhysicalMaximum(chan, self._physical_maximum[chan]) 
+                self.hdl.setPhysicalMinimum(chan, self._physical_minimum[chan]) 
                 self.hdl.setDigitalMaximum(chan, 32767)
                 self.hdl.setDigitalMinimum(chan, -32768)
                 if not isinstance(self.f_c, list):
@@ -159,9 +420,9 @@ class Poly5_to_EDF_Converter:
                 self.hdl.setDigitalMinimum(chan, 0) 
             else:
                 # other digital channels
-                self.hdl.setPhysicalMaximum(chan, max(self.data.samples[chan,:])) 
-                if min(self.data.samples[chan,:])<0:
-                    self.hdl.setPhysicalMinimum(chan, min(self.data.samples[chan,:]))
+                self.hdl.setPhysicalMaximum(chan, self._physical_maximum[chan]) 
+                if self._physical_minimum[chan]<0:
+                    self.hdl.setPhysicalMinimum(chan, self._physical_minimum[chan])
                 else: 
                     self.hdl.setPhysicalMinimum(chan, 0) 
                 self.hdl.setDigitalMaximum(chan, 32767) 
@@ -172,18 +433,18 @@ class Poly5_to_EDF_Converter:
         n_blocks=np.int64(np.floor((np.size(self.data.samples)/self.n_signals)/self.fs))
         fs=self.fs
             
-        for i in range(0, n_blocks):
-            for j in range(0, self.n_signals-1):
-            
-              self.hdl.writeSamples(self.data.samples[j,i*self.fs:(i+1)*fs])
-             
-
-            j=j+1
-            self.hdl.writeSamples(self.data.samples[j,i*fs:(i+1)*fs] % fs)
-
+        for i in range(0, n_blocks, _RECORDS_PER_WRITE):
+            self._write_edf_records(self.data.samples[:,i*fs:min(i+_RECORDS_PER_WRITE, n_blocks)*fs])
 
             print('\rProgress: % 0.1f %%' %(100*i/n_blocks), end="\r")
 
         self.hdl.close()
         print('Done writing data')
-                          
\ No newline at end of file
+
+    def _write_edf_records(self, samples):
+        """write data records of one second to the edf-file"""
+        fs=self.fs
+        records=np.array(samples[:, :(np.shape(samples)[1] // fs) * fs])
+        records[-1,:] = records[-1,:] % fs
+        if self.hdl.writeDataRecords(records, fs) != 0:
+            raise RuntimeError('Writing data records to ' + self.edf_filename + ' failed')
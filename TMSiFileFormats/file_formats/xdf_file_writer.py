@@ -44,6 +44,7 @@ import os
 
 from TMSiSDK.device.tmsi_device import TMSiDevice
 from TMSiSDK.sample_data_server.sample_data_server import SampleDataServer 
+from TMSiSDK.sample_data_server.sample_data import DeliveryPolicy
 from TMSiSDK.tmsi_errors.error import TMSiError, TMSiErrorCode, DeviceErrorLookupTable
 from TMSiSDK.device import ChannelType
 from TMSiSDK.device.devices.saga.saga_API_enums import RefMethod
@@ -55,6 +56,10 @@ measurements_dir = join(Writer_dir, '../../measurements') # directory with all m
 modules_dir = join(Writer_dir, '../../') # directory with all modules
 
 _QUEUE_SIZE_SAMPLE_SETS = 1000
+# Interval in seconds between two ClockOffset-chunks
+_CLOCK_OFFSET_INTERVAL = 5.0
+_TIME_STAMP_STRUCT = struct.Struct("<Bd")
+_CLOCK_OFFSET_STRUCT = struct.Struct("<dd")
 
 
 class ChunkTag(IntEnum):
@@ -67,6 +72,16 @@ class ChunkTag(IntEnum):
     stream_footer = 6
 
 
+def _sample_set_dtype(n_chan):
+    """Returns the structured dtype of one sample-set in a Samples-chunk, without 
+    padding: a time-stamp-byte followed by n_chan float32 samples.
+
+        Args:
+            n_chan : 'int' number of channels
+    """
+    return np.dtype([('time_stamp_bytes', 'u1'), ('samples', '<f4', (n_chan,))])
+
+
 def xml_etree_to_string(elem):
     """Returns a XML string for the XML Element.
 
@@ -143,12 +158,10 @@ class XdfWriter:
             size_one_sample_set = self._num_channels * 4
             if ((self._num_sample_sets_per_sample_data_block * size_one_sample_set) > 64000):
                  self._num_sample_sets_per_sample_data_block = int(64000 / size_one_sample_set)
-                 
-            fmt = 'f'*self._num_channels
-            self.pack_struct = struct.Struct(fmt)     
 
             # 5. Register at the sample-data-server and start the sampling-thread
-            SampleDataServer().register_consumer(self.device.get_id(), self.q_sample_sets)
+            # The file must contain all samples: they are kept for the writer when it falls behind
+            SampleDataServer().register_consumer(self.device.get_id(), self.q_sample_sets, DeliveryPolicy.block)
             self._sampling_thread = ConsumerThread(self, name='Xdf-writer : dev-id-' + str(self.device.get_id()))
             self._sampling_thread.start()
         except:
@@ -186,46 +199,26 @@ class XdfWriter:
     
     def _write_data_streams_into_file(self, streams):
         """Method that writes the streams for offline saving of data streams"""
-        n_ch = len(streams)
-        fmt = 'f'*n_ch
-        self.pack_struct = struct.Struct(fmt)  
+        # streams are channel-major
+        streams = np.asarray(streams, dtype = np.float32)
+        n_ch, n_samp = np.shape(streams)
         _num_sample_sets_per_sample_data_block = int(6400000 / 4 / n_ch)
         self._num_written_sample_sets = 0
-        _sample_set_block_index = 0
         _boundary_chunk_counter = 0
         _boundary_chunk_counter_threshold = 10 * self._sample_rate
-        n_samp = int(len(streams[0]) * len(streams) / n_ch)
-        n_iter = np.int(np.floor(n_samp/_num_sample_sets_per_sample_data_block))
+        n_iter = -(-n_samp // _num_sample_sets_per_sample_data_block)
         try:
             for i in range(n_iter):
-                time_range = [j for j in range(i*_num_sample_sets_per_sample_data_block,(i+1)*_num_sample_sets_per_sample_data_block)]
-                self._sample_sets_in_block = [streams[n_channel][n_sample] for n_sample in time_range for n_channel in range(len(streams))]
                 print("\rwriting progress: {:.2f}%\r".format(100*i/n_iter), end="\r")
-                XdfWriter._write_sample_chunk(self._fp,\
-                                            self._sample_sets_in_block,\
-                                            _num_sample_sets_per_sample_data_block, \
-                                            n_chan=n_ch, \
-                                            pack_struct=self.pack_struct)
-            
-                self._num_written_sample_sets += _num_sample_sets_per_sample_data_block
-                _sample_set_block_index += 1
-
+                self._sample_sets_in_block = streams[:, i*_num_sample_sets_per_sample_data_block:(i+1)*_num_sample_sets_per_sample_data_block].T
+                XdfWriter._write_sample_chunk(self._fp, self._sample_sets_in_block)
+                self._num_written_sample_sets += np.shape(self._sample_sets_in_block)[0]
     
                 # Write approximately every 10 seconds a Boundary-chunk
-                _boundary_chunk_counter += _num_sample_sets_per_sample_data_block
+                _boundary_chunk_counter += np.shape(self._sample_sets_in_block)[0]
                 if (_boundary_chunk_counter >= _boundary_chunk_counter_threshold):
                     XdfWriter._write_boundary_chunk(self._fp)
                     _boundary_chunk_counter = 0
-            
-            # Store remaining samples for next repetion
-            i = np.int(np.floor(n_samp/_num_sample_sets_per_sample_data_block))
-            time_range = [j for j in range(i*_num_sample_sets_per_sample_data_block,n_samp)]
-            self._sample_sets_in_block = [streams[n_channel][n_sample] for n_sample in time_range for n_channel in range(len(streams))]
-            XdfWriter._write_sample_chunk(self._fp,\
-                                        self._sample_sets_in_block,\
-                                        n_samp-i*_num_sample_sets_per_sample_data_block, \
-                                        n_chan=n_ch, \
-                                        pack_struct=self.pack_struct)
             print("\rwriting progress: 100.00%") 
 
         except:
@@ -234,14 +227,16 @@ class XdfWriter:
     def close(self):
         """ Closes a xdf file-writer session.
 
-            1. Stops the sampling-thread
-            2. Writes the StreamFooter-chunk (by the sampling-thread)
-            3. Closes the xdf-file (by the sampling-thread)
+            1. Unregisters from the sample data server, the samples still waiting are delivered
+            2. Stops the sampling-thread
+            3. Writes the StreamFooter-chunk (by the sampling-thread)
+            4. Closes the xdf-file (by the sampling-thread)
         """
         print("XdfWriter-close")
-        self._sampling_thread.stop_sampling()
-        
+        # Unregister first: the samples still waiting for the writer are delivered to its queue
         SampleDataServer().unregister_consumer(self.device.get_id(), self.q_sample_sets)
+        
+        self._sampling_thread.stop_sampling()
 
 
     @staticmethod
@@ -570,12 +565,13 @@ class XdfWriter:
         # Write the StreamHeader-cunk
         XdfWriter._write_chunk(self._fp, 4, ChunkTag.stream_header, xml_etree_to_string(de_info))
 
-    def _write_stream_footer_chunk(self, first_timestamp, last_timestamp, sample_count, sample_rate):
+    def _write_stream_footer_chunk(self, first_timestamp, last_timestamp, sample_count, sample_rate, clock_offsets = None):
         """ Writes the StreamFooter-chunk :
              - first timestamp in seconds
              - last timestamp in seconds
              - sample-set count
              - sample rate
+             - clock offsets (when available)
 
             Args:
                 first_timestamp : timestart measurement start
@@ -583,6 +579,7 @@ class XdfWriter:
                 sample_count : Total number of sample-sets written to the xdf-file
                 sample_rate : int' The rate of the current configuration, with which
                                    sample-sets are sent during a measurement.
+                clock_offsets : 'list' (collection time, offset value) of the written ClockOffset-chunks
 
         """
         data = ET.Element('info')
@@ -594,32 +591,53 @@ class XdfWriter:
         item_channel_count.text =  str(sample_count)
         item_nominal_srate = ET.SubElement(data, 'measured_srate')
         item_nominal_srate.text =  str(sample_rate)
+        if clock_offsets:
+            de_clock_offsets = ET.SubElement(data, 'clock_offsets')
+            for collection_time, offset_value in clock_offsets:
+                de_offset = ET.SubElement(de_clock_offsets, 'offset')
+                item_time = ET.SubElement(de_offset, 'time')
+                item_time.text = str(collection_time)
+                item_value = ET.SubElement(de_offset, 'value')
+                item_value.text = str(offset_value)
 
         XdfWriter._write_chunk(self._fp, 4, ChunkTag.stream_footer, xml_etree_to_string(data))
 
+    @staticmethod
+    def _write_clock_offset_chunk(f, collection_time, offset_value):
+        """ Writes the ClockOffset-chunk :
+
+            Args:
+                f : 'file-object' of the xdf-file
+                collection_time : time in seconds on the clock of the recording at which the offset was measured
+                offset_value : offset in seconds to add to the time-stamps of the stream to get the time of the recording
+
+        """
+        XdfWriter._write_chunk(f, 4, ChunkTag.clock_offset, _CLOCK_OFFSET_STRUCT.pack(collection_time, offset_value))
 
     @staticmethod
-    def _write_sample_chunk(f, sample_sets, num_sample_sets, n_chan, pack_struct):
+    def _write_sample_chunk(f, sample_sets, first_time_stamp = None):
         """ Writes the Samples-chunk :
 
             Args:
                 f : 'file-object' of the xdf-file
-                sample_sets : list of <SampleSet>
-                num_sample_sets : Number of sample-sets to write
+                sample_sets : 'numpy.ndarray' sample-sets to write (sample-sets x channels)
+                first_time_stamp : 'float' explicit time-stamp in seconds of the first sample-set, 
+                                   None when it follows the previous sample-set at the nominal rate
 
         """
-        sample_chunk = bytearray();
+        num_sample_sets, n_chan = np.shape(sample_sets)
         num_sample_bytes = int(4)
-        ts = int(0)
         
-        sample_chunk += num_sample_bytes.to_bytes(1, 'little')
-        sample_chunk += num_sample_sets.to_bytes(4, 'little')
+        # Every sample-set is a time-stamp-byte (0: no time-stamp) followed by the samples
+        sample_chunk = np.zeros(num_sample_sets, dtype = _sample_set_dtype(n_chan))
+        sample_chunk['samples'] = sample_sets
+        chunk_data = num_sample_bytes.to_bytes(1, 'little') + num_sample_sets.to_bytes(4, 'little')
+        if first_time_stamp is not None and num_sample_sets > 0:
+            # First sample-set with a time-stamp-byte of 8 followed by a double
+            chunk_data += _TIME_STAMP_STRUCT.pack(8, first_time_stamp) + sample_chunk[:1]['samples'].tobytes()
+            sample_chunk = sample_chunk[1:]
         
-        for i in range(num_sample_sets):
-            sample_chunk += ts.to_bytes(1, 'little')
-            sample_chunk += pack_struct.pack(*sample_sets[i*n_chan:(i+1)*n_chan])
-        
-        XdfWriter._write_chunk(f, 4, ChunkTag.samples, sample_chunk)
+        XdfWriter._write_chunk(f, 4, ChunkTag.samples, chunk_data + sample_chunk.tobytes())
 
     @staticmethod
     def _write_boundary_chunk(f):
@@ -641,14 +659,25 @@ class ConsumerThread(threading.Thread):
         self.q_sample_sets = file_writer.q_sample_sets
         self.sampling = True
         self._sample_set_block_index = 0
-        self._start_time = time.time()
         self._num_sample_sets_per_sample_data_block = file_writer._num_sample_sets_per_sample_data_block
-        self._sample_sets_in_block = []
+        # Staging array with the sample-sets of the Samples-chunk being filled
+        self._sample_sets_in_block = np.empty(
+            (self._num_sample_sets_per_sample_data_block, file_writer._num_channels), dtype = np.float32)
+        self._num_sample_sets_in_block = 0
         self._num_written_sample_sets = 0
         self._boundary_chunk_counter_threshold = self._fw._sample_rate * 10
         self._boundary_chunk_counter = 0
-        self.pack_struct=file_writer.pack_struct 
-        self._remaining_samples=np. array([])
+        # Time-stamps are derived from the COUNTER-channel (last channel) and anchored
+        # once to the local clock. The drift between both clocks is written in ClockOffset-chunks.
+        self._time_anchor = None
+        self._next_sample_index = 0
+        self._last_counter = None
+        self._block_time_stamp = None
+        self._first_time_stamp = None
+        self._last_time_stamp = None
+        self._min_clock_offset = None
+        self._last_clock_offset_time = None
+        self._clock_offsets = []
 
     def run(self):
         
@@ -657,66 +686,112 @@ class ConsumerThread(threading.Thread):
                 #Request sample data
                 sd = self.q_sample_sets.get()
                 self.q_sample_sets.task_done()
-                             
-                #Combine with previous data
-                if self._remaining_samples.size:
-                      samples = np.concatenate((self._remaining_samples,sd.samples))
-                else:
-                    samples = np.array(sd.samples)
-                
-                n_samp = int(len(samples) / sd.num_samples_per_sample_set)
                 
                 try:
-                    # Collect the sample-sets:
-                    # When collected enough to fill a sample-data-block, write it to a Samples-chunk
-                    for i in range(np.int(np.floor(n_samp / self._num_sample_sets_per_sample_data_block))):
-                        self._sample_sets_in_block=samples[i*self._num_sample_sets_per_sample_data_block*sd.num_samples_per_sample_set:(i+1)*self._num_sample_sets_per_sample_data_block*sd.num_samples_per_sample_set]
-                        XdfWriter._write_sample_chunk(self._fw._fp,\
-                                                    self._sample_sets_in_block,\
-                                                    self._num_sample_sets_per_sample_data_block, \
-                                                    n_chan=sd.num_samples_per_sample_set, \
-                                                    pack_struct=self.pack_struct)
-                        self._num_written_sample_sets += self._num_sample_sets_per_sample_data_block
-                        self._sample_set_block_index += 1
-            
-              
-                        # Write approximately every 10 seconds a Boundary-chunk
-                        self._boundary_chunk_counter += self._num_sample_sets_per_sample_data_block
-                        if (self._boundary_chunk_counter >= self._boundary_chunk_counter_threshold):
-                            XdfWriter._write_boundary_chunk(self._fw._fp)
-                            self._boundary_chunk_counter = 0
-                    
-                    # Store remaining samples for next repetion
-                    i = np.int(np.floor(n_samp/self._num_sample_sets_per_sample_data_block))
-                    ind = np.arange(i*self._num_sample_sets_per_sample_data_block*sd.num_samples_per_sample_set, n_samp*sd.num_samples_per_sample_set)
-                    if ind.any:
-                        self._remaining_samples=samples[ind]
-                    else:
-                        self._remaining_samples=np. array([])
-
+                    self._write_samples(sd.data, time.perf_counter())
                 except:
                     raise TMSiError(TMSiErrorCode.file_writer_error)
 
             time.sleep(0.01)
        
         #Handle remaining samples before closing file
-        if self._remaining_samples.any():
-            self._sample_sets_in_block = np.zeros(self._num_sample_sets_per_sample_data_block*sd.num_samples_per_sample_set)
-            self._sample_sets_in_block[:len(self._remaining_samples)] = self._remaining_samples
-            
-            XdfWriter._write_sample_chunk(self._fw._fp,\
-                                                    self._sample_sets_in_block,\
-                                                    self._num_sample_sets_per_sample_data_block, n_chan=sd.num_samples_per_sample_set, pack_struct=self.pack_struct)
-
+        if self._num_sample_sets_in_block > 0:
+            self._write_block(self._sample_sets_in_block[:self._num_sample_sets_in_block])
+        if self._min_clock_offset is not None:
+            self._write_clock_offset(time.perf_counter())
         
         # When done : write the StreamFoot-cunk and close the file
-        elapsed_time = time.time() - self._start_time
-        self._fw._write_stream_footer_chunk(0, int(elapsed_time), self._num_written_sample_sets, self._fw._sample_rate)
+        first_time_stamp = self._first_time_stamp if self._first_time_stamp is not None else 0
+        last_time_stamp = self._last_time_stamp if self._last_time_stamp is not None else 0
+        if last_time_stamp > first_time_stamp:
+            measured_srate = (self._num_written_sample_sets - 1) / (last_time_stamp - first_time_stamp)
+        else:
+            measured_srate = self._fw._sample_rate
+        self._fw._write_stream_footer_chunk(first_time_stamp, last_time_stamp, self._num_written_sample_sets, 
+                                            measured_srate, self._clock_offsets)
 
         print(self.name, " ready, closing file")
         self._fw._fp.close()
         return
 
+    def _write_samples(self, samples, receive_time):
+        # Determine the index of the first sample-set on the device clock:
+        # A jump in the COUNTER-channel means sample-sets were lost
+        num_sample_sets = np.shape(samples)[1]
+        if num_sample_sets == 0:
+            return
+        sample_rate = self._fw._sample_rate
+        counter = samples[-1]
+        if self._time_anchor is None:
+            self._time_anchor = receive_time - (num_sample_sets - 1) / sample_rate
+        elif self._last_counter is not None and np.isfinite(counter[0]):
+            # A missing sample-set (NaN COUNTER, e.g. wireless) gives no gap information,
+            # the sample-sets then follow at the nominal sampling frequency
+            gap = int(counter[0] - self._last_counter) - 1
+            if gap > 0:
+                # Close the current Samples-chunk, the next one starts with an explicit time-stamp
+                if self._num_sample_sets_in_block > 0:
+                    self._write_block(self._sample_sets_in_block[:self._num_sample_sets_in_block])
+                    self._num_sample_sets_in_block = 0
+                self._next_sample_index += gap
+        finite = np.flatnonzero(np.isfinite(counter))
+        if len(finite) > 0:
+            # Last finite COUNTER, advanced by the sample-sets following it in the block
+            self._last_counter = counter[finite[-1]] + (num_sample_sets - 1 - finite[-1])
+        
+        # Keep track of the smallest delay between the device clock and the local clock
+        first_index = self._next_sample_index
+        self._next_sample_index += num_sample_sets
+        offset = receive_time - self._device_time(self._next_sample_index - 1)
+        if self._min_clock_offset is None or offset < self._min_clock_offset:
+            self._min_clock_offset = offset
+        if self._last_clock_offset_time is None:
+            self._last_clock_offset_time = receive_time
+        elif receive_time - self._last_clock_offset_time >= _CLOCK_OFFSET_INTERVAL:
+            self._write_clock_offset(receive_time)
+
+        # Collect the sample-sets:
+        # When collected enough to fill a sample-data-block, write it to a Samples-chunk
+        index = 0
+        while index < num_sample_sets:
+            if self._num_sample_sets_in_block == 0:
+                self._block_time_stamp = self._device_time(first_index + index)
+            n_sets = min(self._num_sample_sets_per_sample_data_block - self._num_sample_sets_in_block, 
+                         num_sample_sets - index)
+            self._sample_sets_in_block[self._num_sample_sets_in_block:self._num_sample_sets_in_block + n_sets] = \
+                samples[:, index:index + n_sets].T
+            self._num_sample_sets_in_block += n_sets
+            index += n_sets
+            if self._num_sample_sets_in_block == self._num_sample_sets_per_sample_data_block:
+                self._write_block(self._sample_sets_in_block)
+                self._num_sample_sets_in_block = 0
+
+    def _device_time(self, sample_index):
+        return self._time_anchor + sample_index / self._fw._sample_rate
+
+    def _write_clock_offset(self, collection_time):
+        # The smallest offset measured within the interval is the best estimate of the
+        # clock offset, larger offsets are caused by transport and scheduling delays
+        XdfWriter._write_clock_offset_chunk(self._fw._fp, collection_time, self._min_clock_offset)
+        self._clock_offsets.append((collection_time, self._min_clock_offset))
+        self._min_clock_offset = None
+        self._last_clock_offset_time = collection_time
+
+    def _write_block(self, sample_sets):
+        num_sample_sets = np.shape(sample_sets)[0]
+        XdfWriter._write_sample_chunk(self._fw._fp, sample_sets, self._block_time_stamp)
+        if self._first_time_stamp is None:
+            self._first_time_stamp = self._block_time_stamp
+        self._last_time_stamp = self._block_time_stamp + (num_sample_sets - 1) / self._fw._sample_rate
+        self._num_written_sample_sets += num_sample_sets
+        self._sample_set_block_index += 1
+
+        # Write approximately every 10 seconds a Boundary-chunk
+        self._boundary_chunk_counter += num_sample_sets
+        if (self._boundary_chunk_counter >= self._boundary_chunk_counter_threshold):
+            XdfWriter._write_boundary_chunk(self._fw._fp)
+            self._boundary_chunk_counter = 0
+
     def stop_sampling(self):
         print(self.name, " stop sampling")
         self.sampling = False;
\ No newline at end of file
@@ -32,4 +32,6 @@ limitations under the License.
 
 from .poly5reader import Poly5Reader
 from .xdf_reader import Xdf_Reader
-from .edf_reader import Edf_Reader
\ No newline at end of file
+from .xdf_stream_reader import XdfStreamReader
+from .edf_reader import Edf_Reader
+from .tmsi_reader import TMSiReader
\ No newline at end of file
@@ -34,13 +34,16 @@ import tkinter as tk
 from tkinter import filedialog
 import mne
 import pandas as pd
+import numpy as np
+
+from .tmsi_reader import TMSiReader
 
 from os.path import join, dirname, realpath
 Reader_dir = dirname(realpath(__file__)) # directory of this file
 modules_dir = join(Reader_dir, '../../') # directory with all modules
 
-class Edf_Reader:
-    def __init__(self, filename=None, add_ch_locs=False):
+class Edf_Reader(TMSiReader):
+    def __init__(self, filename=None, add_ch_locs=False, lazy=False):
         if filename==None:
             root = tk.Tk()
             filename = filedialog.askopenfilename(title = 'Select edf-file', filetypes = (('edf-files', '*.edf'),('All files', '*.*')))
@@ -48,7 +51,9 @@ class Edf_Reader:
             
         # read raw edf-file
         # change channel type of COUNTER channel to misc
-        mne_object=mne.io.read_raw_edf(filename, misc=[-2], preload=True)
+        # in lazy mode samples are only read from the file on request
+        mne_object=mne.io.read_raw_edf(filename, misc=[-2], preload=not lazy)
+        self.lazy = lazy
         
         if add_ch_locs:
             # add channel locations from txt file
@@ -65,10 +70,23 @@ class Edf_Reader:
                     pass
 
         # unit conversion of eeg channels
-        mne_object.apply_function(lambda x: x*1e-6, picks='eeg')
+        if lazy:
+            self._scale = np.ones(len(mne_object.ch_names))
+            self._scale[mne.pick_types(mne_object.info, meg=False, eeg=True, exclude=())] = 1e-6
+        else:
+            mne_object.apply_function(lambda x: x*1e-6, picks='eeg')
         
         self.mne_object=mne_object
         
+    def get_reader_channels(self) -> list:
+        return self.mne_object.ch_names
+
+    def get_reader_number_of_samples(self) -> int:
+        return self.mne_object.n_times
+
+    def get_reader_sampling_frequency(self) -> float:
+        return self.mne_object.info['sfreq']
+
     def add_impedances(self, imp_filename=None):
         """Add impedances from .txt-file """
         if imp_filename==None:
@@ -85,4 +103,10 @@ class Edf_Reader:
                 if self.mne_object.info['chs'][ch]['ch_name'] == imp_df['ch_name'][i_ch]:
                     impedances.append(imp_df['impedance'][i_ch])
                     
-        self.mne_object.impedances = impedances
\ No newline at end of file
+        self.mne_object.impedances = impedances
+
+    def _read_window(self, start_sample, stop_sample):
+        window = self.mne_object.get_data(start = start_sample, stop = stop_sample)
+        if self.lazy:
+            window *= self._scale[:, np.newaxis]
+        return window
@@ -37,8 +37,14 @@ import mne
 import tkinter as tk
 from tkinter import filedialog
 
-class Poly5Reader: 
-    def __init__(self, filename=None, readAll = True):
+from .tmsi_reader import TMSiReader
+
+_HEADER_SIZE = 217
+_SIGNAL_DESCRIPTION_SIZE = 136
+_BLOCK_HEADER_SIZE = 86
+
+class Poly5Reader(TMSiReader): 
+    def __init__(self, filename=None, readAll = True, lazy = False):
         if filename==None:
             root = tk.Tk()
 
@@ -47,6 +53,7 @@ class Poly5Reader:
             
         self.filename = filename
         self.readAll = readAll
+        self.lazy = lazy
         print('Reading file ', filename)
         self._readFile(filename)
         
@@ -97,7 +104,7 @@ class Poly5Reader:
         # convert from microvolts to volts if necessary
         scale = np.array([1e-6 if (u == "µVolt" or u == "uVolt") else 1 for u in units])
 
-        raw = mne.io.RawArray(self.samples * np.expand_dims(scale, axis=1), info)
+        raw = mne.io.RawArray(self._get_samples() * np.expand_dims(scale, axis=1), info)
         return raw
         
     def _readFile(self, filename):
@@ -110,39 +117,20 @@ class Poly5Reader:
                 self._myfmt = 'f' * self.num_channels*self.num_samples_per_block
                 self._buffer_size = self.num_channels*self.num_samples_per_block
                 
-                if self.readAll:
-                    sample_buffer = np.zeros(self.num_channels * self.num_samples)
-     
-                    for i in range(self.num_data_blocks):
-                        print('\rProgress: % 0.1f %%' %(100*i/self.num_data_blocks), end="\r")
-                         
-                        # Check whether final data block is filled completely or not
-                        if i == self.num_data_blocks-1:
-                            _final_block_size = self.num_samples / self.num_data_blocks
-                            if _final_block_size % self.num_samples_per_block != 0:
-                                data_block = self._readSignalBlock(file_obj, 
-                                                                   buffer_size = (self.num_samples%self.num_samples_per_block) * self.num_channels, 
-                                                                   myfmt = 'f' * (self.num_samples%self.num_samples_per_block) * self.num_channels)
-                            else:
-                                data_block = self._readSignalBlock(file_obj, self._buffer_size, self._myfmt)
-                        else:
-                            data_block = self._readSignalBlock(file_obj, self._buffer_size, self._myfmt)
-                        
-                        # Get indices that need to be filled in the samples array
-                        i1 = i * self.num_samples_per_block * self.num_channels
-                        i2 = (i+1) * self.num_samples_per_block * self.num_channels
-                        
-                        # Correct for final data block if this is not fully filled
-                        if i2 >= self.num_samples * self.num_channels:
-                            i2 = self.num_samples * self.num_channels
-                        
-                        # Insert the read data_block into the sample_buffer array
-                        sample_buffer[i1:i2] = data_block
-                       
-                    samples=np.transpose(np.reshape(sample_buffer, [self.num_samples, self.num_channels]))
-                    
-                    ch_names = [s._Channel__name for s in self.channels]
-                    self.ch_unit_names = [s._Channel__unit_name for s in self.channels]
+                ch_names = [s._Channel__name for s in self.channels]
+                self.ch_unit_names = [s._Channel__unit_name for s in self.channels]
+                self._channel_conversion_list = self._get_channel_conversion_list(ch_names)
+                
+                if self.lazy:
+                    # Samples are read from the memory mapped file on request
+                    self._map_file(filename)
+                    self.ch_names = [ch_names[i] for i in self._channel_conversion_list]
+                    self.file_obj.close()
+
+                elif self.readAll:
+                    self._map_file(filename)
+                    samples = self._read_mapped(0, self.num_samples, np.arange(self.num_channels)).astype(np.float64)
+                    self._unmap_file()
                     
                     self.samples, self.ch_names = self._reorder_grid(samples, ch_names)
 
@@ -156,6 +144,37 @@ class Poly5Reader:
             print('Could not open file. ')
         
         
+    def get_reader_channels(self) -> list:
+        return self.ch_names
+
+    def get_reader_number_of_samples(self) -> int:
+        return self.num_samples
+
+    def get_reader_sampling_frequency(self) -> float:
+        return self.sample_rate
+
+    def read(self, start_sample, stop_sample, channels = None):
+        """Read a window of samples. In lazy mode only the data blocks containing 
+        the window are read from the file.
+
+        :param start_sample: index of the first sample to read
+        :type start_sample: int
+        :param stop_sample: index after the last sample to read
+        :type stop_sample: int
+        :param channels: indices of the channels to read, in the order of ch_names, None to read all channels, defaults to None
+        :type channels: list[int], optional
+        :return: samples of the channels in the window, limited to the samples in the file
+        :rtype: numpy.ndarray[float32] (channels x samples)
+        """
+        start_sample = max(int(start_sample), 0)
+        stop_sample = min(int(stop_sample), self.num_samples)
+        if channels is None:
+            channels = np.arange(self.num_channels)
+        channels = np.asarray(channels, dtype = int)
+        if not self.lazy:
+            return self.samples[channels, start_sample:stop_sample].astype(np.float32)
+        return self._read_mapped(start_sample, stop_sample, self._channel_conversion_list[channels])
+        
     def readSamples(self, n_blocks = None):
         "Function to read a subset of sample blocks from a file"
         if n_blocks==None:
@@ -216,7 +235,64 @@ class Poly5Reader:
         SignalBlock = np.asarray(DataBlock)
         return SignalBlock
     
-    def _reorder_grid(self, samples, ch_names):
+    def _read_window(self, start_sample, stop_sample):
+        return self.read(start_sample, stop_sample)
+
+    def _map_file(self, filename):
+        self._memory_map = np.memmap(filename, dtype = np.uint8, mode = 'r')
+        data_offset = _HEADER_SIZE + 2 * _SIGNAL_DESCRIPTION_SIZE * self.num_channels
+        sample_set_size = 4 * self.num_channels
+        block_size = _BLOCK_HEADER_SIZE + sample_set_size * self.num_samples_per_block
+        available_blocks = max(len(self._memory_map) - data_offset, 0) // block_size
+        num_full_blocks = min(self.num_samples // self.num_samples_per_block, available_blocks)
+        # Strided view on the samples of the full data blocks, skipping the block headers
+        self._blocks = np.ndarray(
+            shape = (num_full_blocks, self.num_samples_per_block, self.num_channels),
+            dtype = '<f4',
+            buffer = self._memory_map,
+            offset = data_offset + _BLOCK_HEADER_SIZE,
+            strides = (block_size, sample_set_size, 4))
+        # Final data block might not be filled completely
+        last_block_offset = data_offset + num_full_blocks * block_size + _BLOCK_HEADER_SIZE
+        num_last_samples = min(
+            self.num_samples - num_full_blocks * self.num_samples_per_block,
+            max(len(self._memory_map) - last_block_offset, 0) // sample_set_size)
+        self._last_block = np.ndarray(
+            shape = (max(num_last_samples, 0), self.num_channels),
+            dtype = '<f4',
+            buffer = self._memory_map,
+            offset = min(last_block_offset, len(self._memory_map)))
+
+    def _unmap_file(self):
+        self._blocks = None
+        self._last_block = None
+        self._memory_map = None
+
+    def _read_mapped(self, start_sample, stop_sample, file_channels):
+        samples = np.empty((len(file_channels), max(stop_sample - start_sample, 0)), dtype = np.float32)
+        num_block_samples = np.shape(self._blocks)[0] * self.num_samples_per_block
+        if start_sample < min(stop_sample, num_block_samples):
+            block_stop = min(stop_sample, num_block_samples)
+            first_block = start_sample // self.num_samples_per_block
+            last_block = -(-block_stop // self.num_samples_per_block)
+            first_sample = first_block * self.num_samples_per_block
+            block_samples = self._blocks[first_block:last_block, :, file_channels].reshape(-1, len(file_channels))
+            samples[:, :block_stop - start_sample] = \
+                block_samples[start_sample - first_sample:block_stop - first_sample].T
+        if stop_sample > num_block_samples:
+            last_start = max(start_sample, num_block_samples)
+            last_samples = self._last_block[last_start - num_block_samples:stop_sample - num_block_samples, file_channels]
+            samples[:, last_start - start_sample:last_start - start_sample + len(last_samples)] = last_samples.T
+            # Samples missing in the file are not available
+            samples = samples[:, :last_start - start_sample + len(last_samples)]
+        return samples
+
+    def _get_samples(self):
+        if self.lazy:
+            return self.read(0, self.num_samples)
+        return self.samples
+
+    def _get_channel_conversion_list(self, ch_names):
         # Reordering textile grid channels
         channel_conversion_list = np.arange(0,len(ch_names), dtype = int)
         
@@ -233,6 +309,10 @@ class Poly5Reader:
         RCch.sort()
         for ch in range(len(RCch)):
             channel_conversion_list[ch] = RCch[ch][2]
+        return channel_conversion_list
+    
+    def _reorder_grid(self, samples, ch_names):
+        channel_conversion_list = self._get_channel_conversion_list(ch_names)
             
         # Change the ordering of channels on the textile grid
         samples = samples[channel_conversion_list,:]
@@ -242,6 +322,8 @@ class Poly5Reader:
     
     def close(self):
         self.file_obj.close()
+        if self.lazy:
+            self._unmap_file()
 
     def read_live_impedance(self):
         """
@@ -254,7 +336,7 @@ class Poly5Reader:
         :rtype: array
     """
         # Parameters from class
-        samples = self.samples
+        samples = self._get_samples()
         ch_names = self.ch_names
         # Parameter to define if there are live impedances stored in file
         live_imp_in_file = False
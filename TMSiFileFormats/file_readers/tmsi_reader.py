@@ -0,0 +1,123 @@
+'''
+(c) 2022 Twente Medical Systems International B.V., Oldenzaal The Netherlands
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+#######  #     #   #####   #
+   #     ##   ##  #        
+   #     # # # #  #        #
+   #     #  #  #   #####   #
+   #     #     #        #  #
+   #     #     #        #  #
+   #     #     #  #####    #
+
+/**
+ * @file ${tmsi_reader.py} 
+ * @brief Common interface of the file readers, used by the viewer.
+ *
+ */
+
+
+'''
+
+from collections import OrderedDict
+
+import numpy as np
+
+_DEFAULT_WINDOW_CACHE_SIZE = 256 * 1024 * 1024
+
+class TMSiReader:
+    """Interface of the file readers which can be shown in the TMSiFrontend 
+    Viewer. A reader implements _read_window to read a range of samples from 
+    the file; the windows which are read recently are kept in a cache, so 
+    scrolling back and forth does not read the file again.
+    """
+    def get_reader_channels(self) -> list:
+        """Get the channels of the file
+
+        :return: names of the channels
+        :rtype: list[str]
+        """
+        raise NotImplementedError("This method must be implemented for each reader")
+
+    def get_reader_number_of_samples(self) -> int:
+        """Get the number of samples per channel in the file
+
+        :return: number of samples
+        :rtype: int
+        """
+        raise NotImplementedError("This method must be implemented for each reader")
+
+    def get_reader_sampling_frequency(self) -> float:
+        """Get the sampling frequency of the file
+
+        :return: sampling frequency in Hz
+        :rtype: float
+        """
+        raise NotImplementedError("This method must be implemented for each reader")
+
+    def get_reader_data(self, start_time, end_time):
+        """Get the samples of all channels in a time window
+
+        :param start_time: start of the window in seconds
+        :type start_time: float
+        :param end_time: end of the window in seconds
+        :type end_time: float
+        :return: samples in the window, limited to the samples in the file (read-only)
+        :rtype: numpy.ndarray (channels x samples)
+        """
+        sampling_frequency = self.get_reader_sampling_frequency()
+        start_sample = max(int(round(start_time * sampling_frequency)), 0)
+        stop_sample = min(int(round(end_time * sampling_frequency)), self.get_reader_number_of_samples())
+        stop_sample = max(stop_sample, start_sample)
+        if not hasattr(self, "_window_cache"):
+            self._window_cache = OrderedDict()
+        key = (start_sample, stop_sample)
+        if key in self._window_cache:
+            self._window_cache.move_to_end(key)
+            return self._window_cache[key]
+        window = np.asarray(self._read_window(start_sample, stop_sample))
+        window.setflags(write = False)
+        self._window_cache[key] = window
+        self._reduce_window_cache(self.get_window_cache_size())
+        return window
+
+    def get_window_cache_size(self) -> int:
+        """Get the maximum size of the windows kept in the cache
+
+        :return: size in bytes
+        :rtype: int
+        """
+        if not hasattr(self, "_window_cache_size"):
+            self._window_cache_size = _DEFAULT_WINDOW_CACHE_SIZE
+        return self._window_cache_size
+
+    def set_window_cache_size(self, window_cache_size):
+        """Set the maximum size of the windows kept in the cache. The least 
+        recently used windows are removed first.
+
+        :param window_cache_size: size in bytes, 0 to disable the cache
+        :type window_cache_size: int
+        """
+        self._window_cache_size = window_cache_size
+        self._reduce_window_cache(window_cache_size)
+
+    def _reduce_window_cache(self, window_cache_size):
+        if not hasattr(self, "_window_cache"):
+            return
+        cache_size = sum(window.nbytes for window in self._window_cache.values())
+        while self._window_cache and cache_size > window_cache_size:
+            cache_size -= self._window_cache.popitem(last = False)[1].nbytes
+
+    def _read_window(self, start_sample, stop_sample):
+        raise NotImplementedError("This method must be implemented for each reader")
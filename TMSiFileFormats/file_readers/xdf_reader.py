@@ -30,21 +30,22 @@ limitations under the License.
 
 '''
 
-from pyxdf import load_xdf
 import mne
 import tkinter as tk
 from tkinter import filedialog
 import numpy as np
 import pandas as pd
-import copy
+
+from .tmsi_reader import TMSiReader
+from .xdf_stream_reader import XdfStreamReader
 
 from os.path import join, dirname, realpath
 Reader_dir = dirname(realpath(__file__)) # directory of this file
 modules_dir = join(Reader_dir, '../../') # directory with all modules
 
 
-class Xdf_Reader: 
-    def __init__(self, filename=None, add_ch_locs=False):
+class Xdf_Reader(TMSiReader): 
+    def __init__(self, filename=None, add_ch_locs=False, lazy=False, dejitter_timestamps=True):
         if filename==None:
             root = tk.Tk()
 
@@ -53,61 +54,72 @@ class Xdf_Reader:
             
         self.filename = filename
         self.add_ch_locs=add_ch_locs
+        # in lazy mode samples are only read from the file on request
+        self.lazy = lazy
+        # remove the jitter of the time-stamps, as pyxdf.load_xdf does by default
+        self.dejitter_timestamps = dejitter_timestamps
         print('Reading file ', filename)
         self.data, self.time_stamps = self._readFile(filename)
         
     def _readFile(self, fname):
         try: 
-            streams, header = load_xdf(fname)
-            num_streams = len(streams)
+            # the chunks of the file are indexed, samples are only decoded for the requested streams
+            self._stream_reader = XdfStreamReader(fname)
+            stream_ids = []
+            for stream_id in self._stream_reader.get_stream_ids():
+                if self._stream_reader.is_numeric(stream_id):
+                    stream_ids.append(stream_id)
+                else:
+                    print('Skipped stream ' + str(stream_id) + ' without numeric samples')
+            num_streams = len(stream_ids)
             self.stream_info = {}
+            output_data = ()
+            output_timestamps = ()
             
             print('Number of streams in file: ' + str(num_streams))
             for i in range(num_streams):
-                stream=streams[i]
+                stream = {"info": self._stream_reader.get_stream_info(stream_ids[i])}
                 self.stream_info[i] = stream["info"]
-                if stream is not None:
-                  fs = float(stream["info"]["nominal_srate"][0])
+                fs = float(stream["info"]["nominal_srate"][0])
               
-                  labels, types, units, impedances = self._get_ch_info(stream)
+                labels, types, units, impedances = self._get_ch_info(stream)
                   
-                  # convert from microvolts to volts if necessary
-                  scale = np.array([1e-6 if (u == "µVolt" or u == "uVolt") else 1 for u in units])
-                  samples = (stream["time_series"] * scale).T
-                  samples, labels = self._reorder_grid(samples, labels)
+                # convert from microvolts to volts if necessary
+                scale = np.array([1e-6 if (u == "µVolt" or u == "uVolt") else 1 for u in units])
+                
+                if self.lazy:
+                    # only the first stream is read, on request
+                    self._stream_id = stream_ids[i]
+                    self._channel_conversion_list = self._get_channel_conversion_list(labels)
+                    self._scale = scale[self._channel_conversion_list]
+                    self._ch_names = [labels[c] for c in self._channel_conversion_list]
+                    self._sampling_frequency = fs
+                    return None, None
+                
+                samples = self._stream_reader.read(stream_ids[i]) * scale[:, np.newaxis]
+                samples, labels = self._reorder_grid(samples, labels)
                   
-                  type_options=["ecg", "bio", "stim", "eog", "misc", "seeg", "dbs", "ecog", "mag", "eeg", "ref_meg", "grad", "emg", "hbr", "hbo"]
-                  for ind, t in enumerate(types):
-                      if t=="EEG":
-                          types[ind]="eeg"
-                      elif not t in type_options:
-                          types[ind]="misc"
-                  info = mne.create_info(ch_names=labels, sfreq=fs, ch_types=types)   
-                  info=self._get_ch_locations(stream, info)
-                  if self.add_ch_locs:
-                      info=self._add_ch_locations(info)
+                type_options=["ecg", "bio", "stim", "eog", "misc", "seeg", "dbs", "ecog", "mag", "eeg", "ref_meg", "grad", "emg", "hbr", "hbo"]
+                for ind, t in enumerate(types):
+                    if t=="EEG":
+                        types[ind]="eeg"
+                    elif not t in type_options:
+                        types[ind]="misc"
+                info = mne.create_info(ch_names=labels, sfreq=fs, ch_types=types)   
+                info=self._get_ch_locations(stream, info)
+                if self.add_ch_locs:
+                    info=self._add_ch_locations(info)
                  
-                  raw = mne.io.RawArray(samples, info)
-                  raw.impedances=impedances
+                raw = mne.io.RawArray(samples, info)
+                raw.impedances=impedances
                   
-                  
-                  if raw is not None:
-                      print(raw, end="\n\n")
-                      print(raw.info)
-                      
-                      if num_streams == 1:
-                          return (raw,), (stream['time_stamps'],)
-                      else:
-                          if i == 0:
-                              output_data = (copy.copy(raw),)
-                              output_timestamps = (copy.copy(stream['time_stamps']),)
-                          elif i == num_streams - 1:
-                              output_data = output_data + (copy.copy(raw),)
-                              output_timestamps = output_timestamps + (copy.copy(stream['time_stamps']),)
-                              return output_data, output_timestamps
-                          else:
-                              output_data = output_data + (copy.copy(raw),)
-                              output_timestamps = output_timestamps + (copy.copy(stream['time_stamps']),)
+                print(raw, end="\n\n")
+                print(raw.info)
+                
+                output_data = output_data + (raw,)
+                output_timestamps = output_timestamps + (self._stream_reader.read_time_stamps(stream_ids[i],
+                    dejitter_timestamps = self.dejitter_timestamps),)
+            return output_data, output_timestamps
         except Exception as e:
             print('Reading data failed because of the following error:\n')
             raise
@@ -168,6 +180,21 @@ class Xdf_Reader:
                 pass
         return info
         
+    def get_reader_channels(self) -> list:
+        if self.lazy:
+            return self._ch_names
+        return self.data[0].ch_names
+
+    def get_reader_number_of_samples(self) -> int:
+        if self.lazy:
+            return self._stream_reader.get_number_of_samples(self._stream_id)
+        return self.data[0].n_times
+
+    def get_reader_sampling_frequency(self) -> float:
+        if self.lazy:
+            return self._sampling_frequency
+        return self.data[0].info['sfreq']
+
     def get_stream_info(self):
         # Retrieve the information from the streams in the data. 
         if hasattr(self, "stream_info"):
@@ -175,7 +202,14 @@ class Xdf_Reader:
         else:
             return None
         
-    def _reorder_grid(self, samples, ch_names):
+    def _read_window(self, start_sample, stop_sample):
+        if self.lazy:
+            window = self._stream_reader.read(self._stream_id, start_sample, stop_sample, self._channel_conversion_list)
+            window *= self._scale[:, np.newaxis]
+            return window
+        return self.data[0].get_data(start = start_sample, stop = stop_sample)
+
+    def _get_channel_conversion_list(self, ch_names):
         # Reordering textile grid channels
         channel_conversion_list = np.arange(0,len(ch_names), dtype = int)
         
@@ -192,6 +226,10 @@ class Xdf_Reader:
         RCch.sort()
         for ch in range(len(RCch)):
             channel_conversion_list[ch] = RCch[ch][2]
+        return channel_conversion_list
+
+    def _reorder_grid(self, samples, ch_names):
+        channel_conversion_list = self._get_channel_conversion_list(ch_names)
             
         # Change the ordering of channels on the textile grid
         samples = samples[channel_conversion_list,:]
@@ -210,8 +248,8 @@ class Xdf_Reader:
         :rtype: array
     """
         # Parameters from class
-        samples = self.data[0].get_data()
-        ch_names = self.data[0].ch_names
+        samples = self._read_window(0, self.get_reader_number_of_samples())
+        ch_names = self.get_reader_channels()
         # Parameter to define if there are live impedances stored in file
         live_imp_in_file = False
 
@@ -0,0 +1,559 @@
+'''
+(c) 2022 Twente Medical Systems International B.V., Oldenzaal The Netherlands
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+#######  #     #   #####   #
+   #     ##   ##  #
+   #     # # # #  #        #
+   #     #  #  #   #####   #
+   #     #     #        #  #
+   #     #     #        #  #
+   #     #     #  #####    #
+
+/**
+ * @file ${xdf_stream_reader.py}
+ * @brief Streaming XDF File Reader, which only decodes the requested streams and samples.
+ *
+ */
+
+
+'''
+
+from collections import defaultdict
+import os
+import struct
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+# Version of the index-file, an index-file of another version is rebuilt
+_INDEX_VERSION = 1
+_INDEX_EXTENSION = '.idx.npz'
+
+_CHUNK_TAG_FILE_HEADER = 1
+_CHUNK_TAG_STREAM_HEADER = 2
+_CHUNK_TAG_SAMPLES = 3
+_CHUNK_TAG_CLOCK_OFFSET = 4
+_CHUNK_TAG_STREAM_FOOTER = 6
+
+_VALUE_FORMATS = {
+    'float32': '<f4',
+    'double64': '<f8',
+    'int8': 'i1',
+    'int16': '<i2',
+    'int32': '<i4',
+    'int64': '<i8',
+    }
+
+_LENGTH_FORMATS = {1: '<B', 4: '<I', 8: '<Q'}
+
+# A gap between time-stamps larger than these thresholds starts a new segment 
+# when removing the jitter, as in pyxdf
+_JITTER_BREAK_THRESHOLD_SECONDS = 1
+_JITTER_BREAK_THRESHOLD_SAMPLES = 500
+_CLOCK_OFFSET_STRUCT = struct.Struct("<dd")
+
+
+def _xml_to_dict(element):
+    """Converts an xml-element to nested dictionaries in which every child-tag
+    refers to a list of values, like the stream info of pyxdf."""
+    children = defaultdict(list)
+    for child in element:
+        for tag, value in _xml_to_dict(child).items():
+            children[tag].append(value)
+    return {element.tag: dict(children) or element.text}
+
+
+class _StreamIndex:
+    def __init__(self, stream_id, header):
+        self.stream_id = stream_id
+        self.header = header
+        self.footer = ''
+        self.offsets = []
+        self.lengths = []
+        self.counts = []
+        self.first_time_stamps = []
+        self.clock_offsets = []
+
+    def finalize(self):
+        self.offsets = np.asarray(self.offsets, dtype = np.int64)
+        self.lengths = np.asarray(self.lengths, dtype = np.int64)
+        self.counts = np.asarray(self.counts, dtype = np.int64)
+        self.first_time_stamps = np.asarray(self.first_time_stamps, dtype = np.float64)
+        self.clock_offsets = np.asarray(self.clock_offsets, dtype = np.float64).reshape(-1, 2)
+        self.first_samples = np.concatenate(([0], np.cumsum(self.counts)))
+
+        self.info = _xml_to_dict(ET.fromstring(self.header))['info']
+        self.channel_count = int(self.info['channel_count'][0])
+        self.channel_format = self.info['channel_format'][0]
+        self.sampling_frequency = float(self.info['nominal_srate'][0])
+        self.value_dtype = np.dtype(_VALUE_FORMATS[self.channel_format]) \
+            if self.channel_format in _VALUE_FORMATS else None
+
+        # Chunks without an explicit time-stamp continue from the previous chunk
+        time_step = 1.0 / self.sampling_frequency if self.sampling_frequency > 0 else 0.0
+        explicit = ~np.isnan(self.first_time_stamps)
+        self.explicit_first_time_stamps = explicit
+        last_explicit = np.maximum.accumulate(np.where(explicit, np.arange(len(explicit)), -1)) \
+            if len(explicit) > 0 else np.zeros(0, dtype = int)
+        missing = ~explicit
+        reference_time = np.where(last_explicit >= 0, self.first_time_stamps[np.maximum(last_explicit, 0)], 0.0)
+        reference_sample = np.where(last_explicit >= 0, self.first_samples[np.maximum(last_explicit, 0)], -1)
+        self.first_time_stamps[missing] = reference_time[missing] + \
+            (self.first_samples[:-1][missing] - reference_sample[missing]) * time_step
+        self.time_step = time_step
+
+
+class XdfStreamReader:
+    """Reader of xdf-files which does not load the complete file. On opening
+    the chunk-headers are scanned once to build an index (stream id, position
+    of the chunk and its sample range); the index is cached next to the file
+    so the file opens instantly the next time. Samples are only decoded for
+    the requested stream and sample range.
+    """
+    def __init__(self, filename, use_index_file = True):
+        """Initialize the reader
+
+        :param filename: name of the xdf-file
+        :type filename: str
+        :param use_index_file: read and write the index from/to a file next to the xdf-file, defaults to True
+        :type use_index_file: bool, optional
+        """
+        self.filename = filename
+        self._map = np.memmap(filename, dtype = np.uint8, mode = 'r')
+        self._file_stat = os.stat(filename)
+        index_filename = filename + _INDEX_EXTENSION
+        if not use_index_file or not self._load_index(index_filename):
+            self._scan_file()
+            if use_index_file:
+                self._save_index(index_filename)
+        for stream in self._streams.values():
+            stream.finalize()
+
+    def close(self):
+        """Close the file"""
+        if hasattr(self, "_map"):
+            del self._map
+
+    def get_file_header(self):
+        """Get the information of the FileHeader-chunk
+
+        :return: information of the file header
+        :rtype: dict
+        """
+        return _xml_to_dict(ET.fromstring(self._file_header))['info'] if self._file_header else {}
+
+    def get_stream_ids(self) -> list:
+        """Get the ids of the streams in the order of their StreamHeader-chunks
+
+        :return: ids of the streams
+        :rtype: list[int]
+        """
+        return list(self._streams.keys())
+
+    def get_stream_info(self, stream_id) -> dict:
+        """Get the information of the StreamHeader-chunk of a stream
+
+        :param stream_id: id of the stream
+        :type stream_id: int
+        :return: stream information, every tag refers to a list of values like the stream info of pyxdf
+        :rtype: dict
+        """
+        return self._streams[stream_id].info
+
+    def get_stream_footer(self, stream_id) -> dict:
+        """Get the information of the StreamFooter-chunk of a stream
+
+        :param stream_id: id of the stream
+        :type stream_id: int
+        :return: footer information, empty when the file has no footer for the stream
+        :rtype: dict
+        """
+        footer = self._streams[stream_id].footer
+        return _xml_to_dict(ET.fromstring(footer))['info'] if footer else {}
+
+    def get_number_of_channels(self, stream_id) -> int:
+        """Get the number of channels of a stream
+
+        :param stream_id: id of the stream
+        :type stream_id: int
+        :return: number of channels
+        :rtype: int
+        """
+        return self._streams[stream_id].channel_count
+
+    def get_number_of_samples(self, stream_id) -> int:
+        """Get the number of samples of a stream
+
+        :param stream_id: id of the stream
+        :type stream_id: int
+        :return: number of samples
+        :rtype: int
+        """
+        return int(self._streams[stream_id].first_samples[-1])
+
+    def get_sampling_frequency(self, stream_id) -> float:
+        """Get the nominal sampling frequency of a stream
+
+        :param stream_id: id of the stream
+        :type stream_id: int
+        :return: sampling frequency in Hz, 0 for an irregular stream
+        :rtype: float
+        """
+        return self._streams[stream_id].sampling_frequency
+
+    def is_numeric(self, stream_id) -> bool:
+        """Check if the samples of a stream can be read as numbers
+
+        :param stream_id: id of the stream
+        :type stream_id: int
+        :return: False for string streams
+        :rtype: bool
+        """
+        return self._streams[stream_id].value_dtype is not None
+
+    def read(self, stream_id, start_sample = 0, stop_sample = None, channels = None):
+        """Read a range of samples of a stream. Only the Samples-chunks
+        containing the range are decoded.
+
+        :param stream_id: id of the stream
+        :type stream_id: int
+        :param start_sample: index of the first sample to read, defaults to 0
+        :type start_sample: int, optional
+        :param stop_sample: index after the last sample to read, None to read until the end, defaults to None
+        :type stop_sample: int, optional
+        :param channels: indices of the channels to read, None to read all channels, defaults to None
+        :type channels: list[int], optional
+        :raises ValueError: if the stream does not contain numeric samples
+        :return: samples of the channels in the range, limited to the samples in the stream
+        :rtype: numpy.ndarray[float32] (channels x samples)
+        """
+        stream = self._streams[stream_id]
+        if stream.value_dtype is None:
+            raise ValueError("Stream {} with format {} can not be read as numbers".format(
+                stream_id, stream.channel_format))
+        start_sample, stop_sample = self._limit_range(stream, start_sample, stop_sample)
+        if channels is None:
+            channels = np.arange(stream.channel_count)
+        channels = np.asarray(channels, dtype = int)
+        samples = np.empty((len(channels), stop_sample - start_sample), dtype = np.float32)
+        for chunk, chunk_start, chunk_stop in self._chunks_in_range(stream, start_sample, stop_sample):
+            values, _ = self._decode_chunk(stream, chunk)
+            first_sample = stream.first_samples[chunk]
+            samples[:, chunk_start - start_sample:chunk_stop - start_sample] = \
+                values[chunk_start - first_sample:chunk_stop - first_sample, channels].T
+        return samples
+
+    def read_time_range(self, stream_id, start_time, end_time, channels = None):
+        """Read the samples of a stream within a time range
+
+        :param stream_id: id of the stream
+        :type stream_id: int
+        :param start_time: start of the range in seconds since the first sample of the stream
+        :type start_time: float
+        :param end_time: end of the range in seconds since the first sample of the stream
+        :type end_time: float
+        :param channels: indices of the channels to read, None to read all channels, defaults to None
+        :type channels: list[int], optional
+        :return: samples of the channels in the range
+        :rtype: numpy.ndarray[float32] (channels x samples)
+        """
+        return self.read(stream_id, self.get_sample_index(stream_id, start_time),
+                         self.get_sample_index(stream_id, end_time), channels)
+
+    def get_sample_index(self, stream_id, time):
+        """Get the index of the sample at a time. The time-stamps of the
+        Samples-chunks are used, so samples lost during the recording are
+        taken into account.
+
+        :param stream_id: id of the stream
+        :type stream_id: int
+        :param time: time in seconds since the first sample of the stream
+        :type time: float
+        :return: index of the sample
+        :rtype: int
+        """
+        stream = self._streams[stream_id]
+        if len(stream.counts) == 0:
+            return 0
+        chunk_times = stream.first_time_stamps - stream.first_time_stamps[0]
+        chunk = max(np.searchsorted(chunk_times, time, side = 'right') - 1, 0)
+        index = 0
+        if stream.time_step > 0:
+            index = int(round((time - chunk_times[chunk]) / stream.time_step))
+        index = min(max(index, 0), stream.counts[chunk])
+        return int(stream.first_samples[chunk] + index)
+
+    def read_time_stamps(self, stream_id, start_sample = 0, stop_sample = None, synchronize_clocks = True, dejitter_timestamps = False):
+        """Read the time-stamps of a range of samples of a stream. Samples
+        without an explicit time-stamp follow the previous sample at the
+        nominal sampling frequency.
+
+        :param stream_id: id of the stream
+        :type stream_id: int
+        :param start_sample: index of the first sample, defaults to 0
+        :type start_sample: int, optional
+        :param stop_sample: index after the last sample, None until the end, defaults to None
+        :type stop_sample: int, optional
+        :param synchronize_clocks: correct the time-stamps with the ClockOffset-chunks, defaults to True
+        :type synchronize_clocks: bool, optional
+        :param dejitter_timestamps: replace the time-stamps of every segment without 
+            gaps by a least-squares linear fit on the sample index, like 
+            pyxdf.load_xdf does by default. Only the requested range is used 
+            for the fit, defaults to False
+        :type dejitter_timestamps: bool, optional
+        :return: time-stamps in seconds
+        :rtype: numpy.ndarray[float64]
+        """
+        stream = self._streams[stream_id]
+        start_sample, stop_sample = self._limit_range(stream, start_sample, stop_sample)
+        time_stamps = np.empty(stop_sample - start_sample, dtype = np.float64)
+        chunk_time_stamps = None
+        for chunk, chunk_start, chunk_stop in self._chunks_in_range(stream, start_sample, stop_sample):
+            first_sample = stream.first_samples[chunk]
+            # The chunks are consecutive, the last time-stamp of the previous chunk is carried forward
+            chunk_time_stamps = self._chunk_time_stamps(stream, chunk,
+                chunk_time_stamps[-1] if chunk_time_stamps is not None else None)
+            time_stamps[chunk_start - start_sample:chunk_stop - start_sample] = \
+                chunk_time_stamps[chunk_start - first_sample:chunk_stop - first_sample]
+
+        if synchronize_clocks and len(stream.clock_offsets) > 0:
+            clock_times, clock_values = stream.clock_offsets.T
+            if len(clock_times) == 1 or np.ptp(clock_times) == 0:
+                time_stamps += np.mean(clock_values)
+            else:
+                # Linear model of the offset between the clocks
+                slope, intercept = np.polyfit(clock_times, clock_values, 1)
+                time_stamps += intercept + slope * time_stamps
+
+        if dejitter_timestamps and stream.time_step > 0 and len(time_stamps) > 0:
+            self._dejitter(time_stamps, stream.time_step)
+        return time_stamps
+
+    @staticmethod
+    def _dejitter(time_stamps, time_step):
+        # Least-squares linear fit of the time-stamps on the sample index, per segment between breaks
+        threshold = max(_JITTER_BREAK_THRESHOLD_SECONDS, _JITTER_BREAK_THRESHOLD_SAMPLES * time_step)
+        breaks = np.flatnonzero(np.abs(np.diff(time_stamps)) > threshold) + 1
+        for start, stop in zip(np.hstack(([0], breaks)), np.hstack((breaks, [len(time_stamps)]))):
+            index = np.arange(start, stop)
+            design = np.column_stack((np.ones(len(index)), index))
+            intercept, slope = np.linalg.lstsq(design, time_stamps[start:stop], rcond = None)[0]
+            time_stamps[start:stop] = intercept + slope * index
+
+    def _chunk_time_stamps(self, stream, chunk, previous_time_stamp = None):
+        # previous_time_stamp is the last time-stamp of the previous chunk, if already known
+        count = stream.counts[chunk]
+        first_time_stamp = stream.first_time_stamps[chunk]
+        if self._continues_previous_chunk(stream, chunk):
+            # Continue from the last time-stamp of the previous chunk
+            if previous_time_stamp is None:
+                previous_time_stamp = self._last_time_stamp_before(stream, chunk)
+            first_time_stamp = previous_time_stamp + stream.time_step
+        if not self._has_inner_time_stamps(stream, chunk):
+            return first_time_stamp + np.arange(count) * stream.time_step
+        _, time_stamps = self._decode_chunk(stream, chunk, values = False)
+        if np.isnan(time_stamps[0]):
+            time_stamps[0] = first_time_stamp
+        explicit = ~np.isnan(time_stamps)
+        last_explicit = np.maximum.accumulate(np.where(explicit, np.arange(count), 0))
+        return time_stamps[last_explicit] + (np.arange(count) - last_explicit) * stream.time_step
+
+    def _continues_previous_chunk(self, stream, chunk):
+        # A chunk without a first time-stamp continues from a previous chunk with inner time-stamps
+        return not stream.explicit_first_time_stamps[chunk] and chunk > 0 and \
+            self._has_inner_time_stamps(stream, chunk - 1)
+
+    def _last_time_stamp_before(self, stream, chunk):
+        # Walk back to the first chunk of the chain, then carry the time-stamps forward
+        first_chunk = chunk - 1
+        while self._continues_previous_chunk(stream, first_chunk):
+            first_chunk -= 1
+        time_stamp = None
+        for previous_chunk in range(first_chunk, chunk):
+            time_stamp = self._chunk_time_stamps(stream, previous_chunk, time_stamp)[-1]
+        return time_stamp
+
+    def _has_inner_time_stamps(self, stream, chunk):
+        # Check if samples other than the first sample of the chunk have an explicit time-stamp
+        number_of_time_stamps = self._number_of_time_stamps(stream, chunk)
+        return number_of_time_stamps is None or \
+            number_of_time_stamps > int(stream.explicit_first_time_stamps[chunk])
+
+    def _limit_range(self, stream, start_sample, stop_sample):
+        num_samples = int(stream.first_samples[-1])
+        if stop_sample is None:
+            stop_sample = num_samples
+        start_sample = min(max(int(start_sample), 0), num_samples)
+        stop_sample = min(max(int(stop_sample), start_sample), num_samples)
+        return start_sample, stop_sample
+
+    def _chunks_in_range(self, stream, start_sample, stop_sample):
+        first_chunk = np.searchsorted(stream.first_samples, start_sample, side = 'right') - 1
+        last_chunk = np.searchsorted(stream.first_samples, stop_sample, side = 'left')
+        for chunk in range(max(first_chunk, 0), min(last_chunk, len(stream.counts))):
+            chunk_start = max(start_sample, stream.first_samples[chunk])
+            chunk_stop = min(stop_sample, stream.first_samples[chunk + 1])
+            if chunk_stop > chunk_start:
+                yield chunk, chunk_start, chunk_stop
+
+    def _number_of_time_stamps(self, stream, chunk):
+        # Samples of string streams have a variable size, the number of time-stamps is unknown
+        if stream.value_dtype is None:
+            return None
+        size_sample = 1 + stream.channel_count * stream.value_dtype.itemsize
+        return int((stream.lengths[chunk] - stream.counts[chunk] * size_sample) // 8)
+
+    def _decode_chunk(self, stream, chunk, values = True):
+        # Decode the samples of a Samples-chunk:
+        # every sample is a time-stamp-byte (0 or 8) with an optional time-stamp, followed by the values
+        offset = int(stream.offsets[chunk])
+        count = int(stream.counts[chunk])
+        data = self._map[offset:offset + int(stream.lengths[chunk])]
+        n_chan = stream.channel_count
+        time_stamps = np.full(count, np.nan)
+        number_of_time_stamps = self._number_of_time_stamps(stream, chunk)
+
+        if number_of_time_stamps == 0 or (number_of_time_stamps == 1 and data[0] == 8):
+            sample_dtype = np.dtype([('time_stamp_bytes', 'u1'), ('values', stream.value_dtype, (n_chan,))])
+            first = 0
+            if number_of_time_stamps == 1:
+                # Only the first sample has a time-stamp
+                time_stamps[0] = data[1:9].view('<f8')[0]
+                first = 1
+                first_values = data[9:9 + sample_dtype.itemsize - 1].view(stream.value_dtype)
+            sample_sets = data[9 * first + (sample_dtype.itemsize - 1) * first:].view(sample_dtype)
+            if not np.any(sample_sets['time_stamp_bytes']):
+                if not values:
+                    return None, time_stamps
+                chunk_values = np.empty((count, n_chan), dtype = stream.value_dtype)
+                if first:
+                    chunk_values[0] = first_values
+                chunk_values[first:] = sample_sets['values']
+                return chunk_values, time_stamps
+
+        # Time-stamps at irregular positions or strings: decode the samples one by one
+        values = values and stream.value_dtype is not None
+        chunk_values = np.empty((count, n_chan), dtype = stream.value_dtype) if values else None
+        size_values = n_chan * stream.value_dtype.itemsize if stream.value_dtype is not None else None
+        position = 0
+        for i in range(count):
+            if data[position] == 8:
+                time_stamps[i] = data[position + 1:position + 9].view('<f8')[0]
+                position += 9
+            else:
+                position += 1
+            if size_values is None:
+                # Every string is preceded by its variable length
+                for _ in range(n_chan):
+                    num_length_bytes = int(data[position])
+                    length = struct.unpack_from(_LENGTH_FORMATS[num_length_bytes], data, position + 1)[0]
+                    position += 1 + num_length_bytes + length
+                continue
+            if values:
+                chunk_values[i] = data[position:position + size_values].view(stream.value_dtype)
+            position += size_values
+        return chunk_values, time_stamps
+
+    def _scan_file(self):
+        # Scan the chunk-headers, only the headers of the Samples-chunks are read
+        data = self._map
+        file_size = len(data)
+        if file_size < 4 or bytes(data[:4]) != b'XDF:':
+            raise ValueError("{} is not an xdf-file".format(self.filename))
+        self._file_header = ''
+        self._streams = {}
+        position = 4
+        while position < file_size:
+            num_length_bytes = int(data[position])
+            if num_length_bytes not in _LENGTH_FORMATS or position + 1 + num_length_bytes + 2 > file_size:
+                break
+            chunk_length = struct.unpack_from(_LENGTH_FORMATS[num_length_bytes], data, position + 1)[0]
+            content = position + 1 + num_length_bytes
+            chunk_end = content + chunk_length
+            if chunk_end > file_size:
+                # Incomplete chunk at the end of an interrupted recording
+                break
+            tag = struct.unpack_from('<H', data, content)[0]
+            content += 2
+            if tag == _CHUNK_TAG_FILE_HEADER:
+                self._file_header = bytes(data[content:chunk_end]).decode('utf-8')
+            elif tag in (_CHUNK_TAG_STREAM_HEADER, _CHUNK_TAG_SAMPLES, _CHUNK_TAG_CLOCK_OFFSET, _CHUNK_TAG_STREAM_FOOTER):
+                stream_id = struct.unpack_from('<I', data, content)[0]
+                content += 4
+                if tag == _CHUNK_TAG_STREAM_HEADER:
+                    self._streams[stream_id] = _StreamIndex(stream_id, bytes(data[content:chunk_end]).decode('utf-8'))
+                elif stream_id not in self._streams:
+                    pass
+                elif tag == _CHUNK_TAG_SAMPLES:
+                    num_count_bytes = int(data[content])
+                    count = struct.unpack_from(_LENGTH_FORMATS[num_count_bytes], data, content + 1)[0]
+                    content += 1 + num_count_bytes
+                    stream = self._streams[stream_id]
+                    stream.offsets.append(content)
+                    stream.lengths.append(chunk_end - content)
+                    stream.counts.append(count)
+                    if count > 0 and data[content] == 8:
+                        stream.first_time_stamps.append(struct.unpack_from('<d', data, content + 1)[0])
+                    else:
+                        stream.first_time_stamps.append(np.nan)
+                elif tag == _CHUNK_TAG_CLOCK_OFFSET:
+                    self._streams[stream_id].clock_offsets.append(_CLOCK_OFFSET_STRUCT.unpack_from(data, content))
+                else:
+                    self._streams[stream_id].footer = bytes(data[content:chunk_end]).decode('utf-8')
+            position = chunk_end
+
+    def _load_index(self, index_filename):
+        # The index is only used when it belongs to the current version of the xdf-file
+        try:
+            with np.load(index_filename, allow_pickle = False) as index:
+                if int(index['version']) != _INDEX_VERSION or \
+                    int(index['file_size']) != self._file_stat.st_size or \
+                    int(index['file_mtime']) != self._file_stat.st_mtime_ns:
+                    return False
+                self._file_header = str(index['file_header'])
+                self._streams = {}
+                for stream_id in index['stream_ids']:
+                    stream_id = int(stream_id)
+                    stream = _StreamIndex(stream_id, str(index['header_{}'.format(stream_id)]))
+                    stream.footer = str(index['footer_{}'.format(stream_id)])
+                    for name in ('offsets', 'lengths', 'counts', 'first_time_stamps', 'clock_offsets'):
+                        setattr(stream, name, index['{}_{}'.format(name, stream_id)])
+                    self._streams[stream_id] = stream
+            return True
+        except (OSError, KeyError, ValueError):
+            return False
+
+    def _save_index(self, index_filename):
+        index = {
+            'version': _INDEX_VERSION,
+            'file_size': self._file_stat.st_size,
+            'file_mtime': self._file_stat.st_mtime_ns,
+            'file_header': self._file_header,
+            'stream_ids': np.array(list(self._streams.keys()), dtype = np.int64),
+            }
+        for stream_id, stream in self._streams.items():
+            index['header_{}'.format(stream_id)] = stream.header
+            index['footer_{}'.format(stream_id)] = stream.footer
+            index['offsets_{}'.format(stream_id)] = np.asarray(stream.offsets, dtype = np.int64)
+            index['lengths_{}'.format(stream_id)] = np.asarray(stream.lengths, dtype = np.int64)
+            index['counts_{}'.format(stream_id)] = np.asarray(stream.counts, dtype = np.int64)
+            index['first_time_stamps_{}'.format(stream_id)] = np.asarray(stream.first_time_stamps, dtype = np.float64)
+            index['clock_offsets_{}'.format(stream_id)] = np.asarray(stream.clock_offsets, dtype = np.float64).reshape(-1, 2)
+        try:
+            with open(index_filename, 'wb') as f:
+                np.savez(f, **index)
+        except OSError:
+            # The index is only a cache, e.g. the directory may be read-only
+            pass
@@ -51,12 +51,15 @@ class FileWriter:
 
             filename : <string> The path and name of the file, into which the
             measurement-data must be written.
+
+            durability_interval : <float> Interval in seconds at which a poly5-file
+            is synced to disk with a valid header, None to do so on close only.
     """
-    def __init__(self, data_format_type, filename, add_ch_locs=False, download = False):
+    def __init__(self, data_format_type, filename, add_ch_locs=False, download = False, durability_interval = 1.0):
         if (data_format_type == FileFormat.poly5):
             from .file_formats.poly5_file_writer import Poly5Writer
             self._data_format_type = data_format_type
-            self._file_writer = Poly5Writer(filename, download)
+            self._file_writer = Poly5Writer(filename, download, durability_interval)
         elif (data_format_type == FileFormat.xdf):
             from .file_formats.xdf_file_writer import XdfWriter
             self._data_format_type = data_format_type
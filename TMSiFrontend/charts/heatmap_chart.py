@@ -90,17 +90,20 @@ class HeatmapChart(Chart):
                     angle = coordinates[key]["angle"])
         electrode_positions = []
         electrode_labels = []
-        for channel in channels:
+        electrode_indices = []
+        for i, channel in enumerate(channels):
             idx = str(channel.get_channel_index())
             if idx in coordinates:
                 new_pos = (coordinates[idx][0] + 0.5, coordinates[idx][1] + 0.5)
                 electrode_positions.append(new_pos)
                 electrode_labels.append(channel.get_channel_name())
+                electrode_indices.append(i)
         self.__max_x = math.ceil(max([x[0] for x in electrode_positions]))
         self.__max_y = math.ceil(max([x[1] for x in electrode_positions]))
         self._step = max(self.__max_x, self.__max_y) / self._resolution
         self._x_interpolate, self._y_interpolate = np.mgrid[0:self.__max_x:self._step,0:self.__max_y:self._step]
         self._electrode_positions = electrode_positions
+        self._electrode_indices = np.array(electrode_indices, dtype = int)
         self._electrode_labels = electrode_labels
         self.initialize_electrode_labels()
         self.set_ranges([0,1],[0,1])
@@ -108,6 +111,26 @@ class HeatmapChart(Chart):
             self.set_ranges([-self.__max_x * 0.1, self.__max_x * 1.1], [-self.__max_y * 0.1, self.__max_y * 1.1])
             corners = [[i,j] for i in range(0,self.__max_x+1,self.__max_x) for j in range(0,self.__max_y+1,self.__max_y)]
             self._electrode_positions.extend(corners)
+        self._compute_interpolation()
+
+    def _compute_interpolation(self):
+        """Precompute the interpolation from the electrode values to the pixels 
+        of the heatmap. The electrode positions are fixed, so the cubic 
+        interpolation is a linear operator: its columns are the interpolation 
+        of every single electrode. Only the pixels inside the electrodes and
+        the headcap are kept, the other pixels are not drawn."""
+        grid_shape = np.shape(self._x_interpolate)
+        interpolator = interpolate.CloughTocher2DInterpolator(
+            self._electrode_positions, np.eye(len(self._electrode_positions))[:, :len(self._electrode_indices)])
+        weights = interpolator(self._x_interpolate.ravel(), self._y_interpolate.ravel())
+        mask = np.isnan(weights).any(axis = 1).reshape(grid_shape)
+        if self._is_headcap:
+            y, x = np.ogrid[0:grid_shape[0], 0:grid_shape[1]]
+            mask |= (x - self._x_offset + 0.5 )**2+(y - self._y_offset + 0.5)**2 >= (self._radius**2)
+        # The gradients of the cubic interpolation depend on all electrodes, so
+        # the weights are dense: a dense matrix of the drawn pixels is fastest
+        self._interpolation_pixels = np.flatnonzero(~mask)
+        self._interpolation_operator = np.ascontiguousarray(weights[self._interpolation_pixels])
 
     def initialize_electrode_labels(self):
         """Initialize electrode labels on the chart"""
@@ -122,6 +145,8 @@ class HeatmapChart(Chart):
     def draw_headcap(self):
         """Draw head on the chart"""
         self._is_headcap = True
+        if hasattr(self, "_interpolation_operator"):
+            del self._interpolation_operator
         self._x_offset = self._resolution / 2
         self._y_offset = self._resolution / 2
         self._radius = self._resolution / 2
@@ -194,25 +219,22 @@ class HeatmapChart(Chart):
         :param data_to_plot: values to represent
         :type data_to_plot: list
         """
+        if not hasattr(self, "_interpolation_operator"):
+            self._compute_interpolation()
         heatmap = self._from_data_to_heatmap(data_to_plot)
-        if self._is_headcap:
-            heatmap = self._filter_outside_headcap(heatmap)
         self._draw_heatmap(heatmap)
  
     def _draw_heatmap(self, heatmap):
         self._img.setImage(heatmap, autoRange=False, autoLevels=False)
 
 
-    def _filter_outside_headcap(self, heatmap):
-        heatmap = [[np.nan if (x - self._x_offset + 0.5 )**2+(y - self._y_offset + 0.5)**2 >= (self._radius**2) else heatmap[y][x] for x in range(len(heatmap))] for y in range(len(heatmap[0]))]
-        heatmap = np.array(heatmap)
-        return heatmap
-
- 
     def _from_data_to_heatmap(self, data_to_plot):
-        if self._is_headcap:
-            data_to_plot = np.pad(data_to_plot, 4)[4:]
-        return interpolate.griddata(self._electrode_positions, data_to_plot, (self._x_interpolate, self._y_interpolate), method='cubic')
+        # Only the channels with a position; with a headcap the corners are 
+        # interpolated with value 0, so they are not part of the operator
+        data_to_plot = np.asarray(data_to_plot, dtype = float)[self._electrode_indices]
+        heatmap = np.full(np.shape(self._x_interpolate), np.nan)
+        heatmap.flat[self._interpolation_pixels] = self._interpolation_operator @ data_to_plot
+        return heatmap
     
     def _from_polar_to_cartesian(self, radius, angle):
         col = radius * math.cos(angle/180*math.pi)
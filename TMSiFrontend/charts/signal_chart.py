@@ -29,13 +29,19 @@ limitations under the License.
 
 
 '''
+import time
+
 import numpy as np
 
 import pyqtgraph as pg
-from PySide2 import QtCore
+from PySide2 import QtCore, QtGui
 
 from ..chart import Chart
 
+# Number of segments of each curve in the sweep mode, only the segments with 
+# new samples are handed over to the curves
+_SWEEP_SEGMENTS = 16
+
 class SignalChart(Chart):
     """Signal chart object
     """
@@ -47,10 +53,16 @@ class SignalChart(Chart):
         """
         super().__init__(plotter_chart)
         self._curves = []
+        self._colors = []
+        self._segments = []
+        self._segment_bounds = None
         self._plot_offset = 3
         self._default_window_size = 10
         self._plotter_chart.window.disableAutoRange()
         self._time_marker = None
+        self._frame_time = None
+        self._frames_per_second = 0.0
+        self._render_time = 0.0
         
     def initUI(self):
         """Initialize UI
@@ -64,6 +76,30 @@ class SignalChart(Chart):
         self._plotter_chart.window.setEnabled(False)
         self.set_time_range(1)
 
+    def get_frames_per_second(self) -> float:
+        """Get the rate at which the chart is redrawn
+
+        :return: frames per second, averaged over the last frames
+        :rtype: float
+        """
+        return self._frames_per_second
+
+    def get_width_in_pixels(self) -> int:
+        """Get the width of the area where the signals are drawn
+
+        :return: width in pixels
+        :rtype: int
+        """
+        return int(self._plotter_chart.window.getViewBox().width())
+
+    def get_render_time(self) -> float:
+        """Get the time needed to hand over one frame to the curves
+
+        :return: render time per frame in seconds, averaged over the last frames
+        :rtype: float
+        """
+        return self._render_time
+
     def delete_time_marker(self):
         if self._time_marker:
             self._time_marker.clear()
@@ -97,6 +133,7 @@ class SignalChart(Chart):
         if hasattr(self, "_curves"):
             for c in range(len(self._curves)):
                 self._curves[c].clear()
+        self._clear_segments()
         self._curves = []
         color = [(20,20,20) for i in range(n_signals)]
         if colors is not None:
@@ -104,6 +141,7 @@ class SignalChart(Chart):
                 color = [colors for i in range(n_signals)]
             elif isinstance(colors, list):
                 color = [colors[i] for i in range(n_signals)]
+        self._colors = color
         for i in range(n_signals):
             c = pg.PlotCurveItem()
             c.setPen(color = color[i], cosmetic = True, joinStyle = QtCore.Qt.MiterJoin)
@@ -112,6 +150,25 @@ class SignalChart(Chart):
             self._curves.append(c)
         self._plotter_chart.window.setYRange(-1.5, self._plot_offset * n_signals - 2 + 0.5, padding = 0)
     
+    def set_signal_transforms(self, offsets = None, scales = None):
+        """Set the offset and scale of the curves as a transform of the curve, so 
+        the samples can be plotted without rescaling them.
+
+        :param offsets: offset of each curve, None to plot the samples as they are, defaults to None
+        :type offsets: list[float], optional
+        :param scales: scale of each curve, None to plot the samples as they are, defaults to None
+        :type scales: list[float], optional
+        """
+        for i in range(len(self._curves)):
+            if offsets is None or scales is None:
+                self._curves[i].setTransform(QtGui.QTransform())
+            else:
+                self._curves[i].setTransform(QtGui.QTransform(
+                    1, 0, 0, -1.0 / scales[i], 0, offsets[i] / scales[i]))
+            if i < len(self._segments):
+                for segment in self._segments[i]:
+                    segment.setTransform(self._curves[i].transform())
+
     def update_chart(self, signals, time_span = None):
         """update chart
 
@@ -122,12 +179,55 @@ class SignalChart(Chart):
         """
         if len(self._curves) != len(signals):
             self.setup_signals(len(signals), (20,20,20))
+        self._clear_segments()
         if len(signals) < 1:
             return
         if time_span is None:
             time_span = np.linspace(0, self._time_range, len(signals[0]))
         self._draw_signals(time_span[:len(signals[0])], signals)
 
+    def update_chart_sweep(self, signals, time_span, changes = None):
+        """Update chart with a sweep window. Every curve is drawn as a fixed 
+        number of segments and only the segments containing changed samples 
+        are handed over to the curves.
+
+        :param signals: sweep window of every signal
+        :type signals: list[numpy.ndarray]
+        :param time_span: time axis values of the sweep window
+        :type time_span: numpy.ndarray
+        :param changes: ranges (start, stop) of the samples changed since the previous update, 
+            None when all samples changed, defaults to None
+        :type changes: list[tuple[int, int]], optional
+        """
+        if len(self._curves) != len(signals):
+            self.setup_signals(len(signals), (20,20,20))
+        if len(signals) < 1:
+            return
+        size = len(signals[0])
+        if len(self._segments) != len(signals) or self._segment_bounds[-1] != size:
+            self._setup_segments(size)
+            changes = None
+        bounds = self._segment_bounds
+        n_segments = len(bounds) - 1
+        if changes is None:
+            changed_segments = range(n_segments)
+        else:
+            changed_segments = set()
+            for start, stop in changes:
+                if stop <= start:
+                    continue
+                # A segment also draws the first sample of the next segment
+                first = max(int(np.searchsorted(bounds, start, 'left')) - 1, 0)
+                last = min(int(np.searchsorted(bounds, stop - 1, 'right')), n_segments)
+                changed_segments.update(range(first, last))
+        start_time = time.perf_counter()
+        for k in changed_segments:
+            begin = bounds[k]
+            end = min(bounds[k + 1] + 1, size)
+            for i in range(len(signals)):
+                self._segments[i][k].setData(time_span[begin:end], signals[i][begin:end], connect = "finite")
+        self._update_frame_statistics(start_time)
+
     def update_time_marker(self, time_value):
         """Update time marker
 
@@ -176,9 +276,41 @@ class SignalChart(Chart):
                 (i * 3 + 1, "{:10.2f} {}".format(list_offsets[i] - list_scales[i], list_units[i])))
         self._plotter_chart.window.getAxis('left').setTicks(tick_list_left)
 
+    def _clear_segments(self):
+        for segments in self._segments:
+            for segment in segments:
+                self._plotter_chart.window.removeItem(segment)
+        self._segments = []
+        self._segment_bounds = None
+
     def _draw_signals(self, x_values, y_values):
+        start_time = time.perf_counter()
         for i in range(len(y_values)):
             self._curves[i].setData(
                 x_values, y_values[i], connect="finite")
+        self._update_frame_statistics(start_time)
+
+    def _setup_segments(self, size):
+        # The segments replace the curves, with the same color, position and transform
+        self._clear_segments()
+        self._segment_bounds = np.linspace(0, size, min(_SWEEP_SEGMENTS, max(size, 1)) + 1).astype(int)
+        for i in range(len(self._curves)):
+            self._curves[i].clear()
+            segments = []
+            for _ in range(len(self._segment_bounds) - 1):
+                c = pg.PlotCurveItem()
+                c.setPen(color = self._colors[i], cosmetic = True, joinStyle = QtCore.Qt.MiterJoin)
+                self._plotter_chart.window.addItem(c)
+                c.setPos(0, i * self._plot_offset)
+                c.setTransform(self._curves[i].transform())
+                segments.append(c)
+            self._segments.append(segments)
+
+    def _update_frame_statistics(self, start_time):
+        end_time = time.perf_counter()
+        self._render_time = 0.9 * self._render_time + 0.1 * (end_time - start_time)
+        if self._frame_time is not None and end_time > self._frame_time:
+            self._frames_per_second = 0.9 * self._frames_per_second + 0.1 / (end_time - self._frame_time)
+        self._frame_time = end_time
 
     
\ No newline at end of file
@@ -36,6 +36,7 @@ from PySide2 import QtWidgets
 from ..plotter import Plotter
 from ..charts.signal_chart import SignalChart
 from ..components.channel_component import ChannelComponent
+from ..utilities.tmsi_decimation import min_max_decimation, min_max_buckets
 
 
 class SignalPlotter(Plotter):
@@ -55,6 +56,13 @@ class SignalPlotter(Plotter):
         self._update_enabled_disabled = False
         self._update_scales_disabled = False
         self._compute_autoscale = False
+        self._decimation = True
+        self._sweep_data = None
+        self._sweep_time_span = None
+        self._sweep_transforms_outdated = True
+        self._sweep_decimated = None
+        self._sweep_changes = []
+        self._sweep_redraw = True
         self.window_size = 10
         self.chart.set_time_range(self.window_size)
         self._connect_widgets_to_functions()
@@ -156,36 +164,61 @@ class SignalPlotter(Plotter):
         """
         if not self.is_chart_update_enabled:
             return
+        if self._sweep_data is not None:
+            # Leave the sweep mode, samples are scaled before plotting them
+            self._sweep_data = None
+            self.chart.set_signal_transforms()
         if self._compute_autoscale:
-            self._update_scales_disabled = True
-            channel_components = [i for i in dir(self) if i.startswith("component_channel_")]
-            scales = []
-            offsets = []
-            for n_channel in range(len(data_to_plot)):
-                max_val = np.nanmax(data_to_plot[n_channel])
-                min_val = np.nanmin(data_to_plot[n_channel])
-                scale = (max_val-min_val)/2.0
-                offset = max_val-scale
-                if scale <= 1e-3:
-                    scale = 1
-                scales.append(scale)
-                offsets.append(offset)
-            for n_channel in range(len(channel_components)):
-                cmp = getattr(self, channel_components[n_channel])
-                cmp.set_scale(scales[cmp.get_index()])
-                cmp.set_offset(offsets[cmp.get_index()])
-            self._update_scales_disabled = False
-            self.update_offsets()
-            self.update_scales()
-            self.chart.update_y_ticks(
-                list_names = self._filter_lists_to_plot(self._channel_names),
-                list_offsets = self._filter_lists_to_plot(self._offsets),
-                list_scales = self._filter_lists_to_plot(self._scales),
-                list_units = self._filter_lists_to_plot(self._channel_units))
-            self._compute_autoscale = False
-        for i in range(len(data_to_plot)):
-            data_to_plot[i] = - (data_to_plot[i] - self._offsets[i]) / self._scales[i]
+            self._autoscale(data_to_plot)
+        if time_span is None:
+            time_span = np.linspace(0, self.window_size, np.shape(data_to_plot)[1])
+        data_to_plot, time_span = self._decimate(data_to_plot, time_span)
+        offsets = np.array([self._offsets[i] for i in range(len(data_to_plot))])
+        scales = np.array([self._scales[i] for i in range(len(data_to_plot))])
+        data_to_plot = - (np.asarray(data_to_plot, dtype = np.float64) - offsets[:, None]) / scales[:, None]
         self.chart.update_chart(self._filter_data_to_plot(data_to_plot), time_span)
+
+    def update_chart_sweep(self, new_data, start, size, time_span = None, whitening_zone = 0):
+        """Update chart with the samples received since the previous update only. 
+        The samples are written into a preallocated sweep window, where the newest 
+        sample overwrites the oldest one, and offset and scale are applied as a 
+        transform of the curves, so the samples already plotted are not touched. 
+        The curves are drawn in segments and only the segments with new samples 
+        are handed over to the chart.
+
+        :param new_data: new samples of each channel
+        :type new_data: numpy.ndarray
+        :param start: position in the sweep window of the first new sample
+        :type start: int
+        :param size: number of samples of the sweep window
+        :type size: int
+        :param time_span: time span for the sweep window (None to be automatically plotted in the range), defaults to None
+        :type time_span: list, optional
+        :param whitening_zone: number of samples to blank after the newest sample, defaults to 0
+        :type whitening_zone: int, optional
+        """
+        new_data = np.asarray(new_data)
+        n_channels, n_samples = np.shape(new_data)
+        if self._sweep_data is None or np.shape(self._sweep_data) != (n_channels, size):
+            self._sweep_data = np.full((n_channels, size), np.nan, dtype = np.float32)
+            self._sweep_transforms_outdated = True
+            self._sweep_redraw = True
+        if time_span is None:
+            if self._sweep_time_span is None or len(self._sweep_time_span) != size:
+                self._sweep_time_span = np.linspace(0, self.window_size, size, endpoint = False)
+                self._sweep_redraw = True
+        elif self._sweep_time_span is None or not np.array_equal(self._sweep_time_span, time_span[:size]):
+            self._sweep_time_span = time_span[:size]
+            self._sweep_redraw = True
+        if n_samples >= size:
+            start = (start + n_samples - size) % size
+            new_data = new_data[:, n_samples - size:]
+            n_samples = size
+        self._write_sweep(start, new_data)
+        if whitening_zone > 0:
+            whitening_zone = min(whitening_zone, size)
+            self._write_sweep((start + n_samples) % size, np.full((n_channels, whitening_zone), np.nan))
+        self._draw_sweep()
         
     def update_colors(self):
         """Update color of the chart based on the channel component
@@ -197,6 +230,7 @@ class SignalPlotter(Plotter):
             colors[cmp.get_index()] = cmp.get_color()
         colors = [colors[i] for i in range(len(colors)) if i in self._enabled_channels]
         self.chart.setup_signals(n_signals=len(colors), colors=colors)
+        self._sweep_transforms_outdated = True
 
     def update_enabled_channels(self):
         """Update the enabled channels based on channel component
@@ -225,6 +259,7 @@ class SignalPlotter(Plotter):
         if self._update_scales_disabled:
             return
         self._offsets = {}
+        self._sweep_transforms_outdated = True
         channel_components = [i for i in dir(self) if i.startswith("component_channel_")]
         for channel_component in channel_components:
             cmp = getattr(self,channel_component)
@@ -243,6 +278,7 @@ class SignalPlotter(Plotter):
         if self._update_scales_disabled:
             return
         self._scales = {}
+        self._sweep_transforms_outdated = True
         channel_components = [i for i in dir(self) if i.startswith("component_channel_")]
         for channel_component in channel_components:
             cmp = getattr(self,channel_component)
@@ -255,6 +291,16 @@ class SignalPlotter(Plotter):
                 list_scales = self._filter_lists_to_plot(self._scales),
             list_units = self._filter_lists_to_plot(self._channel_units))
 
+    def set_decimation(self, enabled = True):
+        """Enable or disable the min/max decimation of the signals before drawing them
+
+        :param enabled: True to draw the minimum and maximum per pixel, False to draw every sample, defaults to True
+        :type enabled: bool, optional
+        """
+        self._decimation = enabled
+        self._sweep_redraw = True
+        self._update_data()
+
     def update_time_ticks(self, start_time, end_time):
         """Update time ticks
 
@@ -271,6 +317,76 @@ class SignalPlotter(Plotter):
         self.btn_autoscale.clicked.connect(self.autoscale)
         self.spin_amplitude.valueChanged.connect(self.manual_scale)
 
+    def _autoscale(self, data_to_plot):
+        self._update_scales_disabled = True
+        channel_components = [i for i in dir(self) if i.startswith("component_channel_")]
+        data_to_plot = np.asarray(data_to_plot)
+        max_val = np.nanmax(data_to_plot, axis = 1)
+        min_val = np.nanmin(data_to_plot, axis = 1)
+        scales = (max_val - min_val) / 2.0
+        offsets = max_val - scales
+        scales[scales <= 1e-3] = 1
+        for n_channel in range(len(channel_components)):
+            cmp = getattr(self, channel_components[n_channel])
+            cmp.set_scale(scales[cmp.get_index()])
+            cmp.set_offset(offsets[cmp.get_index()])
+        self._update_scales_disabled = False
+        self.update_offsets()
+        self.update_scales()
+        self.chart.update_y_ticks(
+            list_names = self._filter_lists_to_plot(self._channel_names),
+            list_offsets = self._filter_lists_to_plot(self._offsets),
+            list_scales = self._filter_lists_to_plot(self._scales),
+            list_units = self._filter_lists_to_plot(self._channel_units))
+        self._compute_autoscale = False
+
+    def _decimate(self, data_to_plot, time_span):
+        if not self._decimation:
+            return data_to_plot, time_span
+        return min_max_decimation(data_to_plot, time_span, self.chart.get_width_in_pixels())
+
+    def _draw_sweep(self):
+        if not self.is_chart_update_enabled:
+            return
+        if self._compute_autoscale:
+            self._autoscale(self._sweep_data)
+        if self._sweep_transforms_outdated:
+            self.chart.set_signal_transforms(
+                offsets = self._filter_lists_to_plot(self._offsets),
+                scales = self._filter_lists_to_plot(self._scales))
+            self._sweep_transforms_outdated = False
+        data_to_plot, time_span, changes = self._decimate_sweep()
+        self.chart.update_chart_sweep(self._filter_data_to_plot(data_to_plot), time_span, changes)
+
+    def _decimate_sweep(self):
+        # Returns the sweep window to draw and the ranges changed since the previous 
+        # draw, None when everything must be drawn again
+        size = np.shape(self._sweep_data)[1]
+        n_buckets = self.chart.get_width_in_pixels()
+        changes = None if self._sweep_redraw else self._sweep_changes
+        self._sweep_changes = []
+        self._sweep_redraw = False
+        if not self._decimation or n_buckets < 1 or size < 4 * n_buckets:
+            if self._sweep_decimated is not None:
+                self._sweep_decimated = None
+                changes = None
+            return self._sweep_data, self._sweep_time_span, changes
+        bucket_size = -(-size // n_buckets)
+        if changes is None or self._sweep_decimated is None or self._sweep_bucket_size != bucket_size:
+            self._sweep_decimated, self._sweep_decimated_time_span = min_max_decimation(
+                self._sweep_data, self._sweep_time_span, n_buckets)
+            self._sweep_bucket_size = bucket_size
+            return self._sweep_decimated, self._sweep_decimated_time_span, None
+        # Only the buckets containing new samples are computed again
+        decimated_changes = []
+        for start, stop in changes:
+            first_bucket = start // bucket_size
+            last_bucket = -(-stop // bucket_size)
+            self._sweep_decimated[:, 2 * first_bucket:2 * last_bucket] = min_max_buckets(
+                self._sweep_data[:, first_bucket * bucket_size:min(last_bucket * bucket_size, size)], bucket_size)
+            decimated_changes.append((2 * first_bucket, 2 * last_bucket))
+        return self._sweep_decimated, self._sweep_decimated_time_span, decimated_changes
+
     def _filter_data_to_plot(self, data_to_plot):
         data_to_plot = [data_to_plot[row] for row in range(len(data_to_plot)) if row in self._enabled_channels]
         return data_to_plot
@@ -278,6 +394,20 @@ class SignalPlotter(Plotter):
     def _filter_lists_to_plot(self, list_to_filter):
         return [list_to_filter[i] for i in range(len(list_to_filter)) if i in self._enabled_channels]
     
+    def _write_sweep(self, start, samples):
+        if self._sweep_redraw or len(self._sweep_changes) > 100:
+            # The sweep window will be drawn again at once
+            self._sweep_redraw = True
+            self._sweep_changes = []
+        first_chunk = min(np.shape(samples)[1], np.shape(self._sweep_data)[1] - start)
+        self._sweep_data[:, start:start + first_chunk] = samples[:, :first_chunk]
+        self._sweep_changes.append((start, start + first_chunk))
+        if first_chunk < np.shape(samples)[1]:
+            self._sweep_data[:, :np.shape(samples)[1] - first_chunk] = samples[:, first_chunk:]
+            self._sweep_changes.append((0, np.shape(samples)[1] - first_chunk))
+    
     def _update_data(self):
         if self._get_data_callback is not None:
-            self._get_data_callback()
\ No newline at end of file
+            self._get_data_callback()
+        elif self._sweep_data is not None:
+            self._draw_sweep()
\ No newline at end of file
@@ -0,0 +1,91 @@
+'''
+(c) 2023 Twente Medical Systems International B.V., Oldenzaal The Netherlands
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+#######  #     #   #####   #
+   #     ##   ##  #        
+   #     # # # #  #        #
+   #     #  #  #   #####   #
+   #     #     #        #  #
+   #     #     #        #  #
+   #     #     #  #####    #
+
+/**
+ * @file tmsi_decimation.py 
+ * @brief 
+ * Functions to reduce the number of samples to draw.
+ */
+
+
+'''
+import numpy as np
+
+
+def min_max_decimation(signals, time_span, n_buckets):
+    """Reduce the signals to the minimum and maximum of a number of buckets of 
+    consecutive samples, computed for all channels at once. Drawn as a line, the 
+    result shows the same envelope as the original signals when each bucket 
+    covers at most one pixel. Buckets which only contain nan values stay nan.
+
+    :param signals: samples of each channel
+    :type signals: numpy.ndarray
+    :param time_span: time of each sample
+    :type time_span: numpy.ndarray
+    :param n_buckets: maximum number of buckets, usually the width of the chart in pixels
+    :type n_buckets: int
+    :return: minimum and maximum of each bucket, alternated, and the time of the 
+        first and last sample of each bucket. The input is returned when it 
+        contains less than four samples per bucket.
+    :rtype: tuple[numpy.ndarray, numpy.ndarray]
+    """
+    signals = np.asarray(signals)
+    time_span = np.asarray(time_span)
+    n_samples = min(np.shape(signals)[1], len(time_span))
+    if n_buckets < 1 or n_samples < 4 * n_buckets:
+        return signals, time_span
+    bucket_size = -(-n_samples // n_buckets)
+    decimated = min_max_buckets(signals[:, :n_samples], bucket_size)
+    first_samples = np.arange(0, n_samples, bucket_size)
+    last_samples = np.minimum(first_samples + bucket_size - 1, n_samples - 1)
+    decimated_time_span = np.empty(2 * len(first_samples), dtype = time_span.dtype)
+    decimated_time_span[0::2] = time_span[first_samples]
+    decimated_time_span[1::2] = time_span[last_samples]
+    return decimated, decimated_time_span
+
+
+def min_max_buckets(signals, bucket_size):
+    """Compute the minimum and maximum of consecutive buckets of samples for all 
+    channels at once. The last bucket contains the remaining samples when the 
+    number of samples is not a multiple of the bucket size.
+
+    :param signals: samples of each channel
+    :type signals: numpy.ndarray
+    :param bucket_size: number of samples per bucket
+    :type bucket_size: int
+    :return: minimum and maximum of each bucket, alternated.
+    :rtype: numpy.ndarray
+    """
+    n_channels, n_samples = np.shape(signals)
+    n_full_buckets = n_samples // bucket_size
+    n_full_samples = n_full_buckets * bucket_size
+    buckets = signals[:, :n_full_samples].reshape(n_channels, n_full_buckets, bucket_size)
+    n_buckets = -(-n_samples // bucket_size)
+    decimated = np.empty((n_channels, 2 * n_buckets), dtype = signals.dtype)
+    # fmin and fmax ignore nan values unless all values are nan
+    np.fmin.reduce(buckets, axis = 2, out = decimated[:, 0:2 * n_full_buckets:2])
+    np.fmax.reduce(buckets, axis = 2, out = decimated[:, 1:2 * n_full_buckets:2])
+    if n_full_samples < n_samples:
+        decimated[:, -2] = np.fmin.reduce(signals[:, n_full_samples:], axis = 1)
+        decimated[:, -1] = np.fmax.reduce(signals[:, n_full_samples:], axis = 1)
+    return decimated
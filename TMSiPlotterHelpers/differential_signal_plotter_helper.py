@@ -24,62 +24,47 @@ limitations under the License.
 /**
  * @file ${differential_signal_plotter_helper.py}
  * @brief Plotter helper for creating a differential plotter for HD-EMG purposes.
- *  The plotter plots the difference between successive electrode based on 
- * channel names.
+ *  The plotter plots a montage of the grid, by default the difference between
+ * successive electrodes, based on channel names.
  *
  */
 ''' 
 
 import numpy as np 
-from operator import itemgetter
 
 from TMSiFrontend.plotters.signal_plotter import SignalPlotter
+from TMSiBackend.buffer import Buffer
+from TMSiProcessing.montages import Montage
 
 from .filtered_signal_plotter_helper import FilteredSignalPlotterHelper
 
 class DifferentialSignalPlotterHelper(FilteredSignalPlotterHelper):
-    def __init__(self, device, grid_type=None, hpf=0, lpf=0, order=1):
-        super().__init__(device=device, grid_type=grid_type, hpf=hpf, lpf=lpf, order=order)
+    def __init__(self, device, grid_type=None, hpf=0, lpf=0, order=1, worker_process=False, derivation=Montage.SINGLE_DIFFERENTIAL):
+        super().__init__(device=device, grid_type=grid_type, hpf=hpf, lpf=lpf, order=order, worker_process=worker_process)
         self.plotter2 = SignalPlotter()
+        self.derivation = derivation
     
     def callback(self, response):
-        pointer_data_to_plot = response.pointer_buffer
-        data_to_plot = response.dataset
+        response, new_samples = self._read_buffer(response)
         # Wait untill data is coming in
-        if data_to_plot is None:
+        if response.dataset is None or new_samples == 0:
             return
-        size_dataset = np.shape(data_to_plot)[1]
-        n_channels = np.shape(data_to_plot)[0]
-        # add whitening zone 
-        if pointer_data_to_plot != size_dataset:
-            num_time_samples = self.sampling_frequency * self.main_plotter.window_size
-            whitening_zone = int(self.whitening_zone * num_time_samples)
-            space_to_fill = size_dataset - pointer_data_to_plot
-            if space_to_fill < whitening_zone:
-                data_to_plot[:, pointer_data_to_plot:] = \
-                    np.full((n_channels, space_to_fill), np.nan)
-            else:
-                data_to_plot[:, pointer_data_to_plot:pointer_data_to_plot+whitening_zone] = \
-                    np.full((n_channels, whitening_zone), np.nan)
         # Send data to plotter and update chart
-        self.main_plotter.update_chart(data_to_plot = data_to_plot[self.channel_conversion_list], time_span=self.time_span)
+        self._update_main_plotter(response, new_samples)
         
         # Update plotter2 depending on refresh rate
         if self.main_plotter_refresh_counter % self.plotter2_refresh_rate == 0:
-            if size_dataset < response.size_buffer:
-                data_to_return = np.empty((n_channels, response.size_buffer))
-                data_to_return[:] = np.nan
-                data_to_return[:,response.size_buffer - pointer_data_to_plot:] = data_to_plot[:,:pointer_data_to_plot]
-            else:
-                # Flip data such that the newest data is on the end
-                data_to_return = np.ones_like(data_to_plot)
-                data_to_return[:,size_dataset - pointer_data_to_plot:] = data_to_plot[:,:pointer_data_to_plot]
-                data_to_return[:,:size_dataset - pointer_data_to_plot] = data_to_plot[:,pointer_data_to_plot:]
-            
-            # Calculate differential data
-            SD_data = np.matmul(self.SD_matrix, data_to_return[:,-len(self.differential_time_span):])
+            n_differential_samples = len(self.differential_time_span)
+            # Only derive the samples received since the previous update which are shown
+            new_derived_samples = min(response.total_samples - self._derived_samples, n_differential_samples)
+            self.montage_buffer.append(self.montage.apply(response.latest(new_derived_samples)))
+            self._derived_samples = response.total_samples
+            newest_data = self.montage_buffer.latest(n_differential_samples)
+            # Newest data is on the end, pad with nan while the buffer is filling
+            data_to_return = np.full((self.montage.get_num_channels(), n_differential_samples), np.nan)
+            data_to_return[:, n_differential_samples - np.shape(newest_data)[1]:] = newest_data
             # Send data to plotter and update chart
-            self.plotter2.update_chart(data_to_plot = SD_data, time_span=self.differential_time_span)
+            self.plotter2.update_chart(data_to_plot = data_to_return, time_span=self.differential_time_span)
         self.main_plotter_refresh_counter += 1
 
     def initialize(self):
@@ -90,64 +75,19 @@ class DifferentialSignalPlotterHelper(FilteredSignalPlotterHelper):
         # Set refresh rate to update every 10 times (=1Hz) to have readible signals
         self.plotter2_refresh_rate = 10
         self.main_plotter_refresh_counter = 0
-        # Generate single differential matrix and corresponding channel names
-        self.SD_matrix, ch_names_diff = self.get_single_differential_matrix()
+        # Generate the montage of the grid and the buffer of the derived signals
+        self.montage = Montage.from_grid(
+            [ch.get_channel_name() for ch in self.channels_default], derivation = self.derivation)
+        self.montage_buffer = Buffer(len(self.differential_time_span))
+        self._derived_samples = 0
 
         # Get type of channels instance
         SignalType = self.channels[0].__class__
         # Generate channels list with differential channel names
         differential_signals = []
-        for i in ch_names_diff:
+        for i in self.montage.get_channel_names():
             sig = SignalType()
             sig.set_channel_name(alternative_channel_name= i)
             differential_signals.append(sig)
         # Initialize channel components
         self.plotter2.initialize_channels_components(differential_signals)
-
-
-    def _get_grid_order(self):
-        # Detect row and column number based on channel name 
-        RC_order = []
-        for i, ch in enumerate(self.channels_default):
-            if ch.get_channel_name().find('R') == 0:
-                R,C = ch.get_channel_name()[1:].split('C')
-                RC_order.append((int(R),int(C),i))
-
-        RC_order.sort()     
-        
-        # Create matrix with channel number for each position
-        RC_matrix=np.zeros((max(RC_order, key=itemgetter(0))[0],max(RC_order, key=itemgetter(1))[1]))*np.nan
-        for i in range(len(RC_order)):
-            R,C, ch = RC_order[i]
-            R = R - 1
-            C = C - 1
-            RC_matrix[R,C] = ch
-            
-        return RC_order, RC_matrix
-        
-    def get_single_differential_matrix(self):
-        RC_order, RC_matrix = self._get_grid_order()
-        
-        # Initialize channel names
-        ch_names_diff = ['R1C1 - R1C2']
-        skip = 0
-        # Single differential matrix
-        SD_matrix = np.zeros((np.shape(RC_matrix)[0]*(np.shape(RC_matrix)[1]-1), len(self.device.get_device_active_channels())))
-        n_C = np.shape(RC_matrix)[1]-1
-        for r in range(0, max(RC_order, key=itemgetter(0))[0]):
-            for c in range(0, max(RC_order, key=itemgetter(1))[1]-1):
-                # If channel RC and R(C+1) are available, 
-                # RC - R(C+1) 
-                # SD = np.matmul(SD_matrix. samples) 
-                if not np.isnan(RC_matrix[r,c]) and not np.isnan(RC_matrix[r,c+1]):
-                    SD_matrix[n_C*r + c - skip, int(RC_matrix[r,c])] = 1
-                    SD_matrix[n_C*r + c -skip, int(RC_matrix[r,c+1])] = -1
-                    # Create channel name
-                    ch_names_diff = np.vstack((ch_names_diff, 'R'+str(r+1)+'C'+str(c+1) + ' - ' + 'R'+str(r+1)+'C'+str(c+2)))
-                else:
-                    # Delete row when not available
-                    SD_matrix = np.delete(SD_matrix, n_C*r + c-skip, 0)
-                    skip = skip + 1 
-        # Remove initial channel name
-        ch_names_diff = ch_names_diff[1:,:]
-        return SD_matrix, ch_names_diff
\ No newline at end of file
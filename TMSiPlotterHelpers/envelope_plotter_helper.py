@@ -37,11 +37,10 @@ from TMSiFrontend.plotters.signal_plotter import SignalPlotter
 
 from TMSiBackend.data_consumer.consumer_thread import ConsumerThread
 from TMSiBackend.data_consumer.consumer import Consumer
+from TMSiBackend.data_consumer.consumer_process import ConsumerProcess
 from TMSiBackend.buffer import Buffer
 from TMSiBackend.data_monitor.monitor import Monitor
 
-from TMSiSDK.tmsi_utilities.support_functions import array_to_matrix as Reshape
-
 from .signal_plotter_helper import SignalPlotterHelper
 
 
@@ -57,8 +56,10 @@ class EnvelopeSignalPlotterHelper(SignalPlotterHelper):
         :type lpf_fc: int, optional
         :param order: order of the filters
         :type order: int, optional
+        :param worker_process: extract the envelope in a worker process instead of a thread, defaults to False
+        :type worker_process: bool, optional
     """
-    def __init__(self,  device, grid_type = None, bpf_fc1 = 10, bpf_fc2 = 500, lpf_fc = 10, order = 1):
+    def __init__(self,  device, grid_type = None, bpf_fc1 = 10, bpf_fc2 = 500, lpf_fc = 10, order = 1, worker_process = False):
         # call super of SignalAcquisitionHelper
         super(SignalPlotterHelper, self).__init__(device = device, monitor_class = Monitor, consumer_thread_class = EnvelopeConsumerThread)
         self.main_plotter = SignalPlotter()
@@ -67,15 +68,24 @@ class EnvelopeSignalPlotterHelper(SignalPlotterHelper):
         self.bpf_fc2 = bpf_fc2
         self.lpf_fc = lpf_fc
         self.order = order
+        self.worker_process = worker_process
 
     def start(self):
         self.consumer = Consumer()
-        self.consumer_thread = self.consumer_thread_class(
-            consumer_reading_queue=self.consumer.reading_queue,
-            sample_rate=self.device.get_device_sampling_frequency()
-        )
-        # Initialize filter
-        self.consumer_thread.initialize_filter(bpf_fc1 = self.bpf_fc1, bpf_fc2 = self.bpf_fc2, lpf_fc = self.lpf_fc, order = self.order)
+        if self.worker_process:
+            # Initialize filter in the worker process
+            self.consumer_thread = ConsumerProcess(
+                consumer_thread_class = self.consumer_thread_class,
+                sample_rate = self.device.get_device_sampling_frequency(),
+                num_channels = len(self.device.get_device_active_channels()),
+                initialization = {"initialize_filter": {"bpf_fc1": self.bpf_fc1, "bpf_fc2": self.bpf_fc2, "lpf_fc": self.lpf_fc, "order": self.order}})
+        else:
+            self.consumer_thread = self.consumer_thread_class(
+                consumer_reading_queue=self.consumer.reading_queue,
+                sample_rate=self.device.get_device_sampling_frequency()
+            )
+            # Initialize filter
+            self.consumer_thread.initialize_filter(bpf_fc1 = self.bpf_fc1, bpf_fc2 = self.bpf_fc2, lpf_fc = self.lpf_fc, order = self.order)
         self.consumer.open(
             server = self.device,
             reading_queue_id = self.device.get_id(),
@@ -87,7 +97,7 @@ class EnvelopeSignalPlotterHelper(SignalPlotterHelper):
 
 
     def monitor_function(self):
-        return self.consumer_thread.filtered_buffer.copy()
+        return self.consumer_thread.filtered_buffer
 
 
 class EnvelopeConsumerThread(ConsumerThread):
@@ -120,7 +130,7 @@ class EnvelopeConsumerThread(ConsumerThread):
         self._sos_bpf = signal.butter(order, [bpf_fc1, bpf_fc2], 'bandpass', fs=self.sample_rate, output='sos')
 
     def process(self, sample_data):
-        reshaped = np.array(Reshape(sample_data.samples, sample_data.num_samples_per_sample_set))
+        reshaped = sample_data.data
         # Update original buffer
         self.original_buffer.append(reshaped)
         # Do not filter if no filter is present
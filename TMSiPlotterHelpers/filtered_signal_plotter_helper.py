@@ -40,16 +40,15 @@ from TMSiFrontend.plotters.signal_plotter import SignalPlotter
 
 from TMSiBackend.data_consumer.consumer_thread import ConsumerThread
 from TMSiBackend.data_consumer.consumer import Consumer
+from TMSiBackend.data_consumer.consumer_process import ConsumerProcess
 from TMSiBackend.buffer import Buffer
 from TMSiBackend.data_monitor.monitor import Monitor
 
-from TMSiSDK.tmsi_utilities.support_functions import array_to_matrix as Reshape
-
 from .signal_plotter_helper import SignalPlotterHelper
 
 
 class FilteredSignalPlotterHelper(SignalPlotterHelper):
-    def __init__(self,  device, grid_type = None, hpf = 0, lpf = 0, order = 1):
+    def __init__(self,  device, grid_type = None, hpf = 0, lpf = 0, order = 1, worker_process = False):
         # call super of SignalPlotterHelper
         super(SignalPlotterHelper, self).__init__(device = device,monitor_class = Monitor, consumer_thread_class = FilteredConsumerThread)
         self.main_plotter = SignalPlotter()
@@ -58,15 +57,25 @@ class FilteredSignalPlotterHelper(SignalPlotterHelper):
         self.hpf = hpf
         self.lpf = lpf
         self.order = order
+        # filter in a worker process instead of a thread
+        self.worker_process = worker_process
 
     def start(self):
         self.consumer = Consumer()
-        self.consumer_thread = self.consumer_thread_class(
-            consumer_reading_queue=self.consumer.reading_queue,
-            sample_rate=self.device.get_device_sampling_frequency()
-        )
-        # Initialize filter
-        self.consumer_thread.initialize_filter(hpf = self.hpf, lpf = self.lpf, order = self.order)
+        if self.worker_process:
+            # Initialize filter in the worker process
+            self.consumer_thread = ConsumerProcess(
+                consumer_thread_class = self.consumer_thread_class,
+                sample_rate = self.device.get_device_sampling_frequency(),
+                num_channels = len(self.device.get_device_active_channels()),
+                initialization = {"initialize_filter": {"hpf": self.hpf, "lpf": self.lpf, "order": self.order}})
+        else:
+            self.consumer_thread = self.consumer_thread_class(
+                consumer_reading_queue=self.consumer.reading_queue,
+                sample_rate=self.device.get_device_sampling_frequency()
+            )
+            # Initialize filter
+            self.consumer_thread.initialize_filter(hpf = self.hpf, lpf = self.lpf, order = self.order)
         self.consumer.open(
             server = self.device,
             reading_queue_id = self.device.get_id(),
@@ -78,7 +87,7 @@ class FilteredSignalPlotterHelper(SignalPlotterHelper):
 
 
     def monitor_function(self):
-        return self.consumer_thread.filtered_buffer.copy()
+        return self.consumer_thread.filtered_buffer
 
 
 class FilteredConsumerThread(ConsumerThread):
@@ -121,13 +130,13 @@ class FilteredConsumerThread(ConsumerThread):
             self._sos = None
 
     def process(self, sample_data):
-        reshaped = np.array(Reshape(sample_data.samples, sample_data.num_samples_per_sample_set))
+        reshaped = sample_data.data
         # Update original buffer
         self.original_buffer.append(reshaped)
         # Do not filter if no filter is present
         if not hasattr(self, "_sos") or self._sos is None:
             self.filtered_buffer.append(reshaped)
-            return None
+            return reshaped
         # Construct initial conditions
         if not hasattr(self, "_z_sos"):
             self._z_sos = signal.sosfilt_zi(self._sos)
@@ -138,6 +147,7 @@ class FilteredConsumerThread(ConsumerThread):
         filtered[-2] = reshaped[-2]
         filtered[-1] = reshaped[-1]
         self.filtered_buffer.append(filtered)
+        return filtered
 
     def __filter(self, reshaped):
         filtered, z_sos1 = signal.sosfilt(
@@ -38,6 +38,7 @@ from PySide2 import QtWidgets
 from os.path import join, dirname, realpath, normpath, exists
 import json
 
+from TMSiBackend.data_consumer.consumer import Consumer
 from TMSiBackend.data_monitor.monitor import Monitor
 
 from TMSiSDK.device.tmsi_device_enums import MeasurementType
@@ -52,9 +53,24 @@ from .filtered_signal_plotter_helper import FilteredSignalPlotterHelper, Filtere
 
 
 class HeatmapPlotterHelper(FilteredSignalPlotterHelper):
-    def __init__(self,  device, layout = '4-8-L', hpf = 5, lpf = 0, order = 1):
+    """ Plotter helper class to plot the RMS of the signals on a heatmap
+
+        :param layout: layout of the electrodes, 'head' or the grid type, defaults to '4-8-L'
+        :type layout: str, optional
+        :param hpf: high pass frequency, defaults to 5
+        :type hpf: int, optional
+        :param lpf: low pass frequency, defaults to 0
+        :type lpf: int, optional
+        :param order: order of the filter, defaults to 1
+        :type order: int, optional
+        :param rms_window: length of the RMS window in seconds, defaults to 0.25
+        :type rms_window: float, optional
+        :param rms_smoothing: time constant in seconds of the exponential smoothing of the RMS, defaults to 0 (no smoothing)
+        :type rms_smoothing: float, optional
+    """
+    def __init__(self,  device, layout = '4-8-L', hpf = 5, lpf = 0, order = 1, rms_window = 0.25, rms_smoothing = 0):
         # call super of SignalAcquisitionHelper, initializing acquisition details
-        super(SignalPlotterHelper, self).__init__(device = device, monitor_class = Monitor, consumer_thread_class = FilteredConsumerThread )
+        super(SignalPlotterHelper, self).__init__(device = device, monitor_class = Monitor, consumer_thread_class = RMSConsumerThread)
         
         if self.device.get_device_type() == 'SAGA':
             self.measurement_type = MeasurementType.SAGA_SIGNAL
@@ -73,26 +89,19 @@ class HeatmapPlotterHelper(FilteredSignalPlotterHelper):
         self.lpf = lpf
         self.order = order
 
+        # rms settings
+        self.rms_window = rms_window
+        self.rms_smoothing = rms_smoothing
+
     def callback(self, response):
-        # The function that provides the plotter from data
-        pointer = response.pointer_buffer
+        # The rms is kept up to date by the consumer thread
         # Wait for data to come in
-        if response.dataset is None:
+        if response is None:
             return
-          
-        # Get data in time window
-        if len(response.dataset[0]) <= self.window_length:
-            data = response.dataset
-        elif pointer < self.window_length:
-            data = np.hstack((response.dataset[:,-(self.window_length-pointer):], response.dataset[:,:pointer]))
-        else:
-            data = response.dataset[:,(pointer-self.window_length):pointer]
-        # Calulate rms
-        rms_data = np.sqrt(np.mean(data**2, axis = 1))
-        self.main_plotter.update_chart(rms_data[self.heatmap_channels])
+        self.main_plotter.update_chart(response[self.heatmap_channels])
 
     def initialize(self):
-        self.window_length = int(self.sampling_frequency/4)
+        self.window_length = max(int(self.sampling_frequency * self.rms_window), 1)
         self.channels_default = self.device.get_device_channels()
         self.active_channels = self.device.get_device_active_channels()
         # get electrode positions and channel ordening
@@ -109,6 +118,27 @@ class HeatmapPlotterHelper(FilteredSignalPlotterHelper):
         else:
             self.main_plotter.set_electrode_position(channels = original_channels, coordinates = coordinates)
 
+    def start(self):
+        self.consumer = Consumer()
+        self.consumer_thread = self.consumer_thread_class(
+            consumer_reading_queue=self.consumer.reading_queue,
+            sample_rate=self.device.get_device_sampling_frequency()
+        )
+        # Initialize filter and rms
+        self.consumer_thread.initialize_filter(hpf = self.hpf, lpf = self.lpf, order = self.order)
+        self.consumer_thread.initialize_rms(window_length = self.window_length, smoothing_time = self.rms_smoothing)
+        self.consumer.open(
+            server = self.device,
+            reading_queue_id = self.device.get_id(),
+            consumer_thread=self.consumer_thread)
+        # Start measurement
+        self.device.start_measurement(self.measurement_type)
+        self.monitor = self.monitor_class(monitor_function = self.monitor_function, callback=self.callback, on_error=self.on_error)
+        self.monitor.start()
+
+    def monitor_function(self):
+        return self.consumer_thread.rms
+
     def _read_grid_info(self):
         file_dir = dirname(realpath(__file__)) # directory of this file
         # Get the HD-EMG conversion file
@@ -157,3 +187,65 @@ class HeatmapPlotterHelper(FilteredSignalPlotterHelper):
                     else:
                         coordinates = TMSiGrids().grids["8-8"]
         return coordinates
+
+
+class RMSConsumerThread(FilteredConsumerThread):
+    """ Class to filter the data and keep the RMS over a sliding window up to date.
+        The squared samples of the window are kept in a circular buffer, so for 
+        every new chunk the new squares are added to the running sum and the 
+        expired ones are subtracted.
+    """
+    def __init__(self, consumer_reading_queue, sample_rate):
+        super().__init__(consumer_reading_queue, sample_rate)
+        self.rms = None
+
+    def initialize_rms(self, window_length, smoothing_time = 0):
+        """Initialize the sliding window of the RMS.
+
+        :param window_length: number of samples of the RMS window.
+        :type window_length: int
+        :param smoothing_time: time constant in seconds of the exponential smoothing of the RMS, defaults to 0 (no smoothing)
+        :type smoothing_time: float, optional
+        """
+        self._rms_window_length = max(int(window_length), 1)
+        self._rms_smoothing_time = smoothing_time
+        self._squares = None
+        self.rms = None
+
+    def process(self, sample_data):
+        filtered = super().process(sample_data)
+        if hasattr(self, "_rms_window_length"):
+            self.__update_rms(filtered)
+
+    def __update_rms(self, samples):
+        n_samples = np.shape(samples)[1]
+        if n_samples == 0:
+            return
+        window_length = self._rms_window_length
+        if self._squares is None:
+            self._squares = np.zeros((np.shape(samples)[0], window_length))
+            self._square_sum = np.zeros(np.shape(samples)[0])
+            self._squares_pointer = 0
+            self._squares_count = 0
+        if n_samples >= window_length:
+            # the chunk fills the whole window
+            self._squares[:] = np.square(samples[:, n_samples - window_length:], dtype = np.float64)
+            self._square_sum = self._squares.sum(axis = 1)
+            self._squares_pointer = 0
+            self._squares_count = window_length
+        else:
+            squares = np.square(samples, dtype = np.float64)
+            indices = np.arange(self._squares_pointer, self._squares_pointer + n_samples) % window_length
+            self._square_sum += squares.sum(axis = 1) - self._squares[:, indices].sum(axis = 1)
+            self._squares[:, indices] = squares
+            self._squares_pointer = (self._squares_pointer + n_samples) % window_length
+            self._squares_count = min(self._squares_count + n_samples, window_length)
+            if self._squares_pointer < n_samples:
+                # Recompute the sum once per window, so rounding errors do not accumulate
+                self._square_sum = self._squares.sum(axis = 1)
+        rms = np.sqrt(np.maximum(self._square_sum, 0) / self._squares_count)
+        if self._rms_smoothing_time > 0 and self.rms is not None:
+            alpha = 1 - np.exp(-n_samples / (self._rms_smoothing_time * self.sample_rate))
+            rms = self.rms + alpha * (rms - self.rms)
+        # A new array is assigned, so the monitor never reads a partial update
+        self.rms = rms
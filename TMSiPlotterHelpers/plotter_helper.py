@@ -28,6 +28,8 @@ limitations under the License.
  */
 '''
 
+from TMSiBackend.buffer import Buffer
+
 class PlotterHelper:
     def __init__(self, device, monitor_class, consumer_thread_class):
         self.device = device
@@ -48,6 +50,22 @@ class PlotterHelper:
     def on_error(self, response):
         print("on_error plotter helper")
 
+    def _read_buffer(self, buffer):
+        """Update the private display copy of a buffer of the consumer thread with 
+        the samples received since the previous call, so the full buffer does not 
+        have to be copied every time the plot is refreshed.
+
+        :param buffer: buffer of the consumer thread returned by the monitor function.
+        :type buffer: Buffer
+        :return: display copy of the buffer and number of samples received since the previous call.
+        :rtype: tuple[Buffer, int]
+        """
+        if getattr(self, "_monitored_buffer", None) is not buffer:
+            self._monitored_buffer = buffer
+            self._display_buffer = Buffer(buffer.size_buffer, buffer.dtype)
+        new_samples = self._display_buffer.update_from(buffer)
+        return self._display_buffer, new_samples
+
     def start(self, measurement_type):
         raise NotImplementedError("This method must be implemented for each plotter helper")
 
@@ -49,27 +49,11 @@ class SignalPlotterHelper(PlotterHelper):
         self.grid_type = grid_type      
 
     def callback(self, response):
-        pointer_data_to_plot = response.pointer_buffer
-        data_to_plot = response.dataset
+        response, new_samples = self._read_buffer(response)
         # Wait untill data is coming in
-        if data_to_plot is None:
+        if response.dataset is None or new_samples == 0:
             return
-        size_dataset = np.shape(data_to_plot)[1]
-        n_channels = np.shape(data_to_plot)[0]
-        # add whitening zone 
-        if pointer_data_to_plot != size_dataset:
-            num_time_samples = self.sampling_frequency * self.main_plotter.window_size
-            whitening_zone = int(self.whitening_zone * num_time_samples)
-            space_to_fill = size_dataset - pointer_data_to_plot
-            if space_to_fill < whitening_zone:
-                data_to_plot[:, pointer_data_to_plot:] = \
-                    np.full((n_channels, space_to_fill), np.nan)
-            else:
-                data_to_plot[:, pointer_data_to_plot:pointer_data_to_plot+whitening_zone] = \
-                    np.full((n_channels, whitening_zone), np.nan)
-        # Reorder data 
-        # Send data to plotter and update chart
-        self.main_plotter.update_chart(data_to_plot = data_to_plot[self.channel_conversion_list], time_span=self.time_span)
+        self._update_main_plotter(response, new_samples)
 
     def initialize(self):
         if self.device.get_device_type() == 'SAGA':
@@ -89,7 +73,7 @@ class SignalPlotterHelper(PlotterHelper):
         self.main_plotter.initialize_channels_components(self.channels)
         
     def monitor_function(self):
-        return self.consumer_thread.original_buffer.copy()
+        return self.consumer_thread.original_buffer
     
     def on_error(self, response):
         print("ERROR! {}".format(response))
@@ -116,6 +100,21 @@ class SignalPlotterHelper(PlotterHelper):
     def stop(self):
         super().stop()
 
+    def _update_main_plotter(self, response, new_samples):
+        # Only the new samples are sent to the plotter, in the sweep window
+        new_data = response.latest(new_samples)
+        start = (response.total_samples - np.shape(new_data)[1]) % response.size_buffer
+        num_time_samples = self.sampling_frequency * self.main_plotter.window_size
+        whitening_zone = int(self.whitening_zone * num_time_samples)
+        # Reorder data 
+        # Send data to plotter and update chart
+        self.main_plotter.update_chart_sweep(
+            new_data = new_data[self.channel_conversion_list], 
+            start = start, 
+            size = response.size_buffer,
+            time_span = self.time_span,
+            whitening_zone = whitening_zone)
+
     def _read_grid_info(self):
         file_dir = dirname(realpath(__file__)) # directory of this file
         # Get the HD-EMG conversion file
@@ -36,4 +36,5 @@ Filters_dir = dirname(realpath(__file__)) # directory of this file
 modules_dir = join(Filters_dir, '...') # directory with all modules
 sys.path.append(modules_dir)
 
-from TMSiProcessing.filters.real_time_filter import RealTimeFilter
\ No newline at end of file
+from TMSiProcessing.filters.real_time_filter import RealTimeFilter
+from TMSiProcessing.filters.filter_bank import FilterBank
\ No newline at end of file
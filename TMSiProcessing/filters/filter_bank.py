@@ -0,0 +1,222 @@
+'''
+(c) 2022 Twente Medical Systems International B.V., Oldenzaal The Netherlands
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+#######  #     #   #####   #
+   #     ##   ##  #
+   #     # # # #  #        #
+   #     #  #  #   #####   #
+   #     #     #        #  #
+   #     #     #        #  #
+   #     #     #  #####    #
+
+/**
+ * @file ${filter_bank.py}
+ * @brief Bank of IIR filters for groups of channels of multichannel data.
+ *
+ */
+
+
+'''
+
+import numpy as np
+from scipy import signal
+
+try:
+    # Compiled kernel of signal.sosfilt, it filters the samples in place
+    from scipy.signal._sosfilt import _sosfilt
+except ImportError:
+    _sosfilt = None
+
+
+class FilterBank:
+    """ Bank of IIR filters for multichannel data with the channels on the
+    first axis. The channels are divided in groups and every group has its own
+    cascade of second-order sections (notch filters followed by a high-pass,
+    low-pass or band-pass filter), designed for all the channels of the group
+    at once, and its own filter state, which is kept between the calls.
+    Groups of consecutive channels are filtered in place on a view of the
+    samples, so the channels are not copied in and out of the data.
+    """
+    def __init__(self, sample_rate, dtype = np.float64):
+        """Initialise the filter bank
+
+        :param sample_rate: sampling frequency of the data
+        :type sample_rate: float
+        :param dtype: data type of the samples to filter, float32 or float64, defaults to np.float64
+        :type dtype: numpy.dtype, optional
+        """
+        self.sample_rate = sample_rate
+        self.dtype = np.dtype(dtype)
+        self._groups = {}
+
+    def add_group(self, name, channels):
+        """Add a group of channels, which is not filtered until a filter is designed for it.
+
+        :param name: name of the group
+        :type name: str
+        :param channels: indices of the channels of the group
+        :type channels: list[int]
+        """
+        channels = np.asarray(channels, dtype = int)
+        if len(channels) > 0 and np.array_equal(channels, np.arange(channels[0], channels[0] + len(channels))):
+            index = slice(int(channels[0]), int(channels[0]) + len(channels))
+        else:
+            index = channels
+        self._groups[name] = {'channels': channels, 'index': index, 'sos': None, 'z_sos': None, 'enabled': False}
+
+    def get_group_names(self):
+        """Get the names of the groups of channels
+
+        :return: names of the groups
+        :rtype: list[str]
+        """
+        return list(self._groups.keys())
+
+    def design(self, name, order = 2, Fc_hp = None, Fc_lp = None, notch = None, quality_factor = 30):
+        """Design the cascade of filters of a group: the notch filters followed
+        by a high-pass filter when only Fc_hp is specified, a low-pass filter when
+        only Fc_lp is specified or a band-pass filter when both are given. The
+        group is not filtered when no frequencies are given.
+
+        :param name: name of the group
+        :type name: str
+        :param order: order of the Butterworth filter, defaults to 2
+        :type order: int, optional
+        :param Fc_hp: cut-off frequency of the high-pass filter, defaults to None
+        :type Fc_hp: float, optional
+        :param Fc_lp: cut-off frequency of the low-pass filter, defaults to None
+        :type Fc_lp: float, optional
+        :param notch: frequency or list of frequencies to remove, defaults to None
+        :type notch: float or list[float], optional
+        :param quality_factor: quality factor of the notch filters, defaults to 30
+        :type quality_factor: float, optional
+        :return: second-order sections of the cascade, None when there is no filter
+        :rtype: numpy.ndarray
+        """
+        sections = []
+        if notch:
+            for frequency in np.atleast_1d(notch):
+                b, a = signal.iirnotch(frequency, quality_factor, fs = self.sample_rate)
+                sections.append(signal.tf2sos(b, a))
+        if Fc_hp and Fc_lp:
+            sections.append(signal.butter(order, [Fc_hp, Fc_lp], 'bandpass', fs = self.sample_rate, output = 'sos'))
+        elif Fc_hp:
+            sections.append(signal.butter(order, Fc_hp, 'highpass', fs = self.sample_rate, output = 'sos'))
+        elif Fc_lp:
+            sections.append(signal.butter(order, Fc_lp, 'lowpass', fs = self.sample_rate, output = 'sos'))
+        sos = np.concatenate(sections) if sections else None
+        self.set_sos(name, sos)
+        return sos
+
+    def set_sos(self, name, sos):
+        """Set the second-order sections of a group and reset its filter state.
+        The group is enabled when there are sections and channels.
+
+        :param name: name of the group
+        :type name: str
+        :param sos: second-order sections, None to remove the filter
+        :type sos: numpy.ndarray
+        """
+        group = self._groups[name]
+        if sos is None:
+            group['sos'] = None
+            group['z_sos'] = None
+            group['enabled'] = False
+            return
+        group['sos'] = np.ascontiguousarray(sos, dtype = self.dtype)
+        group['enabled'] = len(group['channels']) > 0
+        self.reset(name)
+
+    def get_sos(self, name):
+        """Get the second-order sections of a group
+
+        :param name: name of the group
+        :type name: str
+        :return: second-order sections, None when the group has no filter
+        :rtype: numpy.ndarray
+        """
+        return self._groups[name]['sos']
+
+    def enable(self, name, enabled = True):
+        """Enable or disable the filter of a group. A group without filter
+        or without channels can not be enabled.
+
+        :param name: name of the group
+        :type name: str
+        :param enabled: whether the group is filtered, defaults to True
+        :type enabled: bool, optional
+        """
+        group = self._groups[name]
+        group['enabled'] = enabled and group['sos'] is not None and len(group['channels']) > 0
+
+    def is_enabled(self, name):
+        """Check whether the filter of a group is enabled
+
+        :param name: name of the group
+        :type name: str
+        :return: True if the group is filtered
+        :rtype: bool
+        """
+        return self._groups[name]['enabled']
+
+    def reset(self, *names):
+        """Reset the filter state of the given groups. All groups are reset
+        when no names are given.
+        """
+        if not names:
+            names = self.get_group_names()
+        for name in names:
+            group = self._groups[name]
+            if group['sos'] is None:
+                continue
+            # State per channel, with the layout of the compiled kernel
+            z_sos0 = signal.sosfilt_zi(group['sos'])
+            group['z_sos'] = np.ascontiguousarray(np.repeat(
+                z_sos0[np.newaxis, :, :], len(group['channels']), axis = 0), dtype = self.dtype)
+
+    def filter(self, samples):
+        """Filter the samples in place, continuing from the state of the previous call.
+
+        :param samples: samples with shape (channels, samples)
+        :type samples: numpy.ndarray
+        :return: the filtered samples, the same array as the input
+        :rtype: numpy.ndarray
+        """
+        in_place = (_sosfilt is not None and samples.dtype == self.dtype
+            and samples.flags.c_contiguous and samples.flags.writeable)
+        for group in self._groups.values():
+            if not group['enabled']:
+                continue
+            index = group['index']
+            if in_place and isinstance(index, slice) and self._sosfilt_in_place(group, samples[index]):
+                continue
+            filtered, z_sos = signal.sosfilt(
+                group['sos'], samples[index], zi = np.moveaxis(group['z_sos'], 0, 1))
+            samples[index] = filtered
+            group['z_sos'] = np.ascontiguousarray(np.moveaxis(z_sos, 1, 0), dtype = self.dtype)
+        return samples
+
+    @staticmethod
+    def _sosfilt_in_place(group, samples):
+        # The compiled kernel is private to scipy, use signal.sosfilt when its signature changed
+        global _sosfilt
+        if _sosfilt is None:
+            return False
+        try:
+            _sosfilt(group['sos'], samples, group['z_sos'])
+        except TypeError:
+            _sosfilt = None
+            return False
+        return True
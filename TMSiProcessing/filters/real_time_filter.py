@@ -32,25 +32,29 @@ limitations under the License.
 
 import sys
 
+# TMSiSDK.device must be imported before the sample data server, which is 
+# imported by the devices themselves
+from TMSiSDK.device import ChannelType
+from TMSiSDK.device.tmsi_device_enums import DeviceInterfaceType
+from TMSiSDK.device.tmsi_device import TMSiDevice
 from TMSiSDK import sample_data_server
-from TMSiSDK.device import ChannelType, DeviceInterfaceType
-from TMSiSDK.sdk.device.tmsi_device import TMSiDevice
-from TMSiSDK.sdk.sample_data_server.sample_data_server import SampleDataServer as ApexSampleDataServer 
+from TMSiSDK.sample_data_server.sample_data_server import SampleDataServer as ApexSampleDataServer 
 
 import numpy as np
 import queue
-from copy import deepcopy
 import threading
-import time
 
 from scipy import signal, fft 
 import matplotlib.pyplot as plt
 
+from TMSiProcessing.filters.filter_bank import FilterBank
+
 class RealTimeFilter:
     """ A semi-real time filter that can be used to retrieve and filter the data 
     and send them to queue. Different filters can be used for the different 
     analogue channel types (UNI, BIP. AUX). When no filter is generated/enabled 
-    data remains unfiltered.
+    data remains unfiltered. The filters of all channel types are kept in a 
+    FilterBank, which filters the samples in place.
     Start/Stop also starts/stops sampling of the device
     """
     def __init__(self, device):
@@ -96,12 +100,12 @@ class RealTimeFilter:
         self.channels={'UNI': _UNI,
                       'BIP': _BIP, 
                       'AUX': _AUX}
-        self.filter_specs={'UNI': {'Order': None, 'Fc_hp': None, 'Fc_lp': None, 'Enabled': False},
-                      'BIP': {'Order': None, 'Fc_hp': None, 'Fc_lp': None,'Enabled': False}, 
-                      'AUX': {'Order': None, 'Fc_hp': None, 'Fc_lp': None, 'Enabled': False}}
-        self._filter_details={'UNI': {'sos': None, 'z_sos': None},
-                              'BIP': {'sos': None, 'z_sos': None}, 
-                              'AUX': {'sos': None, 'z_sos': None}}
+        self.filter_specs={'UNI': {'Order': None, 'Fc_hp': None, 'Fc_lp': None, 'Notch': None, 'Enabled': False},
+                      'BIP': {'Order': None, 'Fc_hp': None, 'Fc_lp': None, 'Notch': None, 'Enabled': False}, 
+                      'AUX': {'Order': None, 'Fc_hp': None, 'Fc_lp': None, 'Notch': None, 'Enabled': False}}
+        self.filter_bank = FilterBank(self.sample_rate)
+        for ch_type, chan in self.channels.items():
+            self.filter_bank.add_group(ch_type, chan)
         
         # Prepare Queues
         _QUEUE_SIZE = 1000
@@ -112,11 +116,12 @@ class RealTimeFilter:
         
         self.filter_thread = FilterThread(self)
     
-    def generateFilter(self, order=2, Fc_hp=None, Fc_lp=None, ch_types=None, show=False):
+    def generateFilter(self, order=2, Fc_hp=None, Fc_lp=None, ch_types=None, show=False, notch=None):
         """ Generate filter with given order and cut-off frequency/frequencies. 
         Generates a high-pass filter when only Fc_hp is specified,a low-pass 
         filter when only Fc_lp is specified or a band-pass when both Fc_hp and 
-        Fc_lp are given.
+        Fc_lp are given. Notch filters for the frequency/frequencies in notch 
+        (e.g. the power line frequency) are cascaded with this filter.
         Filter is applied to the specified channel types or to all analogue 
         channels when no channels types are given.
         Use show to inspect the frequency response of the filter """
@@ -127,27 +132,10 @@ class RealTimeFilter:
             self.filter_specs[ch_type]['Order']=order
             self.filter_specs[ch_type]['Fc_hp']=Fc_hp
             self.filter_specs[ch_type]['Fc_lp']=Fc_lp
+            self.filter_specs[ch_type]['Notch']=notch
             
-            chan=self.channels[ch_type]
-            
-            if not (Fc_hp or Fc_lp) or not chan:
-                sos=None
-                z_sos=None
-                self.filter_specs[ch_type]['Enabled']=False
-            else:
-                if Fc_hp and Fc_lp:
-                    sos=signal.butter(order, [Fc_hp, Fc_lp], 'bandpass', fs=self.sample_rate, output='sos')
-                elif Fc_hp:
-                    sos=signal.butter(order, Fc_hp, 'highpass', fs=self.sample_rate, output='sos')
-                elif Fc_lp:
-                    sos=signal.butter(order, Fc_lp, 'lowpass', fs=self.sample_rate, output='sos')
-                 
-                z_sos0 = signal.sosfilt_zi(sos)
-                z_sos=np.repeat(z_sos0[:, np.newaxis, :], len(chan), axis=1)
-                self.filter_specs[ch_type]['Enabled']=True
-            
-            self._filter_details[ch_type]['sos']=sos
-            self._filter_details[ch_type]['z_sos']=z_sos
+            sos=self.filter_bank.design(ch_type, order=order, Fc_hp=Fc_hp, Fc_lp=Fc_lp, notch=notch)
+            self.filter_specs[ch_type]['Enabled']=self.filter_bank.is_enabled(ch_type)
         
         if show:
             # Show the frequency response of the filter
@@ -178,6 +166,7 @@ class RealTimeFilter:
             
         for ch_type in ch_types:
             self.filter_specs[ch_type]['Enabled']=False
+            self.filter_bank.enable(ch_type, False)
             
     def enableFilter(self, *ch_types):
         """ Enable the filters for the given channel types. All filters are enabled 
@@ -186,10 +175,9 @@ class RealTimeFilter:
             ch_types=list(self.channels.keys())
         
         for ch_type in ch_types:
-            chan=self.channels[ch_type]
-            if chan:
-                self.filter_specs[ch_type]['Enabled']=True
-                self.reset(ch_type)
+            self.filter_bank.enable(ch_type)
+            self.filter_specs[ch_type]['Enabled']=self.filter_bank.is_enabled(ch_type)
+            self.reset(ch_type)
 
     def reset(self, *ch_types):
         """ Reset the filters for the given channel types. All filters are reset 
@@ -199,11 +187,8 @@ class RealTimeFilter:
             ch_types=list(self.channels.keys())
         
         for ch_type in ch_types:
-            chan=self.channels[ch_type]
             if self.filter_specs[ch_type]['Enabled']:
-                z_sos0 = signal.sosfilt_zi(self._filter_details[ch_type]['sos'])
-                z_sos=np.repeat(z_sos0[:, np.newaxis, :], len(chan), axis=1)
-                self._filter_details[ch_type]['z_sos']=z_sos
+                self.filter_bank.reset(ch_type)
             
     def start(self):
         """ Start the filter thread and device""" 
@@ -225,9 +210,7 @@ class FilterThread(threading.Thread):
         self.q_filtered_sample_sets=main_class.q_filtered_sample_sets
         self.q_sample_sets = main_class.q_sample_sets
         
-        self.channels=main_class.channels
-        self._filter_details=main_class._filter_details
-        self.filter_specs=main_class.filter_specs
+        self.filter_bank=main_class.filter_bank
         self.device=main_class.device
         self._preprocess_wifi = main_class._preprocess_wifi
         
@@ -246,34 +229,30 @@ class FilterThread(threading.Thread):
         self.sampling = True
         
         while self.sampling:
-            while not self.q_sample_sets.empty():
-                #Read samples from queue 
-                sd = self.q_sample_sets.get()
-                self.q_sample_sets.task_done()
-                
-                # Reshape the samples retrieved from the queue
-                samples = np.reshape(sd.samples, (sd.num_samples_per_sample_set, sd.num_sample_sets), order = 'F')
-                
-                # Missing samples are registered as NaN. This crashes the filter. 
-                # Therefore, copies are inserted for the filtered data
-                if self._preprocess_wifi:
-                    find_nan = np.isnan(samples)
-                    if find_nan.any():
-                        idx_nan = np.where(np.isnan(samples))
-                        samples[idx_nan] = samples[idx_nan[0], idx_nan[1][0]-1]
-                
-                # Filter data
-                if any([self.filter_specs[key]['Enabled'] for key in self.filter_specs]):
-                    for ch_type, ch_filter in self._filter_details.items():
-                        if self.filter_specs[ch_type]['Enabled']:
-                            # filter the data
-                            samples[self.channels[ch_type]], self._filter_details[ch_type]['z_sos']=signal.sosfilt(self._filter_details[ch_type]['sos'], samples[self.channels[ch_type]], zi=self._filter_details[ch_type]['z_sos'])
+            #Read samples from queue, wait for them instead of polling
+            try:
+                sd = self.q_sample_sets.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            self.q_sample_sets.task_done()
+            
+            # Copy the samples retrieved from the queue, as they are filtered in place.
+            # The copy is owned by this thread, so it can be sent without copying it again
+            samples = np.array(sd.data, dtype=self.filter_bank.dtype, order='C')
+            
+            # Missing samples are registered as NaN. This crashes the filter. 
+            # Therefore, copies are inserted for the filtered data
+            if self._preprocess_wifi:
+                find_nan = np.isnan(samples)
+                if find_nan.any():
+                    idx_nan = np.where(np.isnan(samples))
+                    samples[idx_nan] = samples[idx_nan[0], idx_nan[1][0]-1]
+            
+            # Filter data
+            self.filter_bank.filter(samples)
 
-                # Output sample data to queue
-                self.q_filtered_sample_sets.put(deepcopy(samples))
-                
-                # Pause the thread for a bit to update the plot (should be the same sleep time as the plotter)
-                time.sleep(0.03)
+            # Output sample data to queue
+            self.q_filtered_sample_sets.put(samples)
         
     def stop(self):
         """ Method that is executed when the thread is terminated. 
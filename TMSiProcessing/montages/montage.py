@@ -0,0 +1,174 @@
+'''
+(c) 2023 Twente Medical Systems International B.V., Oldenzaal The Netherlands
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+#######  #     #   #####   #
+   #     ##   ##  #
+   #     # # # #  #        #
+   #     #  #  #   #####   #
+   #     #     #        #  #
+   #     #     #        #  #
+   #     #     #  #####    #
+
+/**
+ * @file ${montage.py}
+ * @brief Montages that derive new signals from the channels of a measurement,
+ * such as the differential derivations of HD-EMG grids.
+ *
+ */
+
+
+'''
+
+import re
+
+import numpy as np
+from scipy import sparse
+
+
+class Montage:
+    """ Linear derivation of signals from the channels of a measurement. Every
+    derived signal is a weighted sum of a few channels, minus an optional
+    common reference, so the montage is stored as a sparse operator. The
+    montage has no state: it can be applied to every new block of samples only,
+    e.g. by a plotter, a file writer or an LSL stream.
+    """
+    SINGLE_DIFFERENTIAL = 'single_differential'
+    DOUBLE_DIFFERENTIAL = 'double_differential'
+    LAPLACIAN = 'laplacian'
+    COMMON_AVERAGE = 'common_average'
+
+    def __init__(self, operator, channel_names, reference = None):
+        """Initialise the montage
+
+        :param operator: weights of the channels of every derived signal, with shape (derived signals, channels)
+        :type operator: scipy.sparse matrix or numpy.ndarray
+        :param channel_names: names of the derived signals
+        :type channel_names: list[str]
+        :param reference: weights of the channels of the reference subtracted from all derived signals, defaults to None
+        :type reference: scipy.sparse matrix or numpy.ndarray, optional
+        """
+        self.operator = sparse.csr_matrix(operator)
+        self.reference = sparse.csr_matrix(reference) if reference is not None else None
+        self._channel_names = list(channel_names)
+
+    @classmethod
+    def from_grid(cls, channel_names, derivation = SINGLE_DIFFERENTIAL, direction = 'row'):
+        """Create a montage for a HD-EMG grid. The position of the electrodes
+        is taken from the channel names (RxCy for row x and column y); the
+        other channels and the missing electrodes are skipped.
+
+        - single_differential: difference between successive electrodes.
+        - double_differential: difference between two successive single differentials.
+        - laplacian: electrode minus the average of its neighbours in the
+          same row and column.
+        - common_average: electrode minus the average of all electrodes of the grid.
+
+        :param channel_names: names of the channels of the measurement
+        :type channel_names: list[str]
+        :param derivation: derivation of the montage, defaults to single_differential
+        :type derivation: str, optional
+        :param direction: 'row' to derive along the rows or 'column' to derive
+            along the columns of the grid (differential derivations only), defaults to 'row'
+        :type direction: str, optional
+        :return: montage of the grid
+        :rtype: Montage
+        """
+        positions = _get_grid_positions(channel_names)
+        if direction == 'row':
+            step = (0, 1)
+        elif direction == 'column':
+            step = (1, 0)
+        else:
+            raise ValueError("Unknown direction {}".format(direction))
+        rows = []
+        names = []
+        reference = None
+        for (r, c), channel in sorted(positions.items()):
+            name = channel_names[channel]
+            if derivation == cls.SINGLE_DIFFERENTIAL:
+                terms = [((r, c), 1), ((r + step[0], c + step[1]), -1)]
+                derived_name = '{} - {}'.format(name, _get_name(r + step[0], c + step[1]))
+            elif derivation == cls.DOUBLE_DIFFERENTIAL:
+                terms = [((r, c), 1), ((r + step[0], c + step[1]), -2), ((r + 2 * step[0], c + 2 * step[1]), 1)]
+                derived_name = '{} - 2 {} + {}'.format(name, _get_name(r + step[0], c + step[1]),
+                    _get_name(r + 2 * step[0], c + 2 * step[1]))
+            elif derivation == cls.LAPLACIAN:
+                neighbours = [p for p in [(r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1)] if p in positions]
+                if not neighbours:
+                    continue
+                terms = [((r, c), 1)] + [(p, -1 / len(neighbours)) for p in neighbours]
+                derived_name = '{} (LAP)'.format(name)
+            elif derivation == cls.COMMON_AVERAGE:
+                terms = [((r, c), 1)]
+                derived_name = '{} (CAR)'.format(name)
+            else:
+                raise ValueError("Unknown derivation {}".format(derivation))
+            # Skip the derivations with missing electrodes
+            if not all(p in positions for p, _ in terms):
+                continue
+            rows.append([(positions[p], weight) for p, weight in terms])
+            names.append(derived_name)
+        if derivation == cls.COMMON_AVERAGE and positions:
+            grid_channels = list(positions.values())
+            reference = sparse.csr_matrix(
+                (np.full(len(grid_channels), 1 / len(grid_channels)), ([0] * len(grid_channels), grid_channels)),
+                shape = (1, len(channel_names)))
+        row_indices = [i for i, row in enumerate(rows) for _ in row]
+        column_indices = [channel for row in rows for channel, _ in row]
+        weights = [weight for row in rows for _, weight in row]
+        operator = sparse.csr_matrix((weights, (row_indices, column_indices)), shape = (len(rows), len(channel_names)))
+        return cls(operator, names, reference)
+
+    def get_channel_names(self):
+        """Get the names of the derived signals
+
+        :return: names of the derived signals
+        :rtype: list[str]
+        """
+        return self._channel_names
+
+    def get_num_channels(self):
+        """Get the number of derived signals
+
+        :return: number of derived signals
+        :rtype: int
+        """
+        return self.operator.shape[0]
+
+    def apply(self, samples):
+        """Derive the signals from a block of samples
+
+        :param samples: samples of all channels, with shape (channels, samples)
+        :type samples: numpy.ndarray
+        :return: derived signals, with shape (derived signals, samples)
+        :rtype: numpy.ndarray
+        """
+        derived = self.operator @ samples
+        if self.reference is not None:
+            derived -= self.reference @ samples
+        return np.asarray(derived)
+
+
+def _get_grid_positions(channel_names):
+    # Position (row, column) of the electrodes of the grid and their channel index
+    positions = {}
+    for i, name in enumerate(channel_names):
+        match = re.fullmatch(r'R(\d+)C(\d+)', name)
+        if match:
+            positions[(int(match.group(1)), int(match.group(2)))] = i
+    return positions
+
+def _get_name(row, column):
+    return 'R{}C{}'.format(row, column)
@@ -718,6 +718,19 @@ class ApexDevice(TMSiDevice):
         """
         return self.__config.get_live_impedance()
     
+    @LogPerformances
+    def get_measurement_latency(self) -> float:
+        """Gets the dispatch latency between the retrieval of the samples from the 
+        device and their hand-over to the sample data server, without the time 
+        spent in the queues of the consumers.
+
+        :return: averaged latency in seconds, None if not sampling or no samples have been delivered yet.
+        :rtype: float
+        """
+        if self.__info.get_state() != DeviceState.sampling:
+            return None
+        return self.__measurement.get_latency()
+
     @LogPerformances
     def get_num_active_channels(self) -> int:
         """Returns the number of active channels of the device.
@@ -1148,13 +1161,15 @@ class ApexDevice(TMSiDevice):
         self.__measurement.start()
         
     @LogPerformances
-    def start_measurement(self, measurement_type: MeasurementType, thread_refresh = None):
+    def start_measurement(self, measurement_type: MeasurementType, thread_refresh = None, adaptive_sampling = False):
         """Starts the measurement requested.
 
         :param measurement_type: measurement to start
         :type measurement_type: MeasurementType
         :param thread_refresh: refresh time for sampling and conversion threads, defaults to None.
         :type thread_refresh: float, optional.
+        :param adaptive_sampling: adapt the refresh time of the sampling thread to the rate of the device, defaults to False.
+        :type adaptive_sampling: bool, optional.
         :raises TMSiError: TMSiErrorCode.api_invalid_command if already sampling.
         :raises TMSiError: TMSiErrorCode.device_not_connected if not connected.
         """
@@ -1166,6 +1181,7 @@ class ApexDevice(TMSiDevice):
         if thread_refresh is not None:
             self.__measurement.set_sampling_pause(thread_refresh)
             self.__measurement.set_conversion_pause(thread_refresh)
+        self.__measurement.set_adaptive_sampling(adaptive_sampling)
         self.__info.set_state(DeviceState.sampling)
         TMSiLoggerActivity().log("TMSi-SDK->>{}: start".format(self.__measurement.get_name()))
         self.__measurement.start()
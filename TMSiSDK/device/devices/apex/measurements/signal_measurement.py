@@ -30,20 +30,18 @@ limitations under the License.
 
 '''
 
-from copy import deepcopy
 from ctypes import *
 import time
 
 from .....tmsi_utilities.tmsi_logger import TMSiLogger as logger
 from .....sample_data_server.sample_data_server import SampleDataServer, TMSiLoggerActivity
 from .....sample_data_server.sample_data import SampleData
-from .....tmsi_utilities import support_functions
 from .....tmsi_utilities.decorators import LogPerformances
 from ..apex_API_structures import TMSiDevSampleRequest
 from ..apex_API_enums import SampleControl, TMSiDeviceRetVal
 from ....tmsi_measurement import TMSiMeasurement
-
-OVERFLOW = 4294967296000000.0
+from ....tmsi_sample_buffer_pool import TMSiSampleBufferPool
+from ....tmsi_sample_converter import TMSiSampleConverter
 
 class SignalMeasurement(TMSiMeasurement):
     """Class to handle the Signal measurements."""
@@ -56,16 +54,16 @@ class SignalMeasurement(TMSiMeasurement):
         :type name: str, optional
         """
         super().__init__(dev = dev, name = name)
-        self._sample_data_buffer = (c_float * self._sample_data_buffer_size)(0)
+        self._sample_buffer_pool = TMSiSampleBufferPool(
+            num_buffers = self._num_sample_data_buffers,
+            buffer_size = self._sample_data_buffer_size,
+            max_num_buffers = self._max_num_sample_data_buffers)
+        self._sample_buffer_index = None
         self._num_samples_per_set = dev.get_num_channels()
-        self._converter = {}
-        channels = self._dev.get_device_channels()
-        for i in range(self._num_samples_per_set):
-            conversion_factor = 10**channels[i].get_channel_exp()
-            if conversion_factor in self._converter:
-                self._converter[conversion_factor].append(i)
-            else:
-                self._converter[conversion_factor] = [i]
+        self._samples_per_second = self._num_samples_per_set * dev.get_device_sampling_frequency()
+        self._sample_converter = TMSiSampleConverter(
+            channels = self._dev.get_device_channels(),
+            float_channels = self._float_channels)
 
     @LogPerformances
     def start(self):
@@ -103,31 +101,34 @@ class SignalMeasurement(TMSiMeasurement):
     @LogPerformances
     def _conversion_function(self):
         while not self._conversion_queue.empty():
-            sample_data_buffer, retrieved_sample_sets = self._conversion_queue.get()
+            sample_buffer_index, retrieved_sample_sets, retrieval_time = self._conversion_queue.get()
             TMSiLoggerActivity().log("Conversion Queue->>Conversion Thread: GET samples | package size:{} - new size:{}".format(
                     retrieved_sample_sets, self._conversion_queue.qsize()))
             if retrieved_sample_sets > 0:
-                sample_mat = support_functions.array_to_matrix(
-                    sample_data_buffer[:self._num_samples_per_set*retrieved_sample_sets],
-                    self._num_samples_per_set)
-                for i in self._float_channels:
-                    sample_mat[i] = support_functions.float_to_uint(sample_mat[i])
-                for factor in self._converter.keys():
-                    for channel in self._converter[factor]:
-                        sample_mat[channel] = [i/factor for i in sample_mat[channel]]
-                samples = support_functions.matrix_to_multiplexed_array(sample_mat)
-                samples = [0.0 if  i == OVERFLOW else i for i in samples]
-                sd = SampleData(retrieved_sample_sets, self._num_samples_per_set, samples)
+                try:
+                    sample_mat = self._sample_converter.convert(
+                        self._sample_buffer_pool.get_samples(sample_buffer_index, self._num_samples_per_set * retrieved_sample_sets),
+                        retrieved_sample_sets)
+                finally:
+                    # Give the buffer back to the pool, also when the conversion fails
+                    self._sample_buffer_pool.release(sample_buffer_index)
+                sd = SampleData(retrieved_sample_sets, self._num_samples_per_set, sample_mat, retrieval_time)
                 TMSiLoggerActivity().log("Conversion Thread->>Conversion Thread: convert samples to sample data")
                 TMSiLoggerActivity().log("Conversion Thread->>SDS: PUT sample data")
                 SampleDataServer().put_sample_data(self._dev.get_id(), sd)
+                self._update_latency(retrieval_time)
                 logger().debug("Data delivered to sample data server: {} channels, {} samples".format(self._num_samples_per_set, retrieved_sample_sets))
 
     @LogPerformances
     def _sampling_function(self):
+        if self._sample_buffer_index is None:
+            self._sample_buffer_index = self._sample_buffer_pool.acquire()
+            if self._sample_buffer_index is None:
+                TMSiLoggerActivity().log("Sampling Thread->>Sampling Thread: no free sample buffer")
+                return
         TMSiLoggerActivity().log("Sampling Thread->>APEX-SDK: GET signal samples request")
         ret = self._dev.get_device_data(
-            pointer(self._sample_data_buffer), 
+            self._sample_buffer_pool.get_pointer(self._sample_buffer_index), 
             self._sample_data_buffer_size, 
             pointer(self._retrieved_sample_sets), 
             pointer(self._retrieved_data_type))
@@ -135,7 +136,9 @@ class SignalMeasurement(TMSiMeasurement):
         if (ret == TMSiDeviceRetVal.TMSiStatusOK):
             TMSiLoggerActivity().log("Sampling Thread->>Sampling Thread: positive response")
             if self._retrieved_sample_sets.value > 0:
-                self._conversion_queue.put((deepcopy(self._sample_data_buffer), self._retrieved_sample_sets.value))
+                self._conversion_queue.put((self._sample_buffer_index, self._retrieved_sample_sets.value, time.perf_counter()))
+                self._conversion_thread.wake_up()
+                self._sample_buffer_index = None
                 TMSiLoggerActivity().log("Sampling Thread->>Conversion Queue: PUT samples | package size:{} - new size:{}".format(
                     self._retrieved_sample_sets.value, self._conversion_queue.qsize()))
                 self._tic_timeout = time.perf_counter()
@@ -146,6 +149,8 @@ class SignalMeasurement(TMSiMeasurement):
                     self._empty_read_counter = 1
         else:
             TMSiLoggerActivity().log("APEX-SDK->>Sampling Thread: negative response: {}".format(ret))
+        if self._adaptive_sampling:
+            self._adapt_sampling_pause(self._retrieved_sample_sets.value * self._num_samples_per_set)
         if self._download_samples_limit is not None:
             self._downloaded_samples += self._retrieved_sample_sets.value
             self._download_percentage = self._downloaded_samples * 100.0 / self._download_samples_limit
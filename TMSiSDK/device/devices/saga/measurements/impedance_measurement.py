@@ -133,6 +133,7 @@ class ImpedanceMeasurement(TMSiMeasurement):
             TMSiLoggerActivity().log("Sampling Thread->>Sampling Thread: positive response")
             if self._retrieved_sample_sets.value > 0:
                 self._conversion_queue.put((deepcopy(self._sample_data_buffer), self._retrieved_sample_sets.value))
+                self._conversion_thread.wake_up()
                 TMSiLoggerActivity().log("Sampling Thread->>Conversion Queue: PUT samples | package size:{} - new size:{}".format(
                     self._retrieved_sample_sets.value, self._conversion_queue.qsize()))
                 self._tic_timeout = time.perf_counter()
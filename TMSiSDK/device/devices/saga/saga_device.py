@@ -660,6 +660,19 @@ class SagaDevice(TMSiDevice):
         """
         raise NotImplementedError('method not available for this device')
 
+    @LogPerformances
+    def get_measurement_latency(self) -> float:
+        """Gets the dispatch latency between the retrieval of the samples from the 
+        device and their hand-over to the sample data server, without the time 
+        spent in the queues of the consumers.
+
+        :return: averaged latency in seconds, None if not sampling or no samples have been delivered yet.
+        :rtype: float
+        """
+        if self.__info.get_state() != DeviceState.sampling:
+            return None
+        return self.__measurement.get_latency()
+
     def get_num_active_channels(self) -> int:
         """Returns the number of active channels of the device.
 
@@ -1123,13 +1136,15 @@ class SagaDevice(TMSiDevice):
         self.__measurement.start()
         
     @LogPerformances
-    def start_measurement(self, measurement_type: MeasurementType, thread_refresh = None):
+    def start_measurement(self, measurement_type: MeasurementType, thread_refresh = None, adaptive_sampling = False):
         """Starts the measurement requested.
 
         :param measurement_type: measurement to start
         :type measurement_type: MeasurementType
         :param thread_refresh: refresh time for sampling and conversion threads, defaults to None.
         :type thread_refresh: float, optional.
+        :param adaptive_sampling: adapt the refresh time of the sampling thread to the rate of the device, defaults to False.
+        :type adaptive_sampling: bool, optional.
         :raises TMSiError: TMSiErrorCode.api_invalid_command if already sampling.
         :raises TMSiError: TMSiErrorCode.device_not_connected if not connected.
         """
@@ -1142,6 +1157,7 @@ class SagaDevice(TMSiDevice):
         if thread_refresh is not None:
             self.__measurement.set_sampling_pause(thread_refresh)
             self.__measurement.set_conversion_pause(thread_refresh)
+        self.__measurement.set_adaptive_sampling(adaptive_sampling)
         self.__info.set_state(DeviceState.sampling)
         if hasattr(self.__measurement, "apply_mask"):
             self.__measurement.apply_mask(mask = self.__config.get_mask_info())
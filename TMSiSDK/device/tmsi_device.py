@@ -326,6 +326,13 @@ class TMSiDevice():
         """
         raise NotImplementedError('method not available for this device')
 
+    def get_measurement_latency(*args, **kwargs):
+        """Function to be overridden by the child class.
+
+        :raises NotImplementedError: Must be overridden by the child class.
+        """
+        raise NotImplementedError('method not available for this device')
+
     def get_num_active_channels(*args, **kwargs):
         """Function to be overridden by the child class.
 
@@ -61,6 +61,10 @@ class TMSiMeasurement():
         self._retrieved_data_type = (c_int)(0)
         __MAX_SIZE_CONVERSION_QUEUE = 50
         self._conversion_queue = queue.Queue(__MAX_SIZE_CONVERSION_QUEUE)
+        # A few sample buffers are allocated at once, more when the conversion lags behind, 
+        # up to one for every sample data the conversion queue can hold
+        self._num_sample_data_buffers = 4
+        self._max_num_sample_data_buffers = __MAX_SIZE_CONVERSION_QUEUE
         self._empty_read_counter = 0
         self._tic_timeout = None
         self._timeout = 3
@@ -69,6 +73,12 @@ class TMSiMeasurement():
         self._float_channels = []
         self._sensor_channels = []
         self._basic_conversion={}
+        self._adaptive_sampling = False
+        self._min_sampling_pause = 0.002
+        self._max_sampling_pause = 0.05
+        self._latency = None
+        # Number of samples the device delivers per second, for the adaptive sampling
+        self._samples_per_second = None
         TMSiLoggerActivity().log("TMSi-SDK->>{}: create measurement".format(self.get_name()))
         TMSiLoggerActivity().log("{}->>{}-SDK: GET device channels request".format(self.get_name(), self._dev.get_device_type()))
         channels = self._dev.get_device_active_channels()
@@ -92,7 +102,8 @@ class TMSiMeasurement():
         self._conversion_thread = TMSiThread(
             name="Conversion Thread",
             looping_function = self._conversion_function,
-            pause = 0.01
+            pause = 0.1,
+            event_driven = True
         )
 
     @LogPerformances
@@ -104,6 +115,18 @@ class TMSiMeasurement():
         """
         return self._conversion_thread.get_pause()
 
+    @LogPerformances
+    def get_latency(self):
+        """Get the dispatch latency: the time between the retrieval of the samples 
+        from the device and their hand-over to the sample data server. The time 
+        spent in the queues of the consumers is not included, consumers can 
+        measure it with the retrieval_time of the sample data.
+
+        :return: averaged latency in seconds, None if no samples have been delivered yet.
+        :rtype: float
+        """
+        return self._latency
+
     @LogPerformances
     def get_sampling_pause(self):
         """Get the sampling pause.
@@ -141,6 +164,27 @@ class TMSiMeasurement():
         """
         return self._name
     
+    @LogPerformances
+    def set_adaptive_sampling(self, adaptive_sampling, min_pause = None, max_pause = None):
+        """Set the adaptive sampling mode. When enabled, the pause of the sampling 
+        thread follows the rate at which the device delivers samples: it is 
+        lengthened after empty reads and shortened after non-empty reads, faster
+        when a read returns more than twice the samples expected for one pause.
+
+        :param adaptive_sampling: True to enable the adaptive sampling.
+        :type adaptive_sampling: bool
+        :param min_pause: minimum pause of the sampling thread, defaults to None
+        :type min_pause: float, optional
+        :param max_pause: maximum pause of the sampling thread, defaults to None
+        :type max_pause: float, optional
+        """
+        logger().debug("adaptive sampling set to {}".format(adaptive_sampling))
+        self._adaptive_sampling = adaptive_sampling
+        if min_pause is not None:
+            self._min_sampling_pause = min_pause
+        if max_pause is not None:
+            self._max_sampling_pause = max_pause
+
     @LogPerformances
     def set_conversion_pause(self, pause):
         """Set the conversion thread pause.
@@ -186,10 +230,28 @@ class TMSiMeasurement():
         """
         raise NotImplementedError('method not available for this measurement')
 
+    def _adapt_sampling_pause(self, retrieved_samples):
+        pause = self._sampling_thread.get_pause()
+        if retrieved_samples == 0:
+            pause = pause * 1.25
+        elif self._samples_per_second is not None and retrieved_samples > 2 * self._samples_per_second * pause:
+            # The reads lag behind the device
+            pause = pause * 0.5
+        else:
+            pause = pause * 0.9
+        self._sampling_thread.set_pause(min(max(pause, self._min_sampling_pause), self._max_sampling_pause))
+
     @LogPerformances
     def _conversion_function(self):
         raise NotImplementedError('method not available for this measurement')
 
     @LogPerformances
     def _sampling_function(self):
-        raise NotImplementedError('method not available for this measurement')
\ No newline at end of file
+        raise NotImplementedError('method not available for this measurement')
+
+    def _update_latency(self, retrieval_time):
+        latency = time.perf_counter() - retrieval_time
+        if self._latency is None:
+            self._latency = latency
+        else:
+            self._latency += 0.1 * (latency - self._latency)
\ No newline at end of file
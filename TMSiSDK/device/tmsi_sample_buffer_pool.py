@@ -0,0 +1,141 @@
+'''
+(c) 2023 Twente Medical Systems International B.V., Oldenzaal The Netherlands
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+#######  #     #   #####   #
+   #     ##   ##  #        
+   #     # # # #  #        #
+   #     #  #  #   #####   #
+   #     #     #        #  #
+   #     #     #        #  #
+   #     #     #  #####    #
+
+/**
+ * @file tmsi_sample_buffer_pool.py 
+ * @brief 
+ * Pool of preallocated sample buffers shared by the sampling and conversion threads.
+ */
+
+
+'''
+
+from ctypes import *
+import queue
+
+import numpy as np
+
+
+class TMSiSampleBufferPool():
+    """Class to handle a pool of preallocated sample buffers. 
+    
+    The sampling thread lets the device write directly in a free buffer of 
+    the pool and hands over only its index to the conversion thread, which 
+    releases it once the samples are converted. The pool starts small and 
+    grows when all its buffers are in use, up to a maximum number of buffers.
+    Buffers are only acquired by a single thread.
+    """
+    def __init__(self, num_buffers, buffer_size, max_num_buffers = None):
+        """Initialize the pool of sample buffers.
+
+        :param num_buffers: number of buffers allocated at once.
+        :type num_buffers: int
+        :param buffer_size: number of floats in each buffer.
+        :type buffer_size: int
+        :param max_num_buffers: maximum number of buffers of the pool, defaults to None for num_buffers
+        :type max_num_buffers: int, optional
+        """
+        self._buffer_size = buffer_size
+        self._max_num_buffers = max(num_buffers, max_num_buffers) if max_num_buffers is not None else num_buffers
+        self._buffers = []
+        self._pointers = []
+        self._views = []
+        self._free_buffers = queue.Queue()
+        for _ in range(num_buffers):
+            self._free_buffers.put(self._allocate())
+
+    def acquire(self):
+        """Acquire a free buffer of the pool. A new buffer is allocated when 
+        all the buffers are in use and the pool did not reach its maximum size.
+
+        :return: index of the buffer, None if all the buffers are in use.
+        :rtype: int
+        """
+        try:
+            return self._free_buffers.get_nowait()
+        except queue.Empty:
+            if len(self._buffers) < self._max_num_buffers:
+                return self._allocate()
+            return None
+
+    def get_num_buffers(self):
+        """Get the number of buffers allocated by the pool.
+
+        :return: number of buffers.
+        :rtype: int
+        """
+        return len(self._buffers)
+
+    def get_buffer_size(self):
+        """Get the size of each buffer of the pool.
+
+        :return: number of floats in each buffer.
+        :rtype: int
+        """
+        return self._buffer_size
+
+    def get_num_free_buffers(self):
+        """Get the number of buffers which are not in use.
+
+        :return: number of free buffers.
+        :rtype: int
+        """
+        return self._free_buffers.qsize()
+
+    def get_pointer(self, index):
+        """Get the pointer to a buffer, to be used by the device to write its data.
+
+        :param index: index of the buffer.
+        :type index: int
+        :return: pointer to the buffer.
+        :rtype: pointer(c_float * buffer_size)
+        """
+        return self._pointers[index]
+
+    def get_samples(self, index, num_samples):
+        """Get a view on the valid samples of a buffer, without copying them.
+
+        :param index: index of the buffer.
+        :type index: int
+        :param num_samples: number of valid samples in the buffer.
+        :type num_samples: int
+        :return: view on the first num_samples of the buffer.
+        :rtype: numpy.ndarray
+        """
+        return self._views[index][:num_samples]
+
+    def release(self, index):
+        """Give a buffer back to the pool.
+
+        :param index: index of the buffer.
+        :type index: int
+        """
+        self._free_buffers.put(index)
+
+    def _allocate(self):
+        buffer = (c_float * self._buffer_size)()
+        # The views are appended before the buffer is counted, the conversion thread reads them by index
+        self._pointers.append(pointer(buffer))
+        self._views.append(np.frombuffer(buffer, dtype = np.float32))
+        self._buffers.append(buffer)
+        return len(self._buffers) - 1
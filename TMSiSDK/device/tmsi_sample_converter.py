@@ -0,0 +1,103 @@
+'''
+(c) 2023 Twente Medical Systems International B.V., Oldenzaal The Netherlands
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+#######  #     #   #####   #
+   #     ##   ##  #        
+   #     # # # #  #        #
+   #     #  #  #   #####   #
+   #     #     #        #  #
+   #     #     #        #  #
+   #     #     #  #####    #
+
+/**
+ * @file tmsi_sample_converter.py 
+ * @brief 
+ * Vectorized conversion of the raw device samples into sample data.
+ */
+
+
+'''
+
+import numpy as np
+
+OVERFLOW = 4294967296000000.0
+
+
+class TMSiSampleConverter():
+    """Class to convert the raw samples retrieved from the device into 
+    physical values, operating on the whole block of samples at once."""
+    def __init__(self, channels, float_channels = [], sensor_channels = []):
+        """Initialize the sample converter.
+
+        :param channels: channels of the acquisition, in the order they are sampled.
+        :type channels: list[TMSiChannel]
+        :param float_channels: indexes of the channels to reinterpret as unsigned integers, defaults to []
+        :type float_channels: list[int], optional
+        :param sensor_channels: indexes of the channels with sensor information, defaults to []
+        :type sensor_channels: list[int], optional
+        """
+        self._num_channels = len(channels)
+        self._factors = np.array([10**channel.get_channel_exp() for channel in channels], dtype = np.float64)
+        self._float_channels = np.array(float_channels, dtype = np.intp)
+        self._sensor_channels = np.array(sensor_channels, dtype = np.intp)
+        sensors = [channels[i].get_sensor_information() for i in sensor_channels]
+        self._sensor_offsets = np.array([s.get_sensor_offset() for s in sensors], dtype = np.float64)
+        self._sensor_gains = np.array([s.get_sensor_gain() for s in sensors], dtype = np.float64)
+        self._sensor_factors = np.array([10**s.get_sensor_exp() for s in sensors], dtype = np.float64)
+        self._masked_channels = []
+        self._mask_functions = []
+
+    def get_num_channels(self):
+        """Get the number of channels of each sample set.
+
+        :return: number of channels.
+        :rtype: int
+        """
+        return self._num_channels
+
+    def set_mask(self, channels, functions):
+        """Set the masks to apply to the channels before the conversion.
+
+        :param channels: indexes of the channels to mask.
+        :type channels: list[int]
+        :param functions: mask functions, one per channel.
+        :type functions: list[function]
+        """
+        self._masked_channels = list(channels)
+        self._mask_functions = list(functions)
+
+    def convert(self, sample_data_buffer, num_sample_sets):
+        """Convert a block of raw samples.
+
+        :param sample_data_buffer: multiplexed raw samples as retrieved from the device.
+        :type sample_data_buffer: ctypes array of c_float or numpy.ndarray
+        :param num_sample_sets: number of valid sample sets in the buffer.
+        :type num_sample_sets: int
+        :return: converted samples, one row per channel.
+        :rtype: numpy.ndarray
+        """
+        raw = np.frombuffer(sample_data_buffer, dtype = np.float32, 
+            count = num_sample_sets * self._num_channels).reshape(num_sample_sets, self._num_channels)
+        sample_mat = raw.T.astype(np.float64, order = 'C')
+        if self._sensor_channels.size > 0:
+            sample_mat[self._sensor_channels] = (sample_mat[self._sensor_channels] + self._sensor_offsets[:, None]) * \
+                self._sensor_gains[:, None] / self._sensor_factors[:, None]
+        if self._float_channels.size > 0:
+            sample_mat[self._float_channels] = raw[:, self._float_channels].view(np.uint32).T
+        for channel, mask_function in zip(self._masked_channels, self._mask_functions):
+            sample_mat[channel] = mask_function(sample_mat[channel])
+        sample_mat /= self._factors[:, None]
+        sample_mat[sample_mat == OVERFLOW] = 0.0
+        return sample_mat
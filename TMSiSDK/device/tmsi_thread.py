@@ -36,7 +36,7 @@ import time
 
 class TMSiThread(threading.Thread):
     """A class to handle all the sampling threads."""
-    def __init__(self, looping_function, pause = 0.01, name = "TMSi Thread"):
+    def __init__(self, looping_function, pause = 0.01, name = "TMSi Thread", event_driven = False):
         """_summary_
 
         :param looping_function: the function which must be exectuted.
@@ -45,11 +45,16 @@ class TMSiThread(threading.Thread):
         :type pause: float, optional
         :param name: name of the thread, defaults to "Sampling Thread"
         :type name: str, optional
+        :param event_driven: if True, the thread loops as soon as it is woken up and
+            the pause is only the maximum waiting time, defaults to False
+        :type event_driven: bool, optional
         """
         super().__init__()
         self.name = name
         self.__looping_function = looping_function
         self.__pause = pause
+        self.__event_driven = event_driven
+        self.__wake_up_event = threading.Event()
 
     def get_pause(self):
         """Get the pause time of the thread.
@@ -65,7 +70,11 @@ class TMSiThread(threading.Thread):
         self.__looping = True
         while self.__looping:
             self.__looping_function()
-            time.sleep(self.__pause)
+            if self.__event_driven:
+                self.__wake_up_event.wait(self.__pause)
+                self.__wake_up_event.clear()
+            else:
+                time.sleep(self.__pause)
 
     def set_pause(self, pause):
         """Set the pause time of the thread.
@@ -78,4 +87,10 @@ class TMSiThread(threading.Thread):
     def stop(self):
         """Stop the thread.
         """
-        self.__looping = False
\ No newline at end of file
+        self.__looping = False
+        self.__wake_up_event.set()
+
+    def wake_up(self):
+        """Wake up the thread if it is waiting for new work (event driven threads only).
+        """
+        self.__wake_up_event.set()
\ No newline at end of file
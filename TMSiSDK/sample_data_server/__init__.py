@@ -30,4 +30,5 @@ limitations under the License.
 
 '''
 
-from .sample_data_server import SampleDataServer
\ No newline at end of file
+from .sample_data_server import SampleDataServer
+from .sample_data import DeliveryPolicy
\ No newline at end of file
@@ -30,6 +30,27 @@ limitations under the License.
 
 '''
 
+from enum import Enum, unique
+import queue
+import threading
+
+import numpy as np
+
+
+@unique
+class DeliveryPolicy(Enum):
+    block = 0
+    drop_oldest = 1
+    drop_newest = 2
+    coalesce = 3
+
+# Maximum number of sample data kept aside by the coalesce policy
+_MAX_PENDING_SAMPLE_DATA = 100
+# Number of sample data waiting for a blocking consumer above which every 
+# new sample data is counted as an overflow, although it is still delivered
+_MAX_SPILLED_SAMPLE_DATA = 100
+
+
 class SampleSet:
     """Class to handle sample sets.
     """
@@ -47,31 +68,216 @@ class SampleSet:
 
 class SampleData:
     """Class to handle sample data.
+
+    The samples are stored once as a read-only, channel-major numpy array 
+    which is shared by all the consumers of the sample data server. The 
+    multiplexed representations are computed on first request only.
     """
-    def __init__(self, num_sample_sets, num_samples_per_sample_set, samples):
+    def __init__(self, num_sample_sets, num_samples_per_sample_set, samples, retrieval_time = None):
         """Initialize the sample data.
 
         :param num_sample_sets: number of sets of sample
         :type num_sample_sets: int
         :param num_samples_per_sample_set: number of samples in each set.
         :type num_samples_per_sample_set: int
-        :param samples: samples
-        :type samples: list[sample]
+        :param samples: samples, either multiplexed (one sample set after the other) 
+            or as a channel-major array of shape (num_samples_per_sample_set, num_sample_sets).
+        :type samples: list[sample] or numpy.ndarray
+        :param retrieval_time: time.perf_counter() at which the samples were retrieved 
+            from the device, to measure the latency up to the consumer, defaults to None
+        :type retrieval_time: float, optional
         """
         self.num_sample_sets = num_sample_sets
         self.num_samples_per_sample_set = num_samples_per_sample_set
-        self.samples = samples
+        self.retrieval_time = retrieval_time
+        self._data = None
+        self._interleaved = None
+        self._samples = None
+        if isinstance(samples, np.ndarray) and samples.ndim == 2:
+            # Lock a view, the array of the caller stays writeable
+            self._data = samples.view()
+            self._data.flags.writeable = False
+        else:
+            self._samples = samples
+
+    @property
+    def data(self):
+        """Samples as a read-only, channel-major array.
+
+        :return: samples with shape (num_samples_per_sample_set, num_sample_sets).
+        :rtype: numpy.ndarray
+        """
+        if self._data is None:
+            data = np.array(self._samples, dtype = np.float64).reshape(
+                self.num_sample_sets, self.num_samples_per_sample_set).T
+            data.flags.writeable = False
+            self._data = data
+        return self._data
+
+    @property
+    def interleaved(self):
+        """Samples as a read-only, multiplexed array (one sample set after the other).
+
+        :return: samples with shape (num_samples_per_sample_set * num_sample_sets, ).
+        :rtype: numpy.ndarray
+        """
+        if self._interleaved is None:
+            interleaved = self.data.T.ravel()
+            interleaved.flags.writeable = False
+            self._interleaved = interleaved
+        return self._interleaved
+
+    @staticmethod
+    def concatenate(sample_data_list):
+        """Concatenate consecutive sample data in a single sample data.
+
+        :param sample_data_list: consecutive sample data with the same channels.
+        :type sample_data_list: list[SampleData]
+        :return: sample data containing all the sample sets.
+        :rtype: SampleData
+        """
+        if len(sample_data_list) == 1:
+            return sample_data_list[0]
+        return SampleData(
+            sum([sd.num_sample_sets for sd in sample_data_list]),
+            sample_data_list[0].num_samples_per_sample_set,
+            np.concatenate([sd.data for sd in sample_data_list], axis = 1),
+            sample_data_list[0].retrieval_time)
+
+    @property
+    def samples(self):
+        """Samples as a multiplexed list, kept for backward compatibility.
+
+        :return: samples, one sample set after the other.
+        :rtype: list[sample]
+        """
+        if self._samples is None:
+            self._samples = self.interleaved.tolist()
+        return self._samples
 
 class SampleDataConsumer:
     """Class to handle the sample data consumers.
     """
-    def __init__(self, id, q):
+    def __init__(self, id, q, delivery_policy = DeliveryPolicy.coalesce):
         """Initialize the sample data consumer.
 
         :param id: id of the server to consume.
         :type id: int
         :param q: consumer.
         :type q: Queue
+        :param delivery_policy: what to do when the queue of the consumer is full, defaults to DeliveryPolicy.coalesce
+        :type delivery_policy: DeliveryPolicy, optional
         """
         self.id = id
-        self.q = q
\ No newline at end of file
+        self.q = q
+        self.delivery_policy = delivery_policy
+        self.consumer_id = q.get_consumer_id() if hasattr(q, "get_consumer_id") else None
+        self.overflow_counter = 0
+        self._pending = []
+        self._bounded = hasattr(q, "put_nowait") and hasattr(q, "full")
+        self._spill = None
+        if self.delivery_policy == DeliveryPolicy.block and self._bounded:
+            # The sample data for a blocking consumer are spilled to an unbounded 
+            # queue and forwarded by a thread, so the delivery never waits
+            self._spill = queue.Queue()
+            self._closing = False
+            self._flush_timeout = 1.0
+            self._forwarding_thread = threading.Thread(target = self._forward, 
+                name = "sample-data-forwarding", daemon = True)
+            self._forwarding_thread.start()
+
+    def deliver(self, data):
+        """Deliver the sample data to the consumer according to its delivery policy.
+
+        The delivery never waits for the consumer. With the block policy no 
+        sample data are lost: they are forwarded to the queue of the consumer 
+        by a separate thread, which waits for room in the queue. When too many
+        sample data are waiting, every new one is counted as an overflow.
+        With the other policies a full queue leads to:
+        - drop_oldest discards the oldest sample data in the queue;
+        - drop_newest discards the sample data being delivered;
+        - coalesce keeps the sample data aside and delivers it, concatenated 
+        with the following ones, as soon as the queue has room again. When 
+        too many sample data are kept aside the oldest one is discarded.
+        Every discarded sample data is counted as an overflow.
+
+        :param data: data to deliver.
+        :type data: SampleData
+        """
+        if self._spill is not None:
+            if self._spill.qsize() >= _MAX_SPILLED_SAMPLE_DATA:
+                self.overflow_counter += 1
+            self._spill.put(data)
+        elif not self._bounded:
+            self.q.put(data)
+        elif self.delivery_policy == DeliveryPolicy.coalesce:
+            self._pending.append(data)
+            if len(self._pending) > _MAX_PENDING_SAMPLE_DATA:
+                self._pending.pop(0)
+                self.overflow_counter += 1
+            if self.q.full():
+                return
+            try:
+                self.q.put_nowait(SampleData.concatenate(self._pending))
+                self._pending = []
+            except queue.Full:
+                pass
+        elif self.delivery_policy == DeliveryPolicy.drop_newest:
+            try:
+                self.q.put_nowait(data)
+            except queue.Full:
+                self.overflow_counter += 1
+        elif self.delivery_policy == DeliveryPolicy.drop_oldest:
+            while True:
+                try:
+                    self.q.put_nowait(data)
+                    return
+                except queue.Full:
+                    self.overflow_counter += 1
+                try:
+                    self.q.get_nowait()
+                    self.q.task_done()
+                except queue.Empty:
+                    pass
+
+    def flush(self, timeout = 1.0):
+        """Deliver the sample data kept aside by the coalesce policy or still 
+        waiting for a blocking consumer, waiting for room in the queue of the 
+        consumer. The sample data which could not be delivered are counted as 
+        overflows.
+
+        :param timeout: maximum time to wait in seconds for the consumer to 
+            take sample data from its queue, defaults to 1.0
+        :type timeout: float, optional
+        """
+        if self._spill is not None:
+            self._flush_timeout = timeout
+            self._closing = True
+            self._spill.put(None)
+            self._forwarding_thread.join()
+            return
+        if len(self._pending) == 0:
+            return
+        try:
+            self.q.put(SampleData.concatenate(self._pending), timeout = timeout)
+        except queue.Full:
+            self.overflow_counter += len(self._pending)
+        self._pending = []
+
+    def _forward(self):
+        # Forward the spilled sample data to the queue of the blocking consumer
+        while True:
+            data = self._spill.get()
+            if data is None:
+                return
+            while True:
+                closing = self._closing
+                try:
+                    self.q.put(data, timeout = self._flush_timeout if closing else 0.1)
+                    break
+                except queue.Full:
+                    if closing:
+                        # The consumer stopped taking sample data, discard this one and 
+                        # the remaining ones (the spill still holds the end marker)
+                        self.overflow_counter += self._spill.qsize()
+                        return
@@ -31,9 +31,9 @@ limitations under the License.
 '''
 
 from queue import Queue
-from copy import copy
+import threading
 
-from ..sample_data_server.sample_data import SampleDataConsumer, SampleData
+from ..sample_data_server.sample_data import SampleDataConsumer, SampleData, DeliveryPolicy
 from ..sample_data_server.event_data import EventDataConsumer, EventData
 from ..tmsi_utilities.singleton import Singleton
 from ..tmsi_utilities.tmsi_logger import TMSiLoggerActivity
@@ -41,8 +41,13 @@ from ..tmsi_utilities.tmsi_logger import TMSiLoggerActivity
 
 class SampleDataServer(metaclass = Singleton):
     def __init__(self):
-        self.__consumer_list = []
-        self.__event_consumer_list = []
+        # Routing tables from provider id to the tuple of its consumers.
+        # They are never modified in place: (un)registering builds a new
+        # table under the lock, so the delivery reads a consistent snapshot
+        # without locking.
+        self.__consumers = {}
+        self.__event_consumers = {}
+        self.__lock = threading.Lock()
     
     def get_consumer_list(self) -> list:
         """Gets the list of available consumer.
@@ -50,7 +55,7 @@ class SampleDataServer(metaclass = Singleton):
         :return: list of available consumers.
         :rtype: list[SampleDataConsumer]
         """
-        return self.__consumer_list
+        return [consumer for consumers in self.__consumers.values() for consumer in consumers]
 
     def get_event_consumer_list(self) -> list:
         """Gets the list of available event consumer.
@@ -58,7 +63,24 @@ class SampleDataServer(metaclass = Singleton):
         :return: list of available event consumers.
         :rtype: list[EventDataConsumer]
         """
-        return self.__event_consumer_list
+        return [consumer for consumers in self.__event_consumers.values() for consumer in consumers]
+
+    def get_overflow_counter(self, id: int, q: Queue) -> int:
+        """Gets how many sample data were discarded because the queue of the 
+        consumer was full. For a consumer with the block policy, the sample 
+        data delivered while too many were waiting for the consumer are counted too.
+
+        :param id: id of the provider.
+        :type id: int
+        :param q: queue of the consumer.
+        :type q: Queue
+        :return: number of overflows, None if the consumer is not registered.
+        :rtype: int
+        """
+        for consumer in self.__consumers.get(id, ()):
+            if consumer.q == q:
+                return consumer.overflow_counter
+        return None
 
     def put_event_data(self, id: int, data: EventData):
         """Puts event in the corresponding event consumer.
@@ -68,10 +90,8 @@ class SampleDataServer(metaclass = Singleton):
         :param data: event to deliver to the event consumer.
         :type data: EventData
         """
-        num_consumers = len(self.__event_consumer_list)
-        for i in range(num_consumers):
-            if (self.__event_consumer_list[i].id == id):
-                self.__event_consumer_list[i].q.put(data)
+        for consumer in self.__event_consumers.get(id, ()):
+            consumer.q.put(data)
     
     def put_sample_data(self, id: int, data: SampleData):
         """Puts data in the corresponding consumer.
@@ -81,25 +101,26 @@ class SampleDataServer(metaclass = Singleton):
         :param data: data to deliver to the consumer.
         :type data: SampleData
         """
-        num_consumers = len(self.__consumer_list)
-        for i in range(num_consumers):
-            if (self.__consumer_list[i].id == id):
-                if not hasattr(self.__consumer_list[i].q, "get_consumer_id"):
-                    self.__consumer_list[i].q.put(data)
-                else:
-                    TMSiLoggerActivity().log("SDS->>Consumer{}: PUT sample data".format(
-                        self.__consumer_list[i].q.get_consumer_id()))
-                    self.__consumer_list[i].q.put(data)
-
-    def register_consumer(self, id: int, q: Queue):
+        for consumer in self.__consumers.get(id, ()):
+            if consumer.consumer_id is not None:
+                TMSiLoggerActivity().log("SDS->>Consumer{}: PUT sample data".format(consumer.consumer_id))
+            consumer.deliver(data)
+
+    def register_consumer(self, id: int, q: Queue, delivery_policy: DeliveryPolicy = DeliveryPolicy.coalesce):
         """Creates the new consumer and registers it to the list of consumers.
 
         :param id: id of the provider.
         :type id: int
         :param q: queue of the consumer.
         :type q: Queue
+        :param delivery_policy: what to do when the queue of the consumer is full, defaults to DeliveryPolicy.coalesce
+        :type delivery_policy: DeliveryPolicy, optional
         """
-        self.__consumer_list.append(SampleDataConsumer(id, q))
+        consumer = SampleDataConsumer(id, q, delivery_policy)
+        with self.__lock:
+            consumers = list(self.__consumers.get(id, ()))
+            consumers.append(consumer)
+            self.__consumers = self.__update_table(self.__consumers, id, consumers)
 
     def register_event_consumer(self, id: int, q: Queue):
         """Creates the new event consumer and registers it to the list of event consumers.
@@ -109,7 +130,10 @@ class SampleDataServer(metaclass = Singleton):
         :param q: queue of the event consumer.
         :type q: Queue
         """
-        self.__event_consumer_list.append(EventDataConsumer(id, q))
+        with self.__lock:
+            consumers = list(self.__event_consumers.get(id, ()))
+            consumers.append(EventDataConsumer(id, q))
+            self.__event_consumers = self.__update_table(self.__event_consumers, id, consumers)
 
     def unregister_consumer(self, id: int, q: Queue):
         """Unregister the queue from the list of consumers.
@@ -119,13 +143,13 @@ class SampleDataServer(metaclass = Singleton):
         :param q: queue of the consumer.
         :type q: Queue
         """
-        num_consumers = len(self.__consumer_list)
-        for i in range(num_consumers):
-            if self.__consumer_list[i].id == id: 
-                if self.__consumer_list[i].q == q:
-                    idx_remove = copy(i)
-        if 'idx_remove' in locals():
-            self.__consumer_list.pop(idx_remove)
+        with self.__lock:
+            removed = [c for c in self.__consumers.get(id, ()) if c.q == q]
+            consumers = [c for c in self.__consumers.get(id, ()) if c.q != q]
+            self.__consumers = self.__update_table(self.__consumers, id, consumers)
+        # Do not lose the sample data kept aside for the consumer
+        for consumer in removed:
+            consumer.flush()
 
     def unregister_event_consumer(self, id: int, q: Queue):
         """Unregister the queue from the list of event consumers.
@@ -135,11 +159,14 @@ class SampleDataServer(metaclass = Singleton):
         :param q: queue of the event consumer.
         :type q: Queue
         """
-        num_consumers = len(self.__event_consumer_list)
-        for i in range(num_consumers):
-            if self.__event_consumer_list[i].id == id: 
-                if self.__event_consumer_list[i].q == q:
-                    idx_remove = copy(i)
-        self.__event_consumer_list.pop(idx_remove)
-
-    
\ No newline at end of file
+        with self.__lock:
+            consumers = [c for c in self.__event_consumers.get(id, ()) if c.q != q]
+            self.__event_consumers = self.__update_table(self.__event_consumers, id, consumers)
+
+    def __update_table(self, table, id, consumers):
+        new_table = dict(table)
+        if len(consumers) > 0:
+            new_table[id] = tuple(consumers)
+        else:
+            new_table.pop(id, None)
+        return new_table
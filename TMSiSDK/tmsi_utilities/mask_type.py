@@ -30,19 +30,23 @@ limitations under the License.
 
 '''
 
+import numpy as np
+
 trigger_bits = 0b00000000000000001111111111111110 #bits which contain actual trigger data
 
 def robust_reverse(x):
     """Robust function to revert a list or a tuple given as input
 
     :param x: a list or a numpy array containing the signal to reverse.
-    :type x: list or tuple
-    :return: list or tuple reverted. if the wrong datatype is provided, the original input is returned.
-    :rtype: list or tuple
+    :type x: list, tuple or numpy.ndarray
+    :return: list, tuple or numpy array reverted. if the wrong datatype is provided, the original input is returned.
+    :rtype: list, tuple or numpy.ndarray
     """
     
     
     try:
+        if isinstance(x, np.ndarray):
+            return (~x.astype(np.int64) & trigger_bits) / 2
         if isinstance(x, list):
             return [(~int(i) & trigger_bits)/2 for i in x]
         if isinstance(x, tuple):
@@ -0,0 +1,102 @@
+'''
+(c) 2022 Twente Medical Systems International B.V., Oldenzaal The Netherlands
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+#######  #     #   #####   #
+   #     ##   ##  #
+   #     # # # #  #        #
+   #     #  #  #   #####   #
+   #     #     #        #  #
+   #     #     #        #  #
+   #     #     #  #####    #
+
+/**
+ * @file ${example_filter_bank_benchmark.py}
+ * @brief This example measures the throughput of the filter bank used by the
+ * real-time filter, without a device. Packets of simulated data of 136 channels
+ * sampled at 4 kHz are filtered with a 50 Hz notch and a 10-500 Hz band-pass
+ * filter, and the time needed is compared to the duration of the data and to
+ * filtering every channel type separately with copies of the channels.
+ */
+
+
+'''
+import sys
+import time
+from copy import deepcopy
+from os.path import join, dirname, realpath
+
+import numpy as np
+from scipy import signal
+
+Example_dir = dirname(realpath(__file__)) # directory of this file
+modules_dir = join(Example_dir, '..') # directory with all modules
+sys.path.append(modules_dir)
+
+from TMSiProcessing.filters import FilterBank
+
+# Simulated measurement: 128 UNI, 4 BIP and 2 AUX channels, followed by STATUS and COUNTER
+sample_rate = 4000
+channels = {'UNI': list(range(0, 128)),
+            'BIP': list(range(128, 132)),
+            'AUX': list(range(132, 134))}
+num_channels = 136
+# Packets of 25 ms, for 60 seconds of data
+packet_size = 100
+num_packets = 60 * sample_rate // packet_size
+
+rng = np.random.default_rng(0)
+packets = [rng.normal(0, 100, (num_channels, packet_size)) for _ in range(20)]
+
+def run_reference():
+    """Filter every channel type separately on a copy of its channels"""
+    sos = np.concatenate((signal.tf2sos(*signal.iirnotch(50, 30, fs=sample_rate)),
+                          signal.butter(2, [10, 500], 'bandpass', fs=sample_rate, output='sos')))
+    z_sos = {ch_type: np.repeat(signal.sosfilt_zi(sos)[:, np.newaxis, :], len(chan), axis=1)
+             for ch_type, chan in channels.items()}
+    output = []
+    for i in range(num_packets):
+        samples = np.array(packets[i % len(packets)])
+        for ch_type, chan in channels.items():
+            samples[chan], z_sos[ch_type] = signal.sosfilt(sos, samples[chan], zi=z_sos[ch_type])
+        output.append(deepcopy(samples))
+    return output
+
+def run_filter_bank(dtype):
+    """Filter all channel types in place with the filter bank"""
+    filter_bank = FilterBank(sample_rate, dtype=dtype)
+    for ch_type, chan in channels.items():
+        filter_bank.add_group(ch_type, chan)
+        filter_bank.design(ch_type, order=2, Fc_hp=10, Fc_lp=500, notch=50)
+    output = []
+    for i in range(num_packets):
+        samples = np.array(packets[i % len(packets)], dtype=dtype)
+        output.append(filter_bank.filter(samples))
+    return output
+
+duration = num_packets * packet_size / sample_rate
+results = {}
+for name, function in [('per channel type, copied', run_reference),
+                       ('filter bank, float64', lambda: run_filter_bank(np.float64)),
+                       ('filter bank, float32', lambda: run_filter_bank(np.float32))]:
+    start = time.perf_counter()
+    results[name] = function()
+    elapsed = time.perf_counter() - start
+    print('{:<28s}: {:6.3f} s for {:.0f} s of data, {:7.1f} x real time, {:6.1f} MSamples/s'.format(
+        name, elapsed, duration, duration / elapsed, num_channels * num_packets * packet_size / elapsed / 1e6))
+
+reference = np.concatenate(results['per channel type, copied'], axis=1)
+for name in ['filter bank, float64', 'filter bank, float32']:
+    difference = np.max(np.abs(np.concatenate(results[name], axis=1) - reference))
+    print('Maximum difference with the reference, {}: {:.2e}'.format(name, difference))
@@ -45,4 +45,8 @@ from TMSiFileFormats.file_formats import Poly5_to_EDF_Converter
 # The Poly5Converter opens recorded Poly5 files (all files in a selected directory). 
 # Both a specific file-path can be provided, as well as no path, which prompts a dialog window. 
 # Pre-processing steps (band-pass filter), are to be configured (0.1 - 100 Hz is selected in this example)
-Poly5Converter=Poly5_to_EDF_Converter(batch=True, f_c=0.1)
+# Files are converted in parallel processes, limited by n_processes and memory_budget (in bytes). 
+# Files for which an edf-file exists are skipped, so an interrupted conversion can be resumed.
+# The conversion has to be started from the main module, because the processes import this script.
+if __name__ == '__main__':
+    Poly5Converter=Poly5_to_EDF_Converter(batch=True, f_c=0.1, n_processes=4, memory_budget=4 * 1024**3)